@@ -1,13 +1,40 @@
 from flask import Flask
 from flask_cors import CORS
 from .config import Config
+from .logs import configurer_logs
+from .serialisation import FastJSONProvider, signaler_replis
+from .price_store import price_store
+from .series_cache import series_cache
+from .prefetch import prefetcher
+from .result_store import result_store
+from .response_cache import response_cache
+from .pdf_jobs import pdf_jobs
+from .profilage import profileur
+from .metrics import metrics
 
-def create_app():
+def create_app(taches_de_fond=True):
+    # taches_de_fond=False : serveur pré-forké (wsgi.py), le préchargement
+    # est lancé par les hooks de gunicorn.conf.py
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config.from_object(Config)
+    configurer_logs(app)
+    signaler_replis()
     CORS(app)
+    price_store.init_app(app)
+    series_cache.init_app(app)
+    result_store.init_app(app)
+    response_cache.init_app(app)
+    pdf_jobs.init_app(app)
+    profileur.init_app(app)
+    metrics.init_app(app)
+    # de nouveaux cours rendent obsolètes les séries et réponses du ticker
+    price_store.abonnes[:] = [series_cache.invalidate, response_cache.invalidate]
 
-    from .routes import bp as routes_bp
+    from .routes import bp as routes_bp, mesures_processus
     app.register_blueprint(routes_bp)
+    metrics.sources[:] = [mesures_processus]
+
+    prefetcher.init_app(app, demarrer=taches_de_fond)
 
     return app
@@ -0,0 +1,128 @@
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.shapes import Drawing, Rect
+from reportlab.lib import colors
+
+# ===============================
+#  GRAPHIQUES VECTORIELS (REPORTLAB)
+# ===============================
+# Équivalents serveur des graphiques du front (mêmes couleurs, fond
+# sombre). Chaque spécification est un dict JSON :
+#   {"type": "lignes", "etiquettes": [...], "series": [[nom, couleur, [v...]], ...]}
+#   {"type": "barres", "etiquettes": [...], "valeurs": [...], "signe": bool,
+#    "couleur": "#...", "paliers": [[seuil, couleur], ...]}
+# Les séries longues sont sous-échantillonnées à MAX_POINTS points.
+
+LARGEUR, HAUTEUR = 500, 260
+MAX_POINTS = 400
+MAX_BARRES = 120
+
+FOND = colors.HexColor("#111118")
+GRILLE = colors.HexColor("#333333")
+TEXTE = colors.HexColor("#aaaaaa")
+VERT, ROUGE = colors.HexColor("#3ee38f"), colors.HexColor("#ff6b6b")
+
+
+def _pas(n, maximum):
+    return max(1, -(-n // maximum))
+
+
+def _axes(axe_x, axe_y):
+    for axe in (axe_x, axe_y):
+        axe.strokeColor = TEXTE
+        axe.labels.fillColor = TEXTE
+        axe.labels.fontSize = 7
+    axe_y.visibleGrid = True
+    axe_y.gridStrokeColor = GRILLE
+    axe_y.gridStrokeDashArray = (3, 3)
+
+
+def _fond(dessin):
+    dessin.add(Rect(0, 0, LARGEUR, HAUTEUR, fillColor=FOND, strokeColor=None))
+
+
+def graphe_lignes(spec):
+    etiquettes = spec.get("etiquettes") or []
+    series = [s for s in spec["series"] if s[2]]
+    dessin = Drawing(LARGEUR, HAUTEUR)
+    _fond(dessin)
+    if not series:
+        return dessin
+
+    n = max(len(s[2]) for s in series)
+    pas = _pas(n, MAX_POINTS)
+    plot = LinePlot()
+    plot.x, plot.y, plot.width, plot.height = 50, 40, LARGEUR - 70, HAUTEUR - 80
+    plot.data = [
+        [(i, float(v)) for i, v in enumerate(valeurs) if i % pas == 0 or i == len(valeurs) - 1]
+        for _, _, valeurs in series
+    ]
+    for k, (_, couleur, _) in enumerate(series):
+        plot.lines[k].strokeColor = colors.HexColor(couleur)
+        plot.lines[k].strokeWidth = 1.5
+
+    _axes(plot.xValueAxis, plot.yValueAxis)
+    plot.xValueAxis.valueMin, plot.xValueAxis.valueMax = 0, max(n - 1, 1)
+    if etiquettes:
+        plot.xValueAxis.valueSteps = list(range(0, len(etiquettes), _pas(len(etiquettes), 8)))
+        plot.xValueAxis.labelTextFormat = lambda i: etiquettes[int(i)] if 0 <= int(i) < len(etiquettes) else ""
+    else:
+        plot.xValueAxis.labelTextFormat = lambda i: str(int(i) + 1)
+    dessin.add(plot)
+
+    legende = Legend()
+    legende.x, legende.y = 55, HAUTEUR - 12
+    legende.fontSize = 8
+    legende.fillColor = TEXTE
+    legende.columnMaximum = 1
+    legende.alignment = "right"
+    legende.deltax = 150
+    legende.colorNamePairs = [(colors.HexColor(couleur), nom) for nom, couleur, _ in series]
+    dessin.add(legende)
+    return dessin
+
+
+def graphe_barres(spec):
+    etiquettes = spec.get("etiquettes") or []
+    valeurs = [float(v) for v in spec["valeurs"]]
+    dessin = Drawing(LARGEUR, HAUTEUR)
+    _fond(dessin)
+    if not valeurs:
+        return dessin
+
+    # agrégation par moyenne au-delà de MAX_BARRES barres
+    pas = _pas(len(valeurs), MAX_BARRES)
+    if pas > 1:
+        valeurs = [sum(valeurs[i:i + pas]) / len(valeurs[i:i + pas]) for i in range(0, len(valeurs), pas)]
+        etiquettes = etiquettes[::pas]
+
+    chart = VerticalBarChart()
+    chart.x, chart.y, chart.width, chart.height = 50, 50, LARGEUR - 70, HAUTEUR - 80
+    chart.data = [valeurs]
+    chart.barSpacing = 0
+    chart.groupSpacing = 1
+    chart.bars.strokeColor = None
+    couleur = spec.get("couleur", "#9f91f7")
+    paliers = spec.get("paliers") or []
+    for i, v in enumerate(valeurs):
+        if spec.get("signe"):
+            chart.bars[(0, i)].fillColor = VERT if v >= 0 else ROUGE
+        else:
+            c = next((c for seuil, c in paliers if v > seuil), couleur)
+            chart.bars[(0, i)].fillColor = colors.HexColor(c)
+
+    _axes(chart.categoryAxis, chart.valueAxis)
+    pas_ticks = _pas(len(valeurs), 12)
+    chart.categoryAxis.categoryNames = [e if i % pas_ticks == 0 else "" for i, e in enumerate(etiquettes)]
+    chart.categoryAxis.labels.angle = 40
+    chart.categoryAxis.labels.boxAnchor = "ne"
+    chart.categoryAxis.visibleTicks = False
+    dessin.add(chart)
+    return dessin
+
+
+def dessiner(spec):
+    if spec.get("type") == "barres":
+        return graphe_barres(spec)
+    return graphe_lignes(spec)
@@ -1,3 +1,80 @@
+import os
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+
+
 class Config:
     SECRET_KEY = "dev-secret"
 
+    # Source des cours : "yahoo", "synthetique" (hors ligne, déterministe) ou "fixtures"
+    PRICE_PROVIDER = os.environ.get("PRICE_PROVIDER", "yahoo")
+    PRICE_SYNTHETIQUE_GRAINE = int(os.environ.get("PRICE_SYNTHETIQUE_GRAINE", 0))
+    # Dossier des fichiers <TICKER>.csv (Date, Close) du fournisseur "fixtures"
+    PRICE_FIXTURES_DIR = os.environ.get("PRICE_FIXTURES_DIR", "")
+
+    # Stockage local des cours (un fichier par ticker), distinct par fournisseur
+    PRICE_STORE_DIR = os.environ.get(
+        "PRICE_STORE_DIR",
+        os.path.join(BASE_DIR, "data", "prices" if PRICE_PROVIDER == "yahoo" else f"prices-{PRICE_PROVIDER}"),
+    )
+    # Délai (s) avant de redemander au fournisseur les dernières séances
+    PRICE_STORE_TTL = int(os.environ.get("PRICE_STORE_TTL", 6 * 3600))
+
+    # Cache mémoire des séries mensuelles / trimestrielles
+    SERIES_CACHE_MB = float(os.environ.get("SERIES_CACHE_MB", 64))
+    SERIES_CACHE_TTL = int(os.environ.get("SERIES_CACHE_TTL", PRICE_STORE_TTL))
+
+    # Nombre maximal de scénarios par appel à /simulate/batch
+    BATCH_MAX_SCENARIOS = int(os.environ.get("BATCH_MAX_SCENARIOS", 5000))
+
+    # Projection Monte Carlo : limites et budget mémoire par paquet de trajectoires
+    MC_MAX_TRAJECTOIRES = int(os.environ.get("MC_MAX_TRAJECTOIRES", 100000))
+    MC_MAX_MOIS = int(os.environ.get("MC_MAX_MOIS", 600))
+    MC_BUDGET_MB = float(os.environ.get("MC_BUDGET_MB", 64))
+
+    # Préchargement de l'UNIVERSE au démarrage puis à intervalle régulier
+    PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "1") == "1"
+    PREFETCH_INTERVAL = int(os.environ.get("PREFETCH_INTERVAL", 3600))
+    # nouvel essai après un passage sans aucun cours (fournisseur injoignable)
+    PREFETCH_RELANCE = int(os.environ.get("PREFETCH_RELANCE", 60))
+    PREFETCH_DATE_DEBUT = int(os.environ.get("PREFETCH_DATE_DEBUT", 2015))
+    PREFETCH_DATE_FIN = int(os.environ.get("PREFETCH_DATE_FIN", 2025))
+
+    # Résultats de /simulate conservés côté serveur (simulation_id)
+    RESULT_STORE_MAX = int(os.environ.get("RESULT_STORE_MAX", 500))
+    RESULT_STORE_TTL = int(os.environ.get("RESULT_STORE_TTL", 3600))
+    # Dossier partagé entre workers (vide : mémoire du processus uniquement)
+    RESULT_STORE_DIR = os.environ.get("RESULT_STORE_DIR", "")
+
+    # Réponses déterministes mises en cache (ETag / 304)
+    RESPONSE_CACHE_MB = float(os.environ.get("RESPONSE_CACHE_MB", 32))
+
+    # Exports PDF : pool de processus, cache des rapports, durée de vie des jobs
+    PDF_WORKERS = int(os.environ.get("PDF_WORKERS", 2))
+    PDF_CACHE_MB = float(os.environ.get("PDF_CACHE_MB", 64))
+    PDF_JOBS_TTL = int(os.environ.get("PDF_JOBS_TTL", 900))
+    # Dossier partagé entre workers pour le suivi des jobs (vide : mémoire seule)
+    PDF_JOBS_DIR = os.environ.get("PDF_JOBS_DIR", "")
+
+    # Compression gzip / br des réponses (taille minimale en octets, niveau)
+    COMPRESSION_MIN_OCTETS = int(os.environ.get("COMPRESSION_MIN_OCTETS", 500))
+    COMPRESSION_NIVEAU = int(os.environ.get("COMPRESSION_NIVEAU", 6))
+
+    # Mesures /metrics : dossier partagé où chaque worker dépose ses compteurs
+    # (vide : processus qui répond uniquement), délai entre deux écritures (s)
+    METRICS_DIR = os.environ.get("METRICS_DIR", "")
+    METRICS_INTERVALLE = float(os.environ.get("METRICS_INTERVALLE", 1))
+
+    # Journaux : niveau et format ("json" structuré ou "texte")
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+
+    # Profilage à la demande (X-Profile / ?profile=) et des requêtes lentes
+    PROFILAGE_ACTIF = os.environ.get("PROFILAGE_ACTIF", "0") == "1"
+    PROFILAGE_DIR = os.environ.get("PROFILAGE_DIR", os.path.join(BASE_DIR, "data", "profils"))
+    PROFILAGE_SEUIL_MS = float(os.environ.get("PROFILAGE_SEUIL_MS", 0))  # 0 : pas de profilage automatique
+    # fraction des requêtes suivies avec un seuil : l'échantillonnage coûte
+    # ~10 % de CPU par requête suivie (voir profilage.py)
+    PROFILAGE_TAUX = float(os.environ.get("PROFILAGE_TAUX", 0.1))
+    PROFILAGE_INTERVALLE_MS = float(os.environ.get("PROFILAGE_INTERVALLE_MS", 5))
+    PROFILAGE_MAX = int(os.environ.get("PROFILAGE_MAX", 50))
@@ -0,0 +1,36 @@
+import os
+
+# ===============================
+#  FICHIERS PARTAGÉS ENTRE WORKERS
+# ===============================
+# Utilisé par result_store et pdf_jobs quand un dossier partagé est
+# configuré : écriture atomique (un autre worker ne lit jamais un fichier
+# à moitié écrit) et purge des fichiers expirés.
+
+
+def ecrire_atomique(chemin, donnees):
+    # fichier temporaire propre au processus, puis renommage
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(donnees)
+    os.replace(tmp, chemin)
+
+
+class Purgeur:
+    """Supprime les fichiers d'un dossier plus vieux que ttl, au plus une
+    fois par intervalle (secondes)."""
+
+    def __init__(self, intervalle=60):
+        self.intervalle = intervalle
+        self._derniere = 0.0
+
+    def purger(self, dossier, ttl, now):
+        if now - self._derniere < self.intervalle:
+            return
+        self._derniere = now
+        for entree in os.scandir(dossier):
+            try:
+                if now - entree.stat().st_mtime > ttl:
+                    os.remove(entree.path)
+            except FileNotFoundError:
+                pass
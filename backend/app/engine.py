@@ -0,0 +1,142 @@
+from collections import namedtuple
+
+import numpy as np
+
+# ===============================
+#  MOTEUR DE SIMULATION DCA (VECTORISÉ)
+# ===============================
+# Récurrence de la boucle historique, mois par mois :
+#   u_i = (u_{i-1} + a_i) * d        a_i = contribution / p_i les mois d'apport
+# avec d = 1 - frais et u_{-1} = montant_initial / p_0. Elle se déroule en
+#   u_i = d^(i+1) * (u_{-1} + sum_{k<=i} a_k * d^-k)
+# soit un cumsum et un facteur de décroissance cumulé, sans boucle Python.
+# Les paramètres (montant, contribution, pas, frais) peuvent être des
+# vecteurs : chaque élément est alors un scénario (scénarios × mois).
+
+STEP_MAP = {"mensuelle": 1, "trimestrielle": 3, "semestrielle": 6, "annuelle": 12}
+
+SimulationDCA = namedtuple("SimulationDCA", ["valeurs", "montant_investi"])
+
+
+def contribution_mask(n, step):
+    step = np.asarray(step)[..., None]
+    i = np.arange(n)
+    return (i > 0) & (i % step == 0)
+
+
+def contribution_mask_dates(dates, step):
+    # résolution quotidienne : première séance de chaque mois d'apport
+    mois = np.asarray(dates).astype("datetime64[M]").astype(np.int64)
+    mois = mois - mois[0]
+    nouveau = np.concatenate(([False], mois[1:] != mois[:-1]))
+    return nouveau & (mois % np.asarray(step)[..., None] == 0)
+
+
+def simulate_dca(prices, montant_initial, contribution=0.0, step=1, frais=0.0, mask=None):
+    # mask : calendrier d'apports explicite (ex. contribution_mask_dates),
+    # sinon une période sur `step`
+    prices = np.asarray(prices, dtype=float)
+    if mask is None:
+        mask = contribution_mask(prices.shape[-1], step)
+    if prices.ndim == 1:
+        # les prix nuls ou négatifs sont ignorés sans décaler le calendrier des apports
+        valid = prices > 0
+        mask = mask[..., valid]
+        prices = prices[valid]
+
+    montant_initial = np.asarray(montant_initial, dtype=float)[..., None]
+    contribution = np.asarray(contribution, dtype=float)[..., None]
+    d = 1.0 - np.asarray(frais, dtype=float)[..., None]
+
+    n = prices.shape[-1]
+    mask = mask & (contribution > 0)
+    apports = np.where(mask, contribution / prices, 0.0)
+
+    k = np.arange(n)
+    decroissance = d ** (k + 1)
+    units = decroissance * (montant_initial / prices[..., :1] + np.cumsum(apports / d ** k, axis=-1))
+
+    valeurs = units * prices
+    investi = montant_initial[..., 0] + contribution[..., 0] * mask.sum(axis=-1)
+    return SimulationDCA(valeurs, investi)
+
+
+
+# ===============================
+#  PORTEFEUILLE MULTI-ACTIFS PONDÉRÉ
+# ===============================
+# prices : matrice (mois × actifs). Entre deux rééquilibrages, chaque actif
+# suit la récurrence DCA ci-dessus (apports répartis selon les poids) ;
+# chaque segment est calculé d'un bloc sur toute la matrice. À la fin d'un
+# mois de rééquilibrage, la valeur totale est redistribuée selon les poids.
+
+REBALANCEMENT_MAP = {"mensuel": 1, "trimestriel": 3, "annuel": 12}
+
+SimulationPonderee = namedtuple(
+    "SimulationPonderee", ["valeurs", "valeurs_actifs", "montant_investi", "reequilibrages"]
+)
+
+
+def simulate_weighted(prices, poids, montant_initial, contribution=0.0, step=1, frais=0.0,
+                      rebalancement=None, seuil=0.05):
+    prices = np.asarray(prices, dtype=float)
+    poids = np.asarray(poids, dtype=float)
+    poids = poids / poids.sum()
+    n, nb_actifs = prices.shape
+    d = 1.0 - frais
+
+    mask = contribution_mask(n, step) & (contribution > 0)
+    apports = np.where(mask[:, None], contribution * poids / prices, 0.0)
+    periode = REBALANCEMENT_MAP.get(rebalancement)
+
+    units = np.empty((n, nb_actifs))
+    u0 = montant_initial * poids / prices[0]
+    reequilibrages = 0
+    debut = 0
+    while debut < n:
+        if periode is not None:
+            # prochain mois i > 0 multiple de la période, inclus dans le segment
+            fin = min(n, -(-max(debut, 1) // periode) * periode + 1)
+        else:
+            fin = n
+
+        k = np.arange(fin - debut)[:, None]
+        u = d ** (k + 1) * (u0 + np.cumsum(apports[debut:fin] / d ** k, axis=0))
+
+        if rebalancement == "seuil":
+            v = u * prices[debut:fin]
+            derive = np.abs(v / v.sum(axis=1, keepdims=True) - poids).max(axis=1) > seuil
+            if derive.any():
+                fin = debut + int(np.argmax(derive)) + 1
+                u = u[: fin - debut]
+
+        units[debut:fin] = u
+        if fin < n:
+            total = float(u[-1] @ prices[fin - 1])
+            u0 = total * poids / prices[fin - 1]
+            reequilibrages += 1
+        debut = fin
+
+    valeurs_actifs = units * prices
+    investi = montant_initial + contribution * mask.sum()
+    return SimulationPonderee(valeurs_actifs.sum(axis=1), valeurs_actifs, investi, reequilibrages)
+
+Metriques = namedtuple(
+    "Metriques", ["final", "rendement_total", "volatilite", "cagr", "sharpe"]
+)
+
+
+def portfolio_metrics(valeurs, montant_investi, duree_annees, taux_sans_risque, periodes_par_an=12):
+    valeurs = np.asarray(valeurs, dtype=float)
+    final = valeurs[..., -1]
+
+    rendements = np.diff(valeurs, axis=-1) / valeurs[..., :-1]
+    volatilite_p = np.std(rendements, axis=-1, ddof=1)
+    volatilite = np.where(volatilite_p > 0, volatilite_p * np.sqrt(periodes_par_an), 0.0)
+
+    rendement_total = (final - montant_investi) / montant_investi * 100
+    cagr = (final / valeurs[..., 0]) ** (1 / duree_annees) - 1
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(volatilite > 0, (cagr - taux_sans_risque) / volatilite, 0.0)
+    return Metriques(final, rendement_total, volatilite, cagr, sharpe)
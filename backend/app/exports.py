@@ -0,0 +1,173 @@
+import csv
+import io
+import math
+import tempfile
+import zipfile
+
+import numpy as np
+
+# ===============================
+#  EXPORTS TABULAIRES EN FLUX
+# ===============================
+# Les feuilles sont des tuples (nom, table, écrire l'index), comme produits
+# par feuilles_export / feuilles_simulation ; la table est un Tableau
+# (colonnes NumPy d'une simulation) ou un petit DataFrame (résultats
+# envoyés par le client). Les lignes sont produites par paquets de
+# TAILLE_PAQUET : seul le paquet en cours est converti en objets Python,
+# la mémoire reste constante quelle que soit la longueur de l'historique.
+# Le classeur Excel est écrit en mode write_only dans un fichier temporaire
+# (envoyé par morceaux) ; le CSV est produit paquet par paquet ; le Parquet
+# nécessite pyarrow, dépendance optionnelle, et est écrit un groupe de
+# lignes par paquet.
+
+TAILLE_PAQUET = 1000
+
+
+class Colonne:
+    """Valeurs d'une colonne (tableau NumPy, range ou Series), converties
+    tranche par tranche : mise à l'échelle, arrondi, ou dates en texte à
+    l'unité `unite` ("M" : AAAA-MM, "D" : AAAA-MM-JJ)."""
+
+    def __init__(self, valeurs, decimales=None, echelle=1, unite=None):
+        self.valeurs = valeurs
+        self.decimales = decimales
+        self.echelle = echelle
+        self.unite = unite
+
+    def __len__(self):
+        return len(self.valeurs)
+
+    def tranche(self, debut, fin):
+        if isinstance(self.valeurs, range):
+            return list(self.valeurs[debut:fin])
+        if hasattr(self.valeurs, "iloc"):
+            return self.valeurs.iloc[debut:fin].tolist()
+        valeurs = self.valeurs[debut:fin]
+        if self.unite:
+            return np.datetime_as_string(valeurs.astype("datetime64[D]"), unit=self.unite).tolist()
+        if self.echelle != 1:
+            valeurs = valeurs * self.echelle
+        if self.decimales is None:
+            return valeurs.tolist()
+        return [round(v, self.decimales) for v in valeurs.tolist()]
+
+
+class Tableau:
+    def __init__(self, colonnes):
+        # {nom: Colonne ou tableau}, toutes de même longueur
+        self.colonnes = {
+            nom: c if isinstance(c, Colonne) else Colonne(c) for nom, c in colonnes.items()
+        }
+        self.n = len(next(iter(self.colonnes.values()))) if self.colonnes else 0
+
+    @classmethod
+    def depuis_dataframe(cls, df):
+        return cls({nom: Colonne(df[nom]) for nom in df.columns})
+
+    def paquets(self, index=False):
+        # {nom: liste} par tranche de TAILLE_PAQUET lignes ; index : colonne "" (0..n-1)
+        for debut in range(0, self.n, TAILLE_PAQUET):
+            fin = min(debut + TAILLE_PAQUET, self.n)
+            paquet = {"": list(range(debut, fin))} if index else {}
+            paquet.update((nom, c.tranche(debut, fin)) for nom, c in self.colonnes.items())
+            yield paquet
+
+
+def tableau(table):
+    return table if isinstance(table, Tableau) else Tableau.depuis_dataframe(table)
+
+
+def _lignes(table, index):
+    for paquet in tableau(table).paquets(index):
+        for ligne in zip(*paquet.values()):
+            # cellule vide plutôt que NaN, comme DataFrame.to_excel
+            yield [None if isinstance(v, float) and math.isnan(v) else v for v in ligne]
+
+
+def _entetes(table, index):
+    return ([""] if index else []) + [str(c) for c in tableau(table).colonnes]
+
+
+def ecrire_xlsx(feuilles):
+    # import différé : openpyxl n'est chargé qu'au premier export Excel
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    en_tete = Font(bold=True)
+    wb = Workbook(write_only=True)
+    for nom, table, index in feuilles:
+        ws = wb.create_sheet(title=nom[:31])
+        entetes = []
+        for titre in _entetes(table, index):
+            cellule = WriteOnlyCell(ws, value=titre)
+            cellule.font = en_tete
+            entetes.append(cellule)
+        ws.append(entetes)
+        for ligne in _lignes(table, index):
+            ws.append(ligne)
+
+    fichier = tempfile.TemporaryFile()
+    wb.save(fichier)
+    fichier.seek(0)
+    return fichier
+
+
+def flux_csv(table, index):
+    tampon = io.StringIO()
+    writer = csv.writer(tampon)
+    writer.writerow(_entetes(table, index))
+    for i, ligne in enumerate(_lignes(table, index), 1):
+        writer.writerow(ligne)
+        if i % TAILLE_PAQUET == 0:
+            yield tampon.getvalue()
+            tampon.seek(0)
+            tampon.truncate()
+    yield tampon.getvalue()
+
+
+def parquet_disponible():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def ecrire_parquet(table, index, fichier):
+    # un groupe de lignes par paquet ; l'index (0..n-1) est celui que pandas
+    # recrée à la lecture, il n'est pas écrit. Noms de colonnes en texte :
+    # exigé par le format
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = tableau(table)
+    writer = None
+    for paquet in table.paquets():
+        lot = pa.Table.from_pydict(
+            {str(nom): valeurs for nom, valeurs in paquet.items()},
+            schema=writer.schema if writer else None,
+        )
+        if writer is None:
+            writer = pq.ParquetWriter(fichier, lot.schema)
+        writer.write_table(lot)
+    if writer is None:
+        pq.write_table(pa.table({str(nom): [] for nom in table.colonnes}), fichier)
+    else:
+        writer.close()
+
+
+def ecrire_zip(feuilles, extension):
+    fichier = tempfile.TemporaryFile()
+    with zipfile.ZipFile(fichier, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for nom, table, index in feuilles:
+            with archive.open(f"{nom}.{extension}", "w") as membre:
+                if extension == "csv":
+                    for morceau in flux_csv(table, index):
+                        membre.write(morceau.encode("utf-8"))
+                else:
+                    tampon = io.BytesIO()
+                    ecrire_parquet(table, index, tampon)
+                    membre.write(tampon.getvalue())
+    fichier.seek(0)
+    return fichier
@@ -0,0 +1,158 @@
+import os
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+#  FOURNISSEURS DE COURS
+# ===============================
+# Le stockage local (price_store) demande les plages manquantes au
+# fournisseur choisi par PRICE_PROVIDER :
+#   - "yahoo" : yfinance, une seule requête pour tous les tickers (défaut) ;
+#   - "synthetique" : marche aléatoire log-normale déterministe, sans
+#     réseau (benchmarks, développement hors ligne) ;
+#   - "fixtures" : un fichier <TICKER>.csv (Date, Close) par ticker dans
+#     PRICE_FIXTURES_DIR.
+# Un fournisseur expose telecharger(tickers, start, end, auto_adjust) et
+# renvoie {ticker: série des clôtures indexée par date}, fin exclue ; un
+# ticker sans données est absent du dictionnaire. Pour en brancher un
+# autre : l'ajouter à FOURNISSEURS ou l'affecter à price_store.fournisseur.
+# Les cours téléchargés restant sur disque, chaque fournisseur a son
+# propre PRICE_STORE_DIR par défaut (voir config.py).
+
+
+def download_prices_many(tickers, start, end, auto_adjust=True):
+    # une seule requête Yahoo pour tous les tickers
+    tickers = list(tickers)
+    # import différé : yfinance (et ses dépendances) ne charge qu'au premier téléchargement
+    import yfinance as yf
+
+    df = yf.download(tickers, start=start, end=end, progress=False, auto_adjust=auto_adjust)
+    if df is None or df.empty:
+        return {}
+
+    if not isinstance(df.columns, pd.MultiIndex):
+        col = next((c for c in ("Adj Close", "Close") if c in df.columns), None)
+        return {tickers[0]: df[col].dropna()} if col and len(tickers) == 1 else {}
+
+    champs = df.columns.get_level_values(0)
+    col = next((c for c in ("Adj Close", "Close") if c in champs), None)
+    if col is None:
+        return {}
+    closes = df[col]
+    par_symbole = {t.upper(): t for t in tickers}
+    series = {}
+    for symbole in closes.columns:
+        serie = closes[symbole].dropna()
+        if symbole.upper() in par_symbole and not serie.empty:
+            series[par_symbole[symbole.upper()]] = serie
+    return series
+
+
+def download_prices(ticker, start, end, auto_adjust=True):
+    return download_prices_many([ticker], start, end, auto_adjust).get(ticker)
+
+
+def reinitialiser_session_yahoo():
+    """À appeler dans un processus forké : yfinance garde une session HTTP
+    unique (singleton YfData, connexions keep-alive curl_cffi, cookie et
+    crumb) ; héritée du maître, elle partagerait ses sockets entre workers.
+    Le singleton est oublié, le worker en recrée un au premier téléchargement."""
+    data = sys.modules.get("yfinance.data")
+    if data is not None:
+        data.SingletonMeta._instances.pop(data.YfData, None)
+
+
+def _borner(serie, start, end):
+    return serie[(serie.index >= pd.Timestamp(start)) & (serie.index < pd.Timestamp(end))]
+
+
+class Yahoo:
+    nom = "yahoo"
+
+    @classmethod
+    def depuis_config(cls, config):
+        return cls()
+
+    def telecharger(self, tickers, start, end, auto_adjust=True):
+        return download_prices_many(tickers, start, end, auto_adjust)
+
+
+class Synthetique:
+    """Séances ouvrées depuis ORIGINE, rendements tirés d'un générateur
+    initialisé par (graine, ticker). Les tirages se suivent dans le même
+    ordre quelle que soit la plage demandée : une date a toujours le même
+    cours, les plages téléchargées séparément se recollent sans saut."""
+
+    nom = "synthetique"
+    ORIGINE = "1990-01-01"
+
+    def __init__(self, graine=0, rendement=0.07, volatilite=0.18):
+        self.graine = graine
+        self.rendement = rendement
+        self.volatilite = volatilite
+
+    @classmethod
+    def depuis_config(cls, config):
+        return cls(graine=config["PRICE_SYNTHETIQUE_GRAINE"])
+
+    def serie(self, ticker, end):
+        jours = pd.bdate_range(self.ORIGINE, end, inclusive="left", name="Date")
+        rng = np.random.default_rng([self.graine, zlib.crc32(ticker.upper().encode())])
+        dt = 1 / 252
+        pas = rng.normal(
+            (self.rendement - self.volatilite ** 2 / 2) * dt,
+            self.volatilite * np.sqrt(dt),
+            len(jours),
+        )
+        return pd.Series(100 * np.exp(np.cumsum(pas)), index=jours, name="Close")
+
+    def telecharger(self, tickers, start, end, auto_adjust=True):
+        series = {}
+        for ticker in tickers:
+            serie = _borner(self.serie(ticker, end), start, end)
+            if not serie.empty:
+                series[ticker] = serie
+        return series
+
+
+class Fixtures:
+    nom = "fixtures"
+
+    def __init__(self, dossier):
+        self.dossier = dossier
+
+    @classmethod
+    def depuis_config(cls, config):
+        if not config["PRICE_FIXTURES_DIR"]:
+            raise ValueError("PRICE_PROVIDER=fixtures nécessite PRICE_FIXTURES_DIR")
+        return cls(config["PRICE_FIXTURES_DIR"])
+
+    def chemin(self, ticker):
+        nom = ticker.upper().replace(os.sep, "_").replace("/", "_")
+        return os.path.join(self.dossier, f"{nom}.csv")
+
+    def telecharger(self, tickers, start, end, auto_adjust=True):
+        series = {}
+        for ticker in tickers:
+            chemin = self.chemin(ticker)
+            if not os.path.exists(chemin):
+                continue
+            df = pd.read_csv(chemin, index_col=0, parse_dates=True)
+            col = next((c for c in ("Adj Close", "Close") if c in df.columns), df.columns[0])
+            serie = _borner(df[col].dropna().sort_index(), start, end)
+            if not serie.empty:
+                series[ticker] = serie
+        return series
+
+
+FOURNISSEURS = {f.nom: f for f in (Yahoo, Synthetique, Fixtures)}
+
+
+def creer_fournisseur(config):
+    nom = config["PRICE_PROVIDER"]
+    if nom not in FOURNISSEURS:
+        raise ValueError(f"PRICE_PROVIDER inconnu : {nom} ({', '.join(FOURNISSEURS)})")
+    return FOURNISSEURS[nom].depuis_config(config)
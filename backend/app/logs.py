@@ -0,0 +1,44 @@
+import json
+import logging
+import sys
+import time
+
+# ===============================
+#  JOURNAUX STRUCTURÉS
+# ===============================
+# LOG_FORMAT=json : une ligne JSON par événement (horodatage, niveau,
+# logger, message, champs passés via extra=..., trace d'exception).
+# LOG_FORMAT=texte : format lisible pour le développement.
+
+# attributs standard d'un LogRecord, exclus des champs supplémentaires
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class FormatJSON(logging.Formatter):
+    def format(self, record):
+        entree = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "niveau": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for cle, valeur in vars(record).items():
+            if cle not in _STANDARD and not cle.startswith("_"):
+                entree[cle] = valeur
+        if record.exc_info:
+            entree["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entree, ensure_ascii=False, default=str)
+
+
+def configurer_logs(app):
+    handler = logging.StreamHandler(sys.stderr)
+    if app.config["LOG_FORMAT"] == "json":
+        handler.setFormatter(FormatJSON())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s : %(message)s"))
+
+    # logger du paquet : app.routes, app.price_store, app.prefetch, app.acces...
+    logger = logging.getLogger("app")
+    logger.handlers[:] = [handler]
+    logger.setLevel(app.config["LOG_LEVEL"])
+    logger.propagate = False
@@ -0,0 +1,360 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+from .disque import ecrire_atomique
+
+# ===============================
+#  MESURES : SERVER-TIMING ET PROMETHEUS
+# ===============================
+# Chaque requête accumule dans flask.g la durée de ses étapes
+# (téléchargement, rééchantillonnage, simulation, sérialisation...). Les
+# durées sont exclusives : une étape imbriquée est retirée de l'étape qui
+# l'englobe, le reste du temps passé dans la route est compté en "calcul".
+# Elles partent dans l'en-tête Server-Timing et dans des histogrammes
+# (route, étape) exposés au format texte Prometheus sur /metrics.
+#
+# Sous gunicorn, chaque worker a ses propres compteurs. Avec METRICS_DIR
+# (dossier partagé), un worker réécrit son instantané <pid>-<n>.json au
+# plus toutes les METRICS_INTERVALLE secondes, et /metrics additionne ceux
+# de tous les workers : compteurs et histogrammes de tous les processus,
+# jauges des seuls workers vivants. À la sortie d'un worker (recyclage
+# max_requests, HUP), le maître verse ses compteurs dans son fichier
+# archive-<pid>.json : les totaux ne redescendent pas. Les fichiers des
+# processus disparus sont supprimés au démarrage du maître. Sans
+# METRICS_DIR, /metrics décrit le seul processus qui répond.
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RESIDU = "calcul"
+
+
+@contextmanager
+def etape(nom):
+    """Mesure un bloc de la requête en cours ; sans effet hors requête
+    (préchargement, processus du pool PDF)."""
+    if not has_request_context() or "etapes" not in g:
+        yield
+        return
+    pile = g.pile_etapes
+    pile.append(0.0)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        duree = time.perf_counter() - t0
+        enfants = pile.pop()
+        g.etapes[nom] = g.etapes.get(nom, 0.0) + duree - enfants
+        if pile:
+            pile[-1] += duree
+
+
+class Histogramme:
+    __slots__ = ("compteurs", "somme", "total")
+
+    def __init__(self):
+        self.compteurs = [0] * len(BUCKETS)
+        self.somme = 0.0
+        self.total = 0
+
+    def observer(self, valeur):
+        i = bisect_left(BUCKETS, valeur)
+        if i < len(BUCKETS):
+            self.compteurs[i] += 1
+        self.somme += valeur
+        self.total += 1
+
+    def fusionner(self, compteurs, somme, total):
+        self.compteurs = [a + b for a, b in zip(self.compteurs, compteurs)]
+        self.somme += somme
+        self.total += total
+
+
+def _cle(nom, labels):
+    return nom, tuple(sorted(labels.items()))
+
+
+class Agregat:
+    """Somme d'instantanés de processus (format de Metrics.instantane)."""
+
+    def __init__(self):
+        self.requetes = {}   # (route, méthode, statut) -> nombre
+        self.durees = {}     # route -> Histogramme
+        self.etapes = {}     # (route, étape) -> Histogramme
+        self.valeurs = {}    # (métrique, labels triés) -> valeur
+
+    def ajouter(self, etat, jauges=True):
+        # jauges=False : processus terminé, seuls ses compteurs restent
+        for route, methode, statut, n in etat["requetes"]:
+            cle = (route, methode, statut)
+            self.requetes[cle] = self.requetes.get(cle, 0) + n
+        for route, *h in etat["durees"]:
+            self.durees.setdefault(route, Histogramme()).fusionner(*h)
+        for route, nom, *h in etat["etapes"]:
+            self.etapes.setdefault((route, nom), Histogramme()).fusionner(*h)
+        for nom, labels, valeur in etat["compteurs"] + (etat["jauges"] if jauges else []):
+            cle = _cle(nom, labels)
+            self.valeurs[cle] = self.valeurs.get(cle, 0) + valeur
+
+    def valeur(self, nom, **labels):
+        return self.valeurs.get(_cle(nom, labels), 0)
+
+    def etat(self):
+        return {
+            "requetes": [[*cle, n] for cle, n in self.requetes.items()],
+            "durees": [[route, h.compteurs, h.somme, h.total] for route, h in self.durees.items()],
+            "etapes": [[route, nom, h.compteurs, h.somme, h.total] for (route, nom), h in self.etapes.items()],
+            "compteurs": [[nom, dict(labels), v] for (nom, labels), v in self.valeurs.items()],
+            "jauges": [],
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requetes = {}   # (route, méthode, statut) -> nombre
+        self.durees = {}     # route -> Histogramme
+        self.etapes = {}     # (route, étape) -> Histogramme
+        # fonctions -> [(nom, "counter" ou "gauge", aide, [(labels, valeur)])],
+        # valeurs du processus additionnées entre workers
+        self.sources = []
+        self.dossier = None
+        self.intervalle = 1.0
+        self._ecriture = threading.Lock()
+        self._pid = None
+        self._fichier = None
+        self._dernier = None
+
+    def init_app(self, app):
+        self.dossier = app.config["METRICS_DIR"] or None
+        self.intervalle = app.config["METRICS_INTERVALLE"]
+        if self.dossier:
+            os.makedirs(self.dossier, exist_ok=True)
+
+    # ---------- Cycle de la requête ----------
+    def debut(self):
+        if self.dossier and self._pid != os.getpid():
+            self._demarrer_ecriture()
+        g.etapes = {}
+        g.pile_etapes = []
+        g.debut_requete = time.perf_counter()
+
+    def fin(self, response):
+        if "debut_requete" not in g:
+            return response
+        total = time.perf_counter() - g.debut_requete
+        etapes = dict(g.etapes)
+        residu = total - sum(etapes.values())
+        if residu > 0:
+            etapes[RESIDU] = etapes.get(RESIDU, 0.0) + residu
+
+        route = request.url_rule.rule if request.url_rule is not None else "inconnue"
+        self.observer(route, request.method, response.status_code, total, etapes)
+
+        # les flux sont encore en cours d'émission : seule la préparation est comptée
+        timing = [f"{nom};dur={duree * 1000:.2f}" for nom, duree in etapes.items()]
+        timing.append(f"total;dur={total * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(timing)
+        g.duree_requete = total
+        return response
+
+    def observer(self, route, methode, statut, total, etapes):
+        with self._lock:
+            cle = (route, methode, statut)
+            self.requetes[cle] = self.requetes.get(cle, 0) + 1
+            self.durees.setdefault(route, Histogramme()).observer(total)
+            for nom, duree in etapes.items():
+                self.etapes.setdefault((route, nom), Histogramme()).observer(duree)
+
+    # ---------- Instantanés partagés entre workers ----------
+    def instantane(self, releve=None):
+        if releve is None:
+            releve = [famille for source in self.sources for famille in source()]
+        with self._lock:
+            etat = {
+                "requetes": [[*cle, n] for cle, n in self.requetes.items()],
+                "durees": [[route, list(h.compteurs), h.somme, h.total] for route, h in self.durees.items()],
+                "etapes": [[route, nom, list(h.compteurs), h.somme, h.total]
+                           for (route, nom), h in self.etapes.items()],
+            }
+        etat["compteurs"] = [[nom, labels, v] for nom, type_metrique, _, valeurs in releve
+                             if type_metrique == "counter" for labels, v in valeurs]
+        etat["jauges"] = [[nom, labels, v] for nom, type_metrique, _, valeurs in releve
+                          if type_metrique != "counter" for labels, v in valeurs]
+        return etat
+
+    def _demarrer_ecriture(self):
+        # premier appel dans ce processus (après le fork du worker)
+        with self._ecriture:
+            pid = os.getpid()
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._fichier = os.path.join(self.dossier, f"{pid}-{time.time_ns()}.json")
+            self._dernier = None
+        threading.Thread(target=self._boucle, name="metrics", daemon=True).start()
+
+    def _boucle(self):
+        while True:
+            time.sleep(self.intervalle)
+            self.ecrire()
+
+    def ecrire(self):
+        # instantané du processus, réécrit seulement s'il a changé
+        if self._pid != os.getpid():
+            return
+        donnees = json.dumps(self.instantane()).encode()
+        with self._ecriture:
+            if donnees == self._dernier:
+                return
+            try:
+                ecrire_atomique(self._fichier, donnees)
+            except OSError:
+                logger.warning("Écriture des mesures impossible", exc_info=True)
+                return
+            self._dernier = donnees
+
+    def _autres_processus(self):
+        """(instantané, processus vivant) des autres processus du dossier."""
+        workers, archives = [], []
+        for entree in os.scandir(self.dossier):
+            if not entree.name.endswith(".json") or entree.path == self._fichier:
+                continue
+            (archives if entree.name.startswith("archive-") else workers).append(entree)
+        # workers lus avant les archives : un worker archivé entre-temps est
+        # listé dans l'archive et n'est compté qu'une fois
+        etats = [(entree.name, _lire(entree.path)) for entree in workers]
+        archives_lues = [etat for etat in (_lire(entree.path) for entree in archives) if etat]
+        archives_noms = {nom for etat in archives_lues for nom in etat["fichiers"]}
+        for etat in archives_lues:
+            yield etat, False
+        for nom, etat in etats:
+            if etat and nom not in archives_noms:
+                yield etat, True
+
+    def archiver(self, pid):
+        """Maître gunicorn, à la sortie du worker pid : ses compteurs passent
+        dans l'archive du maître, son fichier est supprimé."""
+        if not self.dossier:
+            return
+        sortants = [e for e in os.scandir(self.dossier)
+                    if e.name.startswith(f"{pid}-") and e.name.endswith(".json")]
+        if not sortants:
+            return
+        chemin = os.path.join(self.dossier, f"archive-{os.getpid()}.json")
+        agregat = Agregat()
+        archive = _lire(chemin)
+        noms = []
+        if archive:
+            agregat.ajouter(archive)
+            # noms gardés tant que le fichier peut encore être lu par un autre worker
+            noms = [n for n in archive["fichiers"] if os.path.exists(os.path.join(self.dossier, n))]
+        for entree in sortants:
+            etat = _lire(entree.path)
+            if etat:
+                agregat.ajouter(etat, jauges=False)
+                noms.append(entree.name)
+        etat = agregat.etat()
+        etat["fichiers"] = noms
+        ecrire_atomique(chemin, json.dumps(etat).encode())
+        for entree in sortants:
+            _supprimer(entree.path)
+
+    def nettoyer(self):
+        # démarrage du maître : fichiers laissés par des processus disparus
+        if not self.dossier:
+            return
+        for entree in os.scandir(self.dossier):
+            try:
+                pid = int(entree.name.removeprefix("archive-").split("-")[0].split(".")[0])
+                os.kill(pid, 0)
+            except ValueError:
+                continue
+            except ProcessLookupError:
+                _supprimer(entree.path)
+            except PermissionError:
+                pass
+
+    # ---------- Format texte Prometheus ----------
+    def exposition(self):
+        """(lignes, Agregat) : ce processus plus, avec METRICS_DIR, les autres."""
+        releve = [famille for source in self.sources for famille in source()]
+        agregat = Agregat()
+        agregat.ajouter(self.instantane(releve))
+        if self.dossier:
+            for etat, vivant in self._autres_processus():
+                agregat.ajouter(etat, jauges=vivant)
+
+        lignes = _entete("finance_requetes_total", "counter", "Requêtes traitées par route et statut")
+        for (route, methode, statut), n in sorted(agregat.requetes.items()):
+            lignes.append(f'finance_requetes_total{{{_labels(route=route, methode=methode, statut=statut)}}} {n}')
+        lignes += _entete("finance_requete_duree_secondes", "histogram", "Durée totale des requêtes")
+        for route, h in sorted(agregat.durees.items()):
+            lignes += _histogramme("finance_requete_duree_secondes", h, route=route)
+        lignes += _entete("finance_etape_duree_secondes", "histogram", "Durée exclusive de chaque étape")
+        for (route, nom), h in sorted(agregat.etapes.items()):
+            lignes += _histogramme("finance_etape_duree_secondes", h, route=route, etape=nom)
+        for nom, type_metrique, aide, _ in releve:
+            lignes += famille(nom, type_metrique, aide, [
+                (dict(labels), v) for (n, labels), v in sorted(agregat.valeurs.items()) if n == nom
+            ])
+        return lignes, agregat
+
+
+def _lire(chemin):
+    try:
+        with open(chemin, "rb") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # fichier supprimé entre-temps (worker archivé)
+        return None
+
+
+def _supprimer(chemin):
+    try:
+        os.remove(chemin)
+    except FileNotFoundError:
+        pass
+
+
+def _echapper(valeur):
+    return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{k}="{_echapper(v)}"' for k, v in labels.items())
+
+
+def _entete(nom, type_metrique, aide):
+    return [f"# HELP {nom} {aide}", f"# TYPE {nom} {type_metrique}"]
+
+
+def _histogramme(nom, h, **labels):
+    base = _labels(**labels)
+    lignes = []
+    cumul = 0
+    for borne, n in zip(BUCKETS, h.compteurs):
+        cumul += n
+        lignes.append(f'{nom}_bucket{{{base},le="{borne}"}} {cumul}')
+    lignes.append(f'{nom}_bucket{{{base},le="+Inf"}} {h.total}')
+    lignes.append(f"{nom}_sum{{{base}}} {h.somme:.6f}")
+    lignes.append(f"{nom}_count{{{base}}} {h.total}")
+    return lignes
+
+
+def famille(nom, type_metrique, aide, valeurs):
+    """valeurs : [(dict de labels, valeur)] -> lignes d'une métrique."""
+    lignes = _entete(nom, type_metrique, aide)
+    for labels, valeur in valeurs:
+        lignes.append(f"{nom}{{{_labels(**labels)}}} {valeur}" if labels else f"{nom} {valeur}")
+    return lignes
+
+
+metrics = Metrics()
@@ -0,0 +1,100 @@
+import numpy as np
+
+from .engine import simulate_dca
+
+# ===============================
+#  PROJECTION MONTE CARLO
+# ===============================
+# Les trajectoires sont générées par paquets (taille déduite d'un budget
+# mémoire) et passées au moteur DCA vectorisé. Les percentiles par mois
+# sont accumulés en flux dans un histogramme du log de la valeur : la
+# mémoire reste fixe quel que soit le nombre de trajectoires.
+
+QUANTILES = (5, 25, 50, 75, 95)
+METHODES = ("bootstrap", "gbm")
+
+
+def generer_rendements(rng, rendements, n, mois, methode="bootstrap", taille_bloc=12):
+    if methode == "gbm":
+        log_r = np.log1p(rendements)
+        mu, sigma = log_r.mean(), log_r.std(ddof=1)
+        return np.expm1(rng.normal(mu, sigma, size=(n, mois)))
+
+    # bootstrap par blocs : conserve l'autocorrélation courte des rendements
+    taille_bloc = max(1, min(taille_bloc, len(rendements)))
+    nb_blocs = -(-mois // taille_bloc)
+    debuts = rng.integers(0, len(rendements) - taille_bloc + 1, size=(n, nb_blocs))
+    indices = (debuts[:, :, None] + np.arange(taille_bloc)).reshape(n, -1)[:, :mois]
+    return rendements[indices]
+
+
+class HistogrammeFlux:
+    def __init__(self, bas, haut, bins=2048):
+        self.bas = bas
+        self.largeur = np.maximum(haut - bas, 1e-9) / bins
+        self.bins = bins
+        self.counts = np.zeros((len(bas), bins), dtype=np.int64)
+        self.total = 0
+
+    def ajouter(self, x):
+        idx = np.clip(((x - self.bas) / self.largeur).astype(np.int64), 0, self.bins - 1)
+        idx += np.arange(x.shape[1]) * self.bins
+        self.counts += np.bincount(idx.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+        self.total += x.shape[0]
+
+    def quantiles(self, qs):
+        cum = np.cumsum(self.counts, axis=1)
+        resultats = {}
+        for q in qs:
+            cible = q / 100 * self.total
+            idx = (cum >= cible).argmax(axis=1)
+            lignes = np.arange(len(idx))
+            precedent = np.where(idx > 0, cum[lignes, idx - 1], 0)
+            dans_bin = self.counts[lignes, idx]
+            fraction = np.where(dans_bin > 0, (cible - precedent) / np.maximum(dans_bin, 1), 0.0)
+            resultats[q] = self.bas + (idx + fraction) * self.largeur
+        return resultats
+
+
+def projection(rendements, montant_initial, contribution, step, frais, mois, n_trajectoires,
+               methode="bootstrap", taille_bloc=12, graine=None, objectif=None,
+               budget_mb=64, bins=2048):
+    rng = np.random.default_rng(graine)
+    rendements = np.asarray(rendements, dtype=float)
+
+    # ~8 tableaux temporaires (trajectoires × mois) en float64 par paquet
+    paquet = max(1, min(n_trajectoires, int(budget_mb * 1024 * 1024 // ((mois + 1) * 8 * 8))))
+
+    histogramme = None
+    atteint = 0
+    somme_finale = 0.0
+    investi = None
+    restant = n_trajectoires
+    while restant > 0:
+        n = min(paquet, restant)
+        r = generer_rendements(rng, rendements, n, mois, methode, taille_bloc)
+        prix = np.concatenate([np.ones((n, 1)), np.cumprod(1 + r, axis=1)], axis=1)
+        valeurs, investi = simulate_dca(prix, montant_initial, contribution, step, frais)
+        log_v = np.log(np.maximum(valeurs, 1e-12))
+
+        if histogramme is None:
+            # bornes fixées sur le premier paquet, élargies de moitié de chaque côté
+            bas, haut = log_v.min(axis=0), log_v.max(axis=0)
+            marge = (haut - bas) * 0.5
+            histogramme = HistogrammeFlux(bas - marge, haut + marge, bins)
+        histogramme.ajouter(log_v)
+
+        finales = valeurs[:, -1]
+        somme_finale += float(finales.sum())
+        if objectif is not None:
+            atteint += int((finales >= objectif).sum())
+        restant -= n
+
+    bandes = {q: np.exp(v) for q, v in histogramme.quantiles(QUANTILES).items()}
+    return {
+        "bandes": bandes,
+        "esperance_finale": somme_finale / n_trajectoires,
+        "probabilite_objectif": atteint / n_trajectoires if objectif is not None else None,
+        "montant_investi": float(investi),
+        "taille_paquet": paquet,
+    }
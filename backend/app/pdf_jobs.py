@@ -0,0 +1,228 @@
+import atexit
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .disque import Purgeur, ecrire_atomique
+
+# ===============================
+#  EXPORTS PDF ASYNCHRONES
+# ===============================
+# POST /export/pdf avec "async" renvoie un job_id ; le rendu ReportLab
+# tourne dans un pool de processus (styles construits à l'initialisation
+# de chaque processus) et le client interroge l'état puis télécharge le
+# fichier. Les PDF sont mis en cache par empreinte des entrées : une
+# demande identique est servie sans nouveau rendu, et une demande
+# identique en cours réutilise le même calcul.
+# Avec PDF_JOBS_DIR (serveur multi-workers), l'état et le fichier de chaque
+# job sont aussi écrits sur disque : n'importe quel worker peut répondre
+# au suivi du job.
+
+EN_COURS, TERMINE, ERREUR = "en_cours", "termine", "erreur"
+
+
+def empreinte(payload):
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+
+# ReportLab n'est importé qu'au premier rendu (ou à l'initialisation d'un
+# processus du pool), pas au démarrage de l'application
+def _init_processus():
+    from .reports import styles
+
+    styles()
+
+
+def _rendu(payload):
+    from .reports import build_pdf
+
+    return build_pdf(**payload)
+
+
+class PdfJobs:
+    def __init__(self, workers=2, cache_mb=64, ttl=900):
+        self.workers = workers
+        self.max_bytes = int(cache_mb * 1024 * 1024)
+        self.ttl = ttl
+        self._pool = None
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._en_vol = {}
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self.rendus = 0
+        self.hits = 0
+        self.dossier = None
+        self._purgeur = Purgeur()
+
+    def init_app(self, app):
+        self.workers = app.config["PDF_WORKERS"]
+        self.max_bytes = int(app.config["PDF_CACHE_MB"] * 1024 * 1024)
+        self.ttl = app.config["PDF_JOBS_TTL"]
+        self.dossier = app.config["PDF_JOBS_DIR"] or None
+        if self.dossier:
+            os.makedirs(self.dossier, exist_ok=True)
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn : pas de fork d'un processus qui porte déjà des threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_processus,
+            )
+            atexit.register(self._pool.shutdown, wait=False, cancel_futures=True)
+        return self._pool
+
+    # ---------- cache des PDF ----------
+    def _cache_get(self, cle):
+        pdf = self._cache.get(cle)
+        if pdf is not None:
+            self._cache.move_to_end(cle)
+            self.hits += 1
+        return pdf
+
+    def _cache_put(self, cle, pdf):
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            if cle in self._cache:
+                return
+            self._cache[cle] = pdf
+            self._bytes += len(pdf)
+            while self._bytes > self.max_bytes:
+                _, ancien = self._cache.popitem(last=False)
+                self._bytes -= len(ancien)
+
+    def _purger(self, now):
+        for job_id in [j for j, job in self._jobs.items() if job["statut"] != EN_COURS and now - job["cree"] > self.ttl]:
+            del self._jobs[job_id]
+
+    # ---------- partage entre workers ----------
+    def _publier(self, job_id, job):
+        if not self.dossier:
+            return
+        base = os.path.join(self.dossier, job_id)
+        # le fichier avant l'état : un job "termine" a toujours son PDF
+        if job["statut"] == TERMINE:
+            ecrire_atomique(f"{base}.pdf", job["pdf"])
+        etat = {"cree": job["cree"], "statut": job["statut"], "erreur": job["erreur"]}
+        ecrire_atomique(f"{base}.json", json.dumps(etat).encode())
+
+    def _lire_etat(self, job_id):
+        if not self.dossier or not job_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.dossier, f"{job_id}.json"), encoding="utf-8") as f:
+                etat = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if etat["statut"] != EN_COURS and time.time() - etat["cree"] > self.ttl:
+            return None
+        return etat
+
+    # ---------- rendu ----------
+    def rendre(self, payload):
+        """Rendu synchrone, mais passant par le cache."""
+        cle = empreinte(payload)
+        with self._lock:
+            pdf = self._cache_get(cle)
+        if pdf is None:
+            pdf = _rendu(payload)
+            self.rendus += 1
+            self._cache_put(cle, pdf)
+        return pdf
+
+    def soumettre(self, payload):
+        cle = empreinte(payload)
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._purger(now)
+            job = {"cle": cle, "cree": now, "statut": EN_COURS, "erreur": None}
+            self._jobs[job_id] = job
+            pdf = self._cache_get(cle)
+            if pdf is not None:
+                job["pdf"] = pdf
+                job["statut"] = TERMINE
+            else:
+                future = self._en_vol.get(cle)
+                nouveau = future is None
+                if nouveau:
+                    future = self._en_vol[cle] = self._executor().submit(_rendu, payload)
+                    self.rendus += 1
+        if self.dossier:
+            self._purgeur.purger(self.dossier, self.ttl, now)
+        # publié avant les rappels, qui écriront l'état final
+        self._publier(job_id, job)
+        if pdf is not None:
+            return job_id
+        # hors verrou : un futur déjà terminé exécute le rappel immédiatement
+        if nouveau:
+            future.add_done_callback(lambda f: self._fin(cle, f))
+        future.add_done_callback(lambda f: self._fin_job(job_id, job, f))
+        return job_id
+
+    def _fin(self, cle, future):
+        if future.exception() is None:
+            self._cache_put(cle, future.result())
+        with self._lock:
+            self._en_vol.pop(cle, None)
+
+    def _fin_job(self, job_id, job, future):
+        erreur = future.exception()
+        with self._lock:
+            if erreur is None:
+                # le PDF reste attaché au job même s'il sort du cache
+                job["pdf"] = future.result()
+                job["statut"] = TERMINE
+            else:
+                job["erreur"] = str(erreur)
+                job["statut"] = ERREUR
+        self._publier(job_id, job)
+
+    def etat(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            # job soumis à un autre worker
+            job = self._lire_etat(job_id)
+            if job is None:
+                return None
+        return {"job_id": job_id, "statut": job["statut"], "erreur": job["erreur"]}
+
+    def fichier(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job["pdf"] if job["statut"] == TERMINE else None
+        etat = self._lire_etat(job_id)
+        if etat is None or etat["statut"] != TERMINE:
+            return None
+        try:
+            with open(os.path.join(self.dossier, f"{job_id}.pdf"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def stats(self):
+        with self._lock:
+            statuts = [job["statut"] for job in self._jobs.values()]
+            return {
+                "jobs": len(statuts),
+                "en_cours": statuts.count(EN_COURS),
+                "rendus": self.rendus,
+                "hits": self.hits,
+                "cache_entrees": len(self._cache),
+                "cache_mb": round(self._bytes / (1024 * 1024), 3),
+                "workers": self.workers,
+            }
+
+
+pdf_jobs = PdfJobs()
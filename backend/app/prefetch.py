@@ -0,0 +1,126 @@
+import logging
+import multiprocessing
+import threading
+import time
+
+from .price_store import price_store
+from .series_cache import series_cache
+
+# ===============================
+#  PRÉCHARGEMENT DE L'UNIVERSE
+# ===============================
+# Au démarrage puis toutes les PREFETCH_INTERVAL secondes, les tickers de
+# UNIVERSE (plus l'indice de comparaison) sont demandés au stockage des
+# cours en un seul appel (une seule requête au fournisseur pour toutes les
+# plages manquantes) et leurs séries mensuelles / trimestrielles placées
+# dans le cache. Le drapeau `ready` passe à vrai dès qu'un passage a chargé
+# au moins un ticker ; les tickers en échec sont listés dans `echecs`. Un
+# passage sans aucun cours (fournisseur injoignable) est relancé après
+# PREFETCH_RELANCE secondes, `ready` restant faux.
+# Sous un serveur pré-forké (gunicorn, preload_app), le premier passage a
+# lieu dans le processus maître avant le fork (prechauffer) : les workers
+# héritent du cache, puis chacun relance sa boucle après le fork.
+
+logger = logging.getLogger(__name__)
+
+BENCHMARKS = ("ACWI", "URTH")
+FREQUENCES = ("ME", "QE", None)  # None : séances brutes (résolution quotidienne)
+
+
+class Prefetcher:
+    def __init__(self):
+        self.ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.interval = 3600
+        self.relance = 60
+        self.start = "2015-01-01"
+        self.end = "2025-12-31"
+        self.dernier_passage = None
+        self.echecs = []
+        self.actif = False
+
+    def init_app(self, app, demarrer=True):
+        self.interval = app.config["PREFETCH_INTERVAL"]
+        self.relance = app.config["PREFETCH_RELANCE"]
+        self.start = f"{app.config['PREFETCH_DATE_DEBUT']}-01-01"
+        self.end = f"{app.config['PREFETCH_DATE_FIN']}-12-31"
+        # les processus du pool d'export PDF réimportent l'application
+        self.actif = app.config["PREFETCH_ENABLED"] and multiprocessing.parent_process() is None
+        if not self.actif:
+            self.ready.set()
+        elif demarrer:
+            self.demarrer()
+
+    def tickers(self):
+        from .routes import UNIVERSE
+
+        tickers = [t for categorie in UNIVERSE.values() for t in categorie]
+        return list(dict.fromkeys(tickers + list(BENCHMARKS)))
+
+    def passage(self):
+        from .routes import reechantillonner
+
+        tickers = self.tickers()
+        bruts = price_store.get_many(tickers, self.start, self.end, auto_adjust=True)
+        charges = []
+        for ticker in tickers:
+            prix = bruts.get(ticker)
+            if prix is None or prix.empty:
+                continue
+            for freq in FREQUENCES:
+                series_cache.put((ticker, self.start, self.end, freq), reechantillonner(prix, freq))
+            charges.append(ticker)
+        self.echecs = [t for t in tickers if t not in charges]
+        self.dernier_passage = time.time()
+        if not charges:
+            logger.error("Préchargement : aucun cours chargé", extra={"echecs": self.echecs})
+            return False
+        if self.echecs:
+            logger.warning("Préchargement incomplet", extra={"echecs": self.echecs})
+        self.ready.set()
+        return True
+
+    def _passage_protege(self):
+        try:
+            return self.passage()
+        except Exception:
+            logger.exception("Erreur de préchargement")
+            return False
+
+    def _boucle(self, attente):
+        while not self._stop.wait(attente):
+            ok = self._passage_protege()
+            attente = self.interval if ok else min(self.relance, self.interval)
+
+    def demarrer(self, attente=0):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._boucle, args=(attente,), name="prefetcher", daemon=True)
+        self._thread.start()
+
+    def prechauffer(self):
+        # processus maître, avant le fork : passage synchrone, sans thread
+        if self.actif:
+            self._passage_protege()
+
+    def apres_fork(self):
+        # le thread du maître n'existe pas dans le worker ; un cache déjà
+        # chaud n'est rafraîchi qu'après `interval`, sinon nouvel essai immédiat
+        self._thread = None
+        if self.actif:
+            self.demarrer(attente=self.interval if self.ready.is_set() else 0)
+
+    def arreter(self):
+        self._stop.set()
+
+    def etat(self):
+        return {
+            "ready": self.ready.is_set(),
+            "dernier_passage": self.dernier_passage,
+            "echecs": self.echecs,
+        }
+
+
+prefetcher = Prefetcher()
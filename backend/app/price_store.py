@@ -0,0 +1,301 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .fournisseurs import Yahoo, creer_fournisseur
+from .metrics import etape
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrous limités aux threads du processus
+    fcntl = None
+
+# ===============================
+#  STOCKAGE LOCAL DES COURS
+# ===============================
+# Un fichier .npy (tableau structuré date/close) par ticker, lu en
+# mémoire mappée, plus un .json de métadonnées :
+#   - covered_from / covered_to : plage [début, fin) déjà demandée au fournisseur
+#   - fetched_at : horodatage du dernier rafraîchissement de la fin de série
+# Seules les portions manquantes sont téléchargées ; la fin de série n'est
+# rafraîchie qu'une fois le TTL expiré.
+# Plusieurs processus (workers gunicorn) partagent le même dossier : les
+# fichiers mappés sont lus depuis le cache de pages du système, sans copie
+# par processus. Chaque ticker a un fichier .lock (flock) : un seul
+# processus télécharge, les autres attendent puis relisent les
+# métadonnées et trouvent la plage couverte. Un changement de version
+# écrit par un autre processus invalide les caches locaux (synchroniser).
+
+ROW_DTYPE = np.dtype([("date", "<i8"), ("close", "<f8")])
+
+logger = logging.getLogger(__name__)
+
+
+def normaliser_ticker(ticker):
+    # "acwi " et "ACWI" désignent les mêmes cours : même fichier, mêmes clés de cache
+    return ticker.upper().strip()
+
+
+def _to_day(value):
+    return int(np.datetime64(str(value)[:10], "D").astype(np.int64))
+
+
+def _day_str(day):
+    return str(np.datetime64(int(day), "D"))
+
+
+def _today():
+    return int(np.datetime64("today", "D").astype(np.int64))
+
+
+class PriceStore:
+    def __init__(self, root=None, ttl=6 * 3600):
+        self.root = root
+        self.ttl = ttl
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        # fonctions appelées avec le ticker dès que ses cours changent
+        self.abonnes = []
+        # source des plages manquantes (fournisseurs.py)
+        self.fournisseur = Yahoo()
+        # (mtime_ns, version) des métadonnées vues par ce processus
+        self._vus = {}
+        self._stats_lock = threading.Lock()
+        self.telechargements = 0
+        self.erreurs = 0
+
+    def init_app(self, app):
+        self.root = app.config["PRICE_STORE_DIR"]
+        self.ttl = app.config["PRICE_STORE_TTL"]
+        self.fournisseur = creer_fournisseur(app.config)
+        os.makedirs(self.root, exist_ok=True)
+
+    # ---------- Fichiers ----------
+    def _key(self, ticker, auto_adjust):
+        key = normaliser_ticker(ticker).replace(os.sep, "_").replace("/", "_")
+        return key if auto_adjust else f"{key}@raw"
+
+    def _paths(self, key):
+        base = os.path.join(self.root, key)
+        return f"{base}.npy", f"{base}.json"
+
+    def _lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @contextmanager
+    def _verrou(self, key):
+        # threads du processus, puis processus de l'hôte
+        with self._lock(key):
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, f"{key}.lock"), "a+b") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_meta(self, key):
+        _, meta_path = self._paths(key)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_rows(self, key, mmap=True):
+        data_path, _ = self._paths(key)
+        if not os.path.exists(data_path):
+            return None
+        return np.load(data_path, mmap_mode="r" if mmap else None)
+
+    def _write(self, key, rows, meta):
+        data_path, meta_path = self._paths(key)
+        tmp_data, tmp_meta = f"{data_path}.tmp", f"{meta_path}.tmp"
+        with open(tmp_data, "wb") as f:
+            np.save(f, rows)
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_data, data_path)
+        os.replace(tmp_meta, meta_path)
+
+    # ---------- Mise à jour ----------
+    @staticmethod
+    def _to_rows(serie):
+        rows = np.empty(len(serie), dtype=ROW_DTYPE)
+        rows["date"] = serie.index.values.astype("datetime64[D]").astype(np.int64)
+        rows["close"] = serie.values.astype(float)
+        return rows
+
+    @staticmethod
+    def _merge(old, new):
+        if old is None or not len(old):
+            return new
+        if not len(new):
+            return old
+        rows = np.concatenate([old, new])
+        # les lignes récentes (fin de séance consolidée) remplacent les anciennes
+        _, last = np.unique(rows["date"][::-1], return_index=True)
+        return rows[len(rows) - 1 - last]
+
+    def _missing(self, meta, start_day, horizon, now):
+        if meta is None:
+            return [(start_day, horizon)]
+        plages = []
+        if start_day < meta["covered_from"]:
+            plages.append((start_day, meta["covered_from"]))
+        # un trou historique se comble toujours ; la séance en cours suit le TTL
+        if horizon > meta["covered_to"] and (
+            meta["covered_to"] < _today() or now - meta["fetched_at"] > self.ttl
+        ):
+            # on repart de la dernière séance connue pour la consolider
+            plages.append((min(meta["last"], meta["covered_to"]), horizon))
+        return plages
+
+    def _update(self, ticker, key, meta, serie, lo, hi, now):
+        new = self._to_rows(serie) if serie is not None else np.empty(0, dtype=ROW_DTYPE)
+        # réponse vide (limite de débit, réseau...) : rien n'est marqué
+        # couvert ni rafraîchi, la plage sera redemandée à la prochaine lecture
+        if not len(new):
+            return
+        if meta is None:
+            rows = new
+            meta = {"covered_from": lo, "covered_to": hi, "version": 1}
+            change = True
+        else:
+            # copie en mémoire : le fichier mappé va être remplacé
+            old = self._read_rows(key, mmap=False)
+            rows = self._merge(old, new)
+            change = not np.array_equal(old, rows)
+            meta["covered_from"] = min(meta["covered_from"], lo)
+            meta["covered_to"] = max(meta["covered_to"], hi)
+            if change:
+                meta["version"] = meta.get("version", 0) + 1
+        meta["fetched_at"] = now
+        meta["last"] = int(rows["date"][-1])
+        self._write(key, rows, meta)
+        self._noter(key, meta)
+        if change:
+            self._notifier(ticker)
+
+    # ---------- Synchronisation entre processus ----------
+    def _noter(self, key, meta):
+        _, meta_path = self._paths(key)
+        self._vus[key] = (os.stat(meta_path).st_mtime_ns, meta.get("version", 0))
+
+    def _notifier(self, ticker):
+        for abonne in self.abonnes:
+            abonne(ticker)
+
+    def synchroniser(self, tickers, auto_adjust=True):
+        """Invalide les caches locaux des tickers dont un autre processus a
+        changé les cours. Un stat par ticker ; le .json n'est relu que si
+        son mtime a bougé."""
+        for ticker in tickers:
+            key = self._key(ticker, auto_adjust)
+            _, meta_path = self._paths(key)
+            try:
+                mtime = os.stat(meta_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            vu = self._vus.get(key)
+            if vu is not None and vu[0] == mtime:
+                continue
+            meta = self._read_meta(key)
+            if meta is None:
+                continue
+            version = meta.get("version", 0)
+            self._vus[key] = (mtime, version)
+            if vu is not None and vu[1] != version:
+                self._notifier(ticker)
+
+    # ---------- Lecture ----------
+    @staticmethod
+    def _window(rows, start_day, end_day):
+        if rows is None or not len(rows):
+            return None
+        lo, hi = np.searchsorted(rows["date"], [start_day, end_day])
+        window = rows[lo:hi]
+        if not len(window):
+            return None
+        index = pd.DatetimeIndex(window["date"].astype("datetime64[D]").astype("datetime64[ns]"), name="Date")
+        return pd.Series(np.array(window["close"]), index=index, name="Close")
+
+    def get_many(self, tickers, start, end, auto_adjust=True):
+        tickers = list(dict.fromkeys(tickers))
+        keys = {t: self._key(t, auto_adjust) for t in tickers}
+        start_day, end_day = _to_day(start), _to_day(end)
+        horizon = min(end_day, _today() + 1)
+        now = time.time()
+
+        with ExitStack() as stack:
+            # ordre fixe : pas d'interblocage entre threads ni entre processus
+            for key in sorted(set(keys.values())):
+                stack.enter_context(self._verrou(key))
+
+            # relu sous verrou : un autre processus a pu télécharger entre-temps
+            self.synchroniser(tickers, auto_adjust)
+
+            metas = {t: self._read_meta(keys[t]) for t in tickers}
+            plans = {t: self._missing(metas[t], start_day, horizon, now) for t in tickers}
+            a_charger = [t for t in tickers if plans[t]]
+
+            if a_charger:
+                # une seule requête couvrant toutes les plages manquantes
+                lo = min(debut for t in a_charger for debut, _ in plans[t])
+                hi = max(fin for t in a_charger for _, fin in plans[t])
+                with self._stats_lock:
+                    self.telechargements += 1
+                try:
+                    with etape("telechargement"):
+                        series = self.fournisseur.telecharger(a_charger, _day_str(lo), _day_str(hi), auto_adjust)
+                    # yfinance ne lève pas d'exception sur un ticker en échec
+                    # (limite de débit, réseau, ticker retiré) : il est absent du résultat
+                    manquants = [t for t in a_charger if series.get(t) is None or series[t].empty]
+                    if manquants:
+                        with self._stats_lock:
+                            self.erreurs += len(manquants)
+                        logger.warning("Cours absents de la réponse du fournisseur", extra={
+                            "tickers": manquants, "debut": _day_str(lo), "fin": _day_str(hi),
+                        })
+                    for t in a_charger:
+                        self._update(t, keys[t], metas[t], series.get(t), lo, hi, now)
+                except Exception:
+                    # fournisseur indisponible : on sert ce qui est déjà sur disque
+                    with self._stats_lock:
+                        self.erreurs += len(a_charger)
+                    logger.warning("Téléchargement échoué", exc_info=True, extra={"tickers": a_charger})
+
+            rows = {t: self._read_rows(keys[t]) for t in tickers}
+
+        return {t: self._window(rows[t], start_day, end_day) for t in tickers}
+
+    def get(self, ticker, start, end, auto_adjust=True):
+        return self.get_many([ticker], start, end, auto_adjust)[ticker]
+
+    def version(self, ticker, start, end, auto_adjust=True):
+        # None si la plage demandée nécessite encore un téléchargement
+        meta = self._read_meta(self._key(ticker, auto_adjust))
+        start_day, end_day = _to_day(start), _to_day(end)
+        horizon = min(end_day, _today() + 1)
+        if meta is None or self._missing(meta, start_day, horizon, time.time()):
+            return None
+        return meta.get("version", 0)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "fournisseur": self.fournisseur.nom,
+                "telechargements": self.telechargements,
+                "erreurs": self.erreurs,
+            }
+
+
+price_store = PriceStore()
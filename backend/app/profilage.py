@@ -0,0 +1,246 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import g, request
+
+# ===============================
+#  PROFILAGE À LA DEMANDE
+# ===============================
+# Désactivé par défaut (PROFILAGE_ACTIF). Une fois activé :
+#   - en-tête X-Profile ou ?profile= : "cprofile" (déterministe, format
+#     pstats) ou "echantillons" (pile du thread relevée toutes les
+#     PROFILAGE_INTERVALLE_MS, format "collapsed" des flamegraphs) ;
+#   - PROFILAGE_SEUIL_MS > 0 : une fraction PROFILAGE_TAUX des requêtes,
+#     tirées au hasard, est échantillonnée et son profil conservé si elle
+#     dépasse le seuil. Une requête suivie réveille le thread
+#     d'échantillonnage toutes les PROFILAGE_INTERVALLE_MS, et chaque relevé
+#     parcourt les piles de tous les threads du processus : de l'ordre de
+#     10 % de temps CPU en plus sur une requête /simulate de quelques ms
+#     (1 vCPU, intervalle de 5 ms), davantage avec un intervalle plus court
+#     ou beaucoup de threads. Avec un taux de 0.1, ce coût moyen est divisé
+#     par dix et une route lente reste repérée après quelques dizaines
+#     d'appels.
+# Les profils sont écrits dans PROFILAGE_DIR (partagé entre workers) et
+# annoncés par l'en-tête X-Profile-Id ; GET /profils/<id> les renvoie.
+# Sans en-tête ni seuil, une requête ne paie qu'une lecture d'en-tête.
+# Pour une réponse en flux, seule la préparation est profilée.
+
+logger = logging.getLogger(__name__)
+
+CPROFILE, ECHANTILLONS = "cprofile", "echantillons"
+EXTENSIONS = {CPROFILE: "prof", ECHANTILLONS: "txt"}
+
+
+def pile_repliee(frame):
+    # "module.py:fonction;module.py:fonction;..." de la racine vers le sommet
+    noms = []
+    while frame is not None:
+        code = frame.f_code
+        noms.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(noms))
+
+
+class Echantillonneur:
+    """Un seul thread relève les piles des threads suivis ; il dort tant
+    qu'aucune requête n'est suivie."""
+
+    def __init__(self, intervalle=0.005):
+        self.intervalle = intervalle
+        self._cibles = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def suivre(self, ident):
+        piles = Counter()
+        with self._cond:
+            self._cibles[ident] = piles
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._boucle, name="profilage", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return piles
+
+    def arreter(self, ident):
+        with self._cond:
+            return self._cibles.pop(ident, None)
+
+    def _boucle(self):
+        while True:
+            with self._cond:
+                while not self._cibles:
+                    self._cond.wait()
+            time.sleep(self.intervalle)
+            frames = sys._current_frames()
+            with self._cond:
+                for ident, piles in self._cibles.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        piles[pile_repliee(frame)] += 1
+            del frames
+
+
+class Profileur:
+    def __init__(self):
+        self.actif = False
+        self.dossier = None
+        self.seuil = 0.0
+        self.taux = 1.0
+        self.max_profils = 50
+        self.echantillonneur = Echantillonneur()
+        # un seul cProfile à la fois par processus
+        self._cprofile = threading.Lock()
+
+    def init_app(self, app):
+        self.actif = app.config["PROFILAGE_ACTIF"]
+        self.dossier = app.config["PROFILAGE_DIR"]
+        self.seuil = app.config["PROFILAGE_SEUIL_MS"] / 1000
+        self.taux = app.config["PROFILAGE_TAUX"]
+        self.max_profils = app.config["PROFILAGE_MAX"]
+        self.echantillonneur.intervalle = app.config["PROFILAGE_INTERVALLE_MS"] / 1000
+        if self.actif:
+            os.makedirs(self.dossier, exist_ok=True)
+
+    # ---------- Cycle de la requête ----------
+    def debut(self):
+        if not self.actif:
+            return
+        mode = request.headers.get("X-Profile") or request.args.get("profile")
+        if mode not in EXTENSIONS:
+            if not self.seuil or random.random() >= self.taux:
+                return
+            mode = None
+
+        if mode == CPROFILE and self._cprofile.acquire(blocking=False):
+            profil = cProfile.Profile()
+            try:
+                profil.enable()
+            except ValueError:
+                # un autre outil de profilage occupe déjà l'interpréteur
+                self._cprofile.release()
+                mode = ECHANTILLONS
+            else:
+                g.profil = (CPROFILE, profil, True, time.perf_counter())
+                return
+        elif mode == CPROFILE:
+            mode = ECHANTILLONS
+
+        piles = self.echantillonneur.suivre(threading.get_ident())
+        g.profil = (ECHANTILLONS, piles, mode is not None, time.perf_counter())
+
+    def _arreter(self):
+        mode, profil, demande, t0 = g.pop("profil")
+        if mode == CPROFILE:
+            profil.disable()
+            self._cprofile.release()
+        else:
+            profil = self.echantillonneur.arreter(threading.get_ident())
+        return mode, profil, demande, time.perf_counter() - t0
+
+    def fin(self, response):
+        if "profil" not in g:
+            return response
+        mode, profil, demande, duree = self._arreter()
+        if not demande and duree < self.seuil:
+            return response
+
+        meta = {
+            "id": uuid.uuid4().hex,
+            "mode": mode,
+            "declencheur": "demande" if demande else "seuil",
+            "route": request.url_rule.rule if request.url_rule is not None else None,
+            "methode": request.method,
+            "chemin": request.full_path.rstrip("?"),
+            "statut": response.status_code,
+            "duree_ms": round(duree * 1000, 2),
+            "date": time.time(),
+        }
+        try:
+            self._ecrire(meta, profil)
+        except OSError:
+            logger.exception("Écriture du profil impossible")
+            return response
+        if not demande:
+            logger.warning("Requête lente profilée", extra={k: meta[k] for k in ("id", "route", "duree_ms")})
+        response.headers["X-Profile-Id"] = meta["id"]
+        response.headers["X-Profile-Url"] = f"/profils/{meta['id']}"
+        return response
+
+    def nettoyer(self):
+        # exception non rattrapée : libère le profileur sans rien conserver
+        if "profil" in g:
+            self._arreter()
+
+    # ---------- Stockage ----------
+    def _chemins(self, profil_id, mode):
+        base = os.path.join(self.dossier, profil_id)
+        return f"{base}.json", f"{base}.{EXTENSIONS[mode]}"
+
+    def _ecrire(self, meta, profil):
+        chemin_meta, chemin = self._chemins(meta["id"], meta["mode"])
+        if meta["mode"] == CPROFILE:
+            profil.dump_stats(chemin)
+        else:
+            meta["echantillons"] = sum(profil.values())
+            meta["intervalle_ms"] = self.echantillonneur.intervalle * 1000
+            with open(chemin, "w", encoding="utf-8") as f:
+                f.writelines(f"{pile} {n}\n" for pile, n in profil.most_common())
+        with open(chemin_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        self._purger()
+
+    def _purger(self):
+        metas = sorted(
+            (e for e in os.scandir(self.dossier) if e.name.endswith(".json")),
+            key=lambda e: e.stat().st_mtime,
+        )
+        for entree in metas[:max(len(metas) - self.max_profils, 0)]:
+            base = entree.path[:-len(".json")]
+            for extension in ("json", *EXTENSIONS.values()):
+                try:
+                    os.remove(f"{base}.{extension}")
+                except FileNotFoundError:
+                    pass
+
+    def liste(self):
+        profils = []
+        for entree in os.scandir(self.dossier):
+            if entree.name.endswith(".json"):
+                try:
+                    with open(entree.path, encoding="utf-8") as f:
+                        profils.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(profils, key=lambda m: m["date"], reverse=True)
+
+    def lire(self, profil_id):
+        """(meta, chemin du profil) ou None."""
+        if not profil_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.dossier, f"{profil_id}.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        chemin = self._chemins(profil_id, meta["mode"])[1]
+        return (meta, chemin) if os.path.exists(chemin) else None
+
+    @staticmethod
+    def resume(chemin, lignes=40):
+        # rapport texte pstats, trié par temps cumulé
+        sortie = io.StringIO()
+        pstats.Stats(chemin, stream=sortie).sort_stats("cumulative").print_stats(lignes)
+        return sortie.getvalue()
+
+
+profileur = Profileur()
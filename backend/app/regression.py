@@ -0,0 +1,69 @@
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+# ===============================
+#  TENDANCE LINÉAIRE (MCO FERMÉ, PAR LOTS)
+# ===============================
+# Régression y = a + b·t sur t = 0..n-1, colonne par colonne d'une matrice
+# (périodes × tickers). Les NaN (historiques de longueurs différentes)
+# sont exclus : t est le rang parmi les valeurs présentes, comme après un
+# dropna() par ticker. b = Σ(t - t̄)(y - ȳ) / Σ(t - t̄)², a = ȳ - b·t̄.
+
+HORIZON = 12
+
+Tendance = namedtuple(
+    "Tendance",
+    ["beta", "alpha", "tendance", "futur", "ecart_type", "moyenne", "moyenne_future",
+     "borne_inf", "borne_sup", "n"],
+)
+
+
+@lru_cache(maxsize=None)
+def t_critique(ddl, niveau=0.975):
+    # quantile de Student via scipy.special (identique à scipy.stats.t.ppf),
+    # importé au premier appel : scipy.stats coûte ~0,7 s au démarrage
+    from scipy.special import stdtrit
+
+    return float(stdtrit(ddl, niveau))
+
+
+def tendance_lineaire(y, horizon=HORIZON):
+    """y : vecteur (n,) ou matrice (n, k). Renvoie des tableaux par colonne
+    (scalaires si y est un vecteur)."""
+    y = np.asarray(y, dtype=float)
+    vecteur = y.ndim == 1
+    if vecteur:
+        y = y[:, None]
+
+    present = ~np.isnan(y)
+    n = present.sum(axis=0)
+    t = np.where(present, np.cumsum(present, axis=0) - 1, 0).astype(float)
+    y0 = np.where(present, y, 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_moy = (n - 1) / 2
+        y_moy = y0.sum(axis=0) / n
+        tc = np.where(present, t - t_moy, 0.0)
+        beta = (tc * y0).sum(axis=0) / (tc * tc).sum(axis=0)
+        alpha = y_moy - beta * t_moy
+
+        tendance = np.where(present, alpha + beta * t, np.nan)
+        futur = alpha + beta * (n + np.arange(horizon)[:, None])
+
+        residus = np.where(present, y - tendance, 0.0)
+        r_moy = residus.sum(axis=0) / n
+        ecart_type = np.sqrt((np.where(present, residus - r_moy, 0.0) ** 2).sum(axis=0) / (n - 1))
+
+        moyenne_future = futur.mean(axis=0)
+        t_crit = np.array([t_critique(max(int(m) - 1, 1)) for m in n])
+        marge = t_crit * ecart_type / np.sqrt(n)
+
+    resultat = Tendance(
+        beta, alpha, tendance, futur, ecart_type, y_moy, moyenne_future,
+        moyenne_future - marge, moyenne_future + marge, n,
+    )
+    if vecteur:
+        return Tendance(*(v[..., 0] if isinstance(v, np.ndarray) else v for v in resultat))
+    return resultat
@@ -0,0 +1,144 @@
+import base64
+import io
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .charts import dessiner
+
+# ===============================
+#  RAPPORT PDF (REPORTLAB)
+# ===============================
+# Rendu pur : entrées JSON -> octets PDF, sans Flask, pour pouvoir tourner
+# dans un processus du pool d'export. Les styles sont construits une seule
+# fois par processus.
+
+GRAPHES = (
+    ("Performance cumulée", "performance"),
+    ("Histogramme des rendements", "histogram"),
+    ("Sharpe ratio glissant", "sharpe"),
+    ("Évolution du PER", "per"),
+    ("Comparaison avec ACWI", "compare"),
+    ("Prédiction des rendements", "predict"),
+)
+
+_STYLES = None
+
+
+def styles():
+    global _STYLES
+    if _STYLES is None:
+        base = getSampleStyleSheet()
+        violet = colors.HexColor("#7c6cff")
+        _STYLES = {
+            "title": ParagraphStyle(
+                "title",
+                parent=base["Heading1"],
+                textColor=colors.HexColor("#b8a4ff"),
+                fontSize=22,
+                alignment=1,
+            ),
+            "subtitle": ParagraphStyle(
+                "subtitle",
+                parent=base["Heading2"],
+                textColor=colors.HexColor("#9f91f7"),  # violet doux
+                fontSize=16,
+                spaceBefore=10,
+            ),
+            "normal": ParagraphStyle(
+                "normal",
+                parent=base["BodyText"],
+                fontSize=11,
+                textColor=colors.white,
+            ),
+            "parametres": TableStyle([
+                ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#1c1a24")),
+                ('TEXTCOLOR', (0, 0), (-1, -1), colors.white),
+                ('BOX', (0, 0), (-1, -1), 1, violet),
+                ('INNERGRID', (0, 0), (-1, -1), 0.5, violet),
+            ]),
+            "ratios": TableStyle([
+                ('BACKGROUND', (0, 0), (1, 0), colors.HexColor("#2b2154")),
+                ('TEXTCOLOR', (0, 0), (1, -1), colors.white),
+                ('BOX', (0, 0), (-1, -1), 1, violet),
+                ('INNERGRID', (0, 0), (-1, -1), 0.5, violet),
+            ]),
+        }
+    return _STYLES
+
+
+def _on_page(canvas, doc):
+    canvas.setFillColor(colors.HexColor("#111118"))
+    canvas.rect(0, 0, A4[0], A4[1], fill=1)
+
+
+def build_pdf(inputs, resultats, graphs=None, interpretations=None, graphes_serveur=None):
+    # graphes_serveur : spécifications dessinées en vectoriel (app/charts.py),
+    # prioritaires sur les images PNG envoyées par le navigateur
+    graphs = graphs or {}
+    interpretations = interpretations or {}
+    graphes_serveur = graphes_serveur or {}
+    st = styles()
+
+    elements = []
+
+    # ---- TITRE ----
+    elements.append(Paragraph("Rapport de Simulation de Portefeuille", st["title"]))
+    elements.append(Spacer(1, 18))
+
+    # ---- PARAMETRES ----
+    elements.append(Paragraph("<b>Paramètres de simulation</b>", st["subtitle"]))
+    elements.append(Spacer(1, 8))
+
+    table = Table([
+        ["Montant initial", f"{inputs.get('montant_initial',0)} €"],
+        ["Contribution", f"{inputs.get('contribution',0)} € ({inputs.get('frequence','')})"],
+        ["Actif", f"{inputs.get('actif','')} - {inputs.get('ticker','')}"],
+        ["Période", f"{inputs.get('date_debut','')} → {inputs.get('date_fin','')}"],
+        ["Durée", f"{inputs.get('duree','')} ans"],
+    ], colWidths=[150, 300])
+    table.setStyle(st["parametres"])
+    elements.append(table)
+    elements.append(Spacer(1, 18))
+
+    # ---- RATIOS ----
+    elements.append(Paragraph("<b>Ratios financiers</b>", st["subtitle"]))
+    elements.append(Spacer(1, 8))
+
+    ratios_table = Table([
+        ["Sharpe", resultats.get("ratio_sharpe")],
+        ["Volatilité", resultats.get("volatilite")],
+        ["CAGR", resultats.get("cagr")],
+        ["Rendement total (%)", resultats.get("rendement_total")],
+    ], colWidths=[150, 300])
+    ratios_table.setStyle(st["ratios"])
+    elements.append(ratios_table)
+    elements.append(Spacer(1, 24))
+
+    # ---- Graphes + interprétations ----
+    for title_text, graph_key in GRAPHES:
+        if graph_key not in graphes_serveur and not graphs.get(graph_key):
+            continue
+
+        elements.append(Paragraph(f"<b>{title_text}</b>", st["subtitle"]))
+        elements.append(Spacer(1, 8))
+
+        if graph_key in graphes_serveur:
+            elements.append(dessiner(graphes_serveur[graph_key]))
+        else:
+            img_bytes = base64.b64decode(graphs[graph_key].split(",")[1])
+            elements.append(Image(io.BytesIO(img_bytes), width=500, height=260))
+        elements.append(Spacer(1, 8))
+
+        interpretation = interpretations.get(graph_key)
+        if interpretation:
+            elements.append(Paragraph(interpretation, st["normal"]))
+            elements.append(Spacer(1, 20))
+
+    # ---- Génération PDF ----
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    doc.build(elements, onFirstPage=_on_page, onLaterPages=_on_page)
+    return buffer.getvalue()
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from .metrics import etape
+from .price_store import normaliser_ticker, price_store
+from .result_store import result_store
+
+# ===============================
+#  CACHE DE RÉPONSES (ETAG / 304)
+# ===============================
+# Clé : route + corps JSON normalisé + version des cours de chaque ticker
+# utilisé. Une nouvelle version des cours change la clé, et les entrées du
+# ticker sont purgées. L'ETag est l'empreinte du corps renvoyé.
+
+Entree = namedtuple("Entree", ["etag", "corps", "mimetype", "tickers", "simulation_id"])
+
+
+class ResponseCache:
+    def __init__(self, max_mb=32):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def init_app(self, app):
+        self.max_bytes = int(app.config["RESPONSE_CACHE_MB"] * 1024 * 1024)
+
+    def get(self, key):
+        with self._lock:
+            entree = self._entries.get(key)
+            if entree is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entree
+
+    def put(self, key, entree):
+        taille = len(entree.corps)
+        if taille > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entree
+            self._bytes += taille
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        entree = self._entries.pop(key)
+        self._bytes -= len(entree.corps)
+
+    def invalidate(self, ticker):
+        ticker = normaliser_ticker(ticker)
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if ticker in e.tickers]:
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entrees": len(self._entries),
+                "taille_mb": round(self._bytes / (1024 * 1024), 3),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def _versions(plages):
+    versions = []
+    for ticker, start, end in plages:
+        version = price_store.version(ticker, start, end)
+        if version is None:
+            return None
+        versions.append(f"{ticker}:{version}")
+    return versions
+
+
+def _repondre(entree):
+    # comparaison faible : le corps peut être servi compressé (ETag W/)
+    if request.if_none_match.contains_weak(entree.etag):
+        response_cache.not_modified += 1
+        resp = Response(status=304)
+    else:
+        resp = Response(entree.corps, mimetype=entree.mimetype)
+    resp.set_etag(entree.etag)
+    return resp
+
+
+def cache_reponse(plages_de):
+    """plages_de(data) -> [(ticker, début, fin)] dont dépend la réponse."""
+
+    def decorateur(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            data = request.get_json(silent=True) or {}
+            try:
+                plages = plages_de(data)
+            except Exception:
+                # entrées invalides : la route renverra elle-même l'erreur
+                return fn(*args, **kwargs)
+            normalise = request.full_path + json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+
+            with etape("cache_reponse"):
+                versions = _versions(plages)
+                entree = None
+                if versions is not None:
+                    key = hashlib.sha1("|".join([normalise, *versions]).encode()).hexdigest()
+                    entree = response_cache.get(key)
+            # une simulation évincée du stockage serveur invalide la réponse
+            if entree is not None and (entree.simulation_id is None or entree.simulation_id in result_store):
+                return _repondre(entree)
+
+            resp = make_response(fn(*args, **kwargs))
+            if resp.status_code != 200 or resp.is_streamed:
+                return resp
+
+            # les cours ont pu être téléchargés pendant le calcul
+            versions = _versions(plages)
+            if versions is None:
+                return resp
+            key = hashlib.sha1("|".join([normalise, *versions]).encode()).hexdigest()
+            corps = resp.get_data()
+            payload = resp.get_json(silent=True)
+            entree = Entree(
+                etag=hashlib.sha1(corps).hexdigest(),
+                corps=corps,
+                mimetype=resp.mimetype,
+                tickers={normaliser_ticker(t) for t, _, _ in plages},
+                simulation_id=payload.get("simulation_id") if isinstance(payload, dict) else None,
+            )
+            response_cache.put(key, entree)
+            return _repondre(entree)
+
+        return wrapper
+
+    return decorateur
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from .disque import Purgeur, ecrire_atomique
+
+# ===============================
+#  STOCKAGE SERVEUR DES SIMULATIONS
+# ===============================
+# /simulate y dépose ses tableaux NumPy et renvoie un `simulation_id` ;
+# /compare_acwi et les exports les relisent directement au lieu de
+# recevoir tout l'historique en JSON. Nombre d'entrées borné (LRU) et
+# expiration après `ttl` secondes.
+# Avec RESULT_STORE_DIR (serveur multi-workers), chaque résultat est aussi
+# écrit sur disque : un autre worker le relit au premier accès.
+# Un résultat stocké est partagé (le cache de réponses de /simulate renvoie
+# le même simulation_id à des clients différents) : il n'est jamais modifié
+# en place ; un résultat enrichi est stocké sous un identifiant dérivé.
+
+
+def id_derive(simulation_id, *parametres):
+    # même simulation et mêmes paramètres : même identifiant
+    return hashlib.sha1(repr((simulation_id, *parametres)).encode()).hexdigest()
+
+
+class ResultStore:
+    def __init__(self, max_entries=500, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.dossier = None
+        self._purgeur = Purgeur()
+
+    def init_app(self, app):
+        self.max_entries = app.config["RESULT_STORE_MAX"]
+        self.ttl = app.config["RESULT_STORE_TTL"]
+        self.dossier = app.config["RESULT_STORE_DIR"] or None
+        if self.dossier:
+            os.makedirs(self.dossier, exist_ok=True)
+
+    # ---------- Partage entre workers ----------
+    def _chemin(self, simulation_id):
+        return os.path.join(self.dossier, f"{simulation_id}.pkl")
+
+    def _ecrire(self, simulation_id, resultat):
+        ecrire_atomique(self._chemin(simulation_id), pickle.dumps(resultat, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _lire(self, simulation_id, now):
+        if not simulation_id.isalnum():
+            return None
+        chemin = self._chemin(simulation_id)
+        try:
+            cree = os.stat(chemin).st_mtime
+            if now - cree > self.ttl:
+                return None
+            with open(chemin, "rb") as f:
+                return cree, pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _purger(self, now):
+        while self._entries:
+            cle, (cree, _) = next(iter(self._entries.items()))
+            if now - cree <= self.ttl and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[cle]
+
+    def put(self, resultat, simulation_id=None):
+        simulation_id = simulation_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._entries[simulation_id] = (now, resultat)
+            self._entries.move_to_end(simulation_id)
+            self._purger(now)
+        if self.dossier:
+            self._ecrire(simulation_id, resultat)
+            self._purgeur.purger(self.dossier, self.ttl, now)
+        return simulation_id
+
+    def get(self, simulation_id):
+        now = time.time()
+        with self._lock:
+            entree = self._entries.get(simulation_id)
+            if entree is not None and now - entree[0] > self.ttl:
+                del self._entries[simulation_id]
+                entree = None
+            if entree is not None:
+                self._entries.move_to_end(simulation_id)
+                return entree[1]
+        if not self.dossier:
+            return None
+
+        # calculé par un autre worker
+        entree = self._lire(simulation_id, now)
+        if entree is None:
+            return None
+        with self._lock:
+            self._entries[simulation_id] = entree
+            self._purger(now)
+        return entree[1]
+
+    def __contains__(self, simulation_id):
+        return self.get(simulation_id) is not None
+
+    def stats(self):
+        with self._lock:
+            return {"entrees": len(self._entries), "max": self.max_entries, "ttl": self.ttl}
+
+
+result_store = ResultStore()
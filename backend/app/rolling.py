@@ -0,0 +1,54 @@
+import numpy as np
+
+# ===============================
+#  STATISTIQUES GLISSANTES EN O(n)
+# ===============================
+# Sommes par fenêtre via sommes cumulées : s_i = C[i + w] - C[i].
+# Les séries sont centrées avant le cumul pour limiter les erreurs
+# d'arrondi de la variance (E[x²] - E[x]²) sur de longues séries.
+# Chaque fonction renvoie un tableau de longueur n - w + 1 : l'élément j
+# correspond à la fenêtre terminant à l'indice j + w - 1.
+
+EPS = 1e-12
+
+
+def _window_sums(x, window):
+    c = np.concatenate(([0.0], np.cumsum(x)))
+    return c[window:] - c[:-window]
+
+
+def rolling_mean_std(x, window, ddof=0):
+    x = np.asarray(x, dtype=float)
+    centre = x.mean() if len(x) else 0.0
+    xc = x - centre
+    s1 = _window_sums(xc, window)
+    s2 = _window_sums(xc * xc, window)
+    moyenne = s1 / window
+    variance = np.maximum(s2 - window * moyenne * moyenne, 0.0) / (window - ddof)
+    return moyenne + centre, np.sqrt(variance)
+
+
+def rolling_sharpe(rendements, window, rf_period=0.0):
+    moyenne, ecart = rolling_mean_std(np.asarray(rendements, dtype=float) - rf_period, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ecart > EPS, moyenne / ecart, 0.0)
+
+
+def rolling_volatility(rendements, window, periodes_par_an=12):
+    _, ecart = rolling_mean_std(rendements, window, ddof=1)
+    return ecart * np.sqrt(periodes_par_an)
+
+
+def rolling_sortino(rendements, window, rf_period=0.0):
+    excess = np.asarray(rendements, dtype=float) - rf_period
+    moyenne = _window_sums(excess, window) / window
+    baisse = np.sqrt(_window_sums(np.minimum(excess, 0.0) ** 2, window) / window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(baisse > EPS, moyenne / baisse, 0.0)
+
+
+def drawdown(valeurs):
+    valeurs = np.asarray(valeurs, dtype=float)
+    sommets = np.maximum.accumulate(valeurs)
+    courant = valeurs / sommets - 1.0
+    return courant, np.minimum.accumulate(courant)
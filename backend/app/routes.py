@@ -1,20 +1,88 @@
-import yfinance as yf
 import numpy as np
 import pandas as pd
-from flask import Blueprint, jsonify, request
-from sklearn.linear_model import LinearRegression
-import scipy.stats as stats
-import traceback
-from flask import request, send_file
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
+from flask import Blueprint, current_app, g, jsonify, request
+import itertools
+import logging
+from flask import Response, request, send_file
 import io
-import base64
-from reportlab.pdfgen import canvas
+import tempfile
+from urllib.parse import quote
+from .price_store import price_store
+from .series_cache import series_cache
+from .prefetch import prefetcher
+from .singleflight import single_flight
+from .result_store import id_derive, result_store
+from .pdf_jobs import pdf_jobs
+from .response_cache import cache_reponse, response_cache
+from .metrics import etape, famille, metrics
+from .profilage import CPROFILE, profileur
+from .rolling import drawdown, rolling_sharpe, rolling_sortino, rolling_volatility
+from .montecarlo import METHODES, projection
+from .regression import HORIZON, tendance_lineaire
+from .serialisation import colonne_dates, compresser_reponse, format_colonnes
+from .streaming import mode_flux, reponse_flux
+from .exports import Colonne, Tableau, ecrire_parquet, ecrire_xlsx, ecrire_zip, flux_csv, parquet_disponible
+from .engine import (
+    REBALANCEMENT_MAP, STEP_MAP, contribution_mask_dates, portfolio_metrics, simulate_dca, simulate_weighted,
+)
 
 bp = Blueprint("routes", __name__)
+logger = logging.getLogger(__name__)
+acces = logging.getLogger("app.acces")
+
+
+# profilage enregistré en premier : il démarre avant et s'arrête après
+# toutes les autres fonctions de la requête
+@bp.before_request
+def debut_profil():
+    profileur.debut()
+
+
+@bp.after_request
+def fin_profil(response):
+    return profileur.fin(response)
+
+
+@bp.teardown_request
+def nettoyer_profil(exc):
+    profileur.nettoyer()
+
+
+@bp.before_request
+def debut_mesure():
+    metrics.debut()
+
+
+# enregistré avant la compression : les after_request s'exécutent en ordre
+# inverse, la mesure inclut donc la compression
+@bp.after_request
+def fin_mesure(response):
+    response = metrics.fin(response)
+    acces.info(
+        "%s %s %s",
+        request.method,
+        request.path,
+        response.status_code,
+        extra={
+            "route": request.url_rule.rule if request.url_rule is not None else None,
+            "methode": request.method,
+            "statut": response.status_code,
+            "duree_ms": round(g.get("duree_requete", 0.0) * 1000, 2),
+            "octets": response.content_length,
+        },
+    )
+    return response
+
+
+@bp.after_request
+def compression(response):
+    with etape("compression"):
+        return compresser_reponse(
+            response,
+            current_app.config["COMPRESSION_MIN_OCTETS"],
+            current_app.config["COMPRESSION_NIVEAU"],
+        )
+
 
 # ===============================
 #  UNIVERSE D’INDICES EU / MONDIAUX
@@ -38,6 +106,12 @@ UNIVERSE = {
     "IWDA.AS": "iShares Core MSCI World (IWDA.AS)",
   },
 }
+FRAIS_GESTION_MAP = {"actions": 0.006, "etf": 0.004, "obligations": 0.002}
+# résolution -> (fréquence de rééchantillonnage, périodes par an, fenêtre glissante par défaut)
+# None : séances de cotation brutes
+RESOLUTIONS = {"monthly": ("ME", 12, 6), "daily": (None, 252, 126)}
+TAUX_SANS_RISQUE_MAP = {"actions": 0.015, "etf": 0.017, "obligations": 0.02}
+
 # ============  UTILITAIRES =============
 def resolve_ticker(category, ticker):
     category = (category or "etf").lower()
@@ -50,12 +124,15 @@ def resolve_ticker(category, ticker):
 
 def safe_download(ticker, start, end, auto_adjust=True):
     try:
-        df = yf.download(ticker, start=start, end=end, progress=False, auto_adjust=auto_adjust)
-        if df is None or df.empty:
+        # les requêtes concurrentes identiques partagent un seul téléchargement
+        with etape("cours"):
+            prix = single_flight.do(
+                ("get", ticker, start, end, auto_adjust),
+                lambda: price_store.get(ticker, start, end, auto_adjust=auto_adjust),
+            )
+        if prix is None or prix.empty:
             return None
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = [c[-1] for c in df.columns]
-        return df
+        return prix.to_frame("Close")
     except Exception:
         return None
 
@@ -71,6 +148,91 @@ def pick_price(df):
     return num.iloc[:, 0] if num.shape[1] else None
 
 
+def reechantillonner(prix, freq):
+    with etape("reechantillonnage"):
+        if freq is None:
+            return prix.dropna()
+        return prix.resample(freq).last().dropna()
+
+
+def load_resampled(ticker, start, end, freq):
+    key = (ticker, start, end, freq)
+    # cours rafraîchis par un autre worker : le cache local est purgé
+    price_store.synchroniser([ticker])
+    serie = series_cache.get(key)
+    if serie is not None:
+        return serie
+
+    prix = pick_price(safe_download(ticker, start, end, auto_adjust=True))
+    if prix is None or prix.empty:
+        return None
+    serie = reechantillonner(prix, freq)
+    series_cache.put(key, serie)
+    return serie
+
+
+def load_resampled_many(tickers, start, end, freq):
+    series = {}
+    manquants = []
+    price_store.synchroniser(tickers)
+    for ticker in tickers:
+        serie = series_cache.get((ticker, start, end, freq))
+        if serie is None:
+            manquants.append(ticker)
+        else:
+            series[ticker] = serie
+
+    if manquants:
+        try:
+            with etape("cours"):
+                bruts = single_flight.do(
+                    ("get_many", tuple(sorted(manquants)), start, end),
+                    lambda: price_store.get_many(manquants, start, end, auto_adjust=True),
+                )
+        except Exception:
+            bruts = {}
+        for ticker in manquants:
+            prix = bruts.get(ticker)
+            if prix is None or prix.empty:
+                series[ticker] = None
+                continue
+            serie = reechantillonner(prix, freq)
+            series_cache.put((ticker, start, end, freq), serie)
+            series[ticker] = serie
+    return series
+
+
+def plage_requete(data):
+    # ticker et bornes de cours dont dépend une réponse (clé du cache de réponses)
+    actif = (data.get("actif") or "etf").lower()
+    ticker = resolve_ticker(actif, data.get("ticker"))
+    date_debut = int(data.get("date_debut", 2015))
+    date_fin = int(data.get("date_fin", 2025))
+    return [(ticker, f"{date_debut}-01-01", f"{date_fin}-12-31")]
+
+
+def lire_resolution(data):
+    resolution = data.get("resolution") or "monthly"
+    if resolution not in RESOLUTIONS:
+        raise ErreurSimulation(f"Résolution inconnue : {resolution} (monthly ou daily).")
+    return resolution
+
+
+def categorie_ticker(ticker):
+    for categorie, tickers in UNIVERSE.items():
+        if ticker in tickers:
+            return categorie
+    return "etf"
+
+
+def per_pedagogique(prices):
+    # bénéfices fictifs : E_0 = P_0 / 15 puis E_i = E_{i-1} * (1 + 0.3 * r_i)
+    rendements = prices[1:] / prices[:-1] - 1
+    earnings = np.cumprod(np.concatenate(([prices[0] / 15.0], 1 + 0.3 * rendements)))[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(earnings != 0, prices[1:] / earnings, 0.0)
+
+
 # ===============================
 #  ROUTES DE BASE
 # ===============================
@@ -81,16 +243,107 @@ def home():
 
 @bp.route("/test")
 def health():
-    return jsonify({"status": "ok"})
+    # 503 tant que le préchargement n'est pas terminé (répartiteur de charge)
+    if not prefetcher.ready.is_set():
+        return jsonify({"status": "warming", "ready": False}), 503
+    return jsonify({"status": "ok", "ready": True})
+
+
+@bp.route("/stats")
+def cache_stats():
+    return jsonify({
+        "series_cache": series_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "result_store": result_store.stats(),
+        "response_cache": response_cache.stats(),
+        "pdf_jobs": pdf_jobs.stats(),
+        "price_store": price_store.stats(),
+        "prefetch": prefetcher.etat(),
+    })
+
+
+def mesures_processus():
+    # valeurs propres au processus, additionnées entre workers par /metrics :
+    # compteurs de tous les processus, jauges des workers vivants
+    caches = {
+        "series": series_cache.stats(),
+        "reponses": response_cache.stats(),
+    }
+    telechargements = price_store.stats()
+    vols = single_flight.stats()
+    pdf = pdf_jobs.stats()
+    fournisseur = {"fournisseur": telechargements["fournisseur"]}
+    return [
+        ("finance_cache_hits_total", "counter", "Lectures de cache réussies",
+         [({"cache": nom}, st["hits"]) for nom, st in caches.items()] + [({"cache": "pdf"}, pdf["hits"])]),
+        ("finance_cache_misses_total", "counter", "Lectures de cache manquées",
+         [({"cache": nom}, st["misses"]) for nom, st in caches.items()]),
+        ("finance_cache_taille_mb", "gauge", "Taille occupée par les caches",
+         [({"cache": nom}, st["taille_mb"]) for nom, st in caches.items()] + [({"cache": "pdf"}, pdf["cache_mb"])]),
+        ("finance_reponses_non_modifiees_total", "counter", "Réponses 304 servies depuis le cache",
+         [({}, caches["reponses"]["not_modified"])]),
+        ("finance_telechargements_total", "counter", "Requêtes de cours envoyées au fournisseur",
+         [(fournisseur, telechargements["telechargements"])]),
+        ("finance_telechargements_erreurs_total", "counter",
+         "Tickers demandés restés sans cours (réponse vide, partielle ou en échec)",
+         [(fournisseur, telechargements["erreurs"])]),
+        ("finance_single_flight_coalesces_total", "counter", "Appels servis par un chargement déjà en cours",
+         [({}, vols["coalesces"])]),
+        ("finance_pdf_jobs_en_cours", "gauge", "Exports PDF en cours de rendu",
+         [({}, pdf["en_cours"])]),
+    ]
+
+
+@bp.route("/metrics")
+def prometheus():
+    # format texte Prometheus : latences par route et étape, caches,
+    # téléchargements ; tous les workers si METRICS_DIR est partagé
+    lignes, totaux = metrics.exposition()
+    ratios = []
+    for nom in ("series", "reponses"):
+        hits = totaux.valeur("finance_cache_hits_total", cache=nom)
+        lectures = hits + totaux.valeur("finance_cache_misses_total", cache=nom)
+        ratios.append(({"cache": nom}, round(hits / lectures, 4) if lectures else 0.0))
+    lignes += famille("finance_cache_hit_ratio", "gauge", "Taux de réussite des caches", ratios)
+    lignes += famille("finance_prechargement_pret", "gauge", "Préchargement de l'univers terminé (worker qui répond)",
+                      [({}, int(prefetcher.ready.is_set()))])
+    return Response("\n".join(lignes) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+@bp.route("/profils")
+def profils():
+    if not profileur.actif:
+        return jsonify({"error": "Profilage désactivé"}), 404
+    return jsonify({"profils": profileur.liste()})
+
+
+@bp.route("/profils/<profil_id>")
+def profil(profil_id):
+    trouve = profileur.lire(profil_id) if profileur.actif else None
+    if trouve is None:
+        return jsonify({"error": "Profil inconnu ou expiré"}), 404
+    meta, chemin = trouve
+    if meta["mode"] == CPROFILE:
+        # ?texte=1 : résumé pstats lisible ; sinon fichier pour snakeviz / pstats
+        if request.args.get("texte") == "1":
+            return Response(profileur.resume(chemin), mimetype="text/plain")
+        return send_file(chemin, mimetype="application/octet-stream", as_attachment=True,
+                         download_name=f"{profil_id}.prof")
+    # piles repliées : flamegraph.pl, speedscope, inferno
+    return send_file(chemin, mimetype="text/plain")
 
 
 # ===============================
 #  1. SIMULATION DE PORTEFEUILLE
 # ===============================
-@bp.route("/simulate", methods=["POST"])
-def simulate_portfolio():
-    data = request.get_json() or {}
+class ErreurSimulation(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
 
+
+def calculer_simulation(data):
     # --------- Entrées ----------
     montant_initial = float(data.get("montant_initial", 0))
     contribution = float(data.get("contribution", 0))
@@ -104,220 +357,760 @@ def simulate_portfolio():
     ticker = resolve_ticker(actif, data.get("ticker"))
     date_debut = int(data.get("date_debut", 2015))
     date_fin = int(data.get("date_fin", 2025))
+    resolution = lire_resolution(data)
+    freq, periodes_par_an, fenetre_defaut = RESOLUTIONS[resolution]
+    try:
+        fenetre = int(data.get("fenetre", fenetre_defaut))
+    except (TypeError, ValueError):
+        fenetre = fenetre_defaut
 
     if montant_initial <= 0 or duree <= 0:
-        return jsonify({"error": "Montant initial et durée doivent être positifs."}), 400
+        raise ErreurSimulation("Montant initial et durée doivent être positifs.")
+    if fenetre < 2:
+        raise ErreurSimulation("La fenêtre glissante doit couvrir au moins 2 périodes.")
 
     # --------- Paramètres ----------
-    frais_gestion_map = {"actions": 0.006, "etf": 0.004, "obligations": 0.002}
-    taux_sans_risque_map = {"actions": 0.015, "etf": 0.017, "obligations": 0.02}
-
-    frais_gestion_annuel = frais_gestion_map.get(actif, 0.005)
-    taux_sans_risque = taux_sans_risque_map.get(actif, 0.017)
+    frais_gestion_annuel = FRAIS_GESTION_MAP.get(actif, 0.005)
+    taux_sans_risque = TAUX_SANS_RISQUE_MAP.get(actif, 0.017)
 
     # --------- Téléchargement ----------
-    try:
-        df = safe_download(
-            ticker,
-            f"{date_debut}-01-01",
-            f"{date_fin}-12-31",
-            auto_adjust=True,
+    prix_periode = load_resampled(ticker, f"{date_debut}-01-01", f"{date_fin}-12-31", freq)
+    if prix_periode is None:
+        raise ErreurSimulation(f"Aucune donnée trouvée pour {ticker}.", 404)
+
+    if len(prix_periode) < 2:
+        raise ErreurSimulation("Historique insuffisant.")
+
+    # --------- Conversion séries ----------
+    dates = prix_periode.index
+    prices = prix_periode.values.astype(float)
+
+    # Fréquence DCA
+    step = STEP_MAP.get(frequence, 1)
+
+    # --------- Simulation portefeuille ----------
+    first_price = prices[0]
+    if first_price <= 0:
+        raise ErreurSimulation("Prix initial invalide.")
+
+    # frais prélevés à chaque période (chaque séance en quotidien) ; en
+    # quotidien, les apports tombent sur la première séance du mois
+    frais_periode = frais_gestion_annuel / periodes_par_an
+    mask = contribution_mask_dates(dates.values, step) if resolution == "daily" else None
+
+    with etape("simulation"):
+        valeurs, montant_total_investi = simulate_dca(
+            prices, montant_initial, contribution, step, frais_periode, mask=mask
         )
-        if df is None or df.empty:
-            return jsonify({"error": f"Aucune donnée trouvée pour {ticker}."}), 404
 
-        prix = pick_price(df)
-        if prix is None or prix.empty:
-            return jsonify({"error": f"Pas de colonne de prix valide pour {ticker}."}), 404
+    if len(valeurs) < 2:
+        raise ErreurSimulation("Simulation trop courte.")
 
-        prix_mensuel = prix.resample("ME").last().dropna()
-        if len(prix_mensuel) < 2:
-            return jsonify({"error": "Historique insuffisant."}), 400
+    rendements_portefeuille = np.diff(valeurs) / valeurs[:-1]
 
-        # --------- Conversion séries ----------
-        dates = prix_mensuel.index
-        prices = prix_mensuel.values.astype(float)
+    # Durée effective
+    duree_effective = (dates[-1] - dates[0]).days / 365.25
+    if duree_effective <= 0:
+        duree_effective = max(duree, 1e-9)
 
-        # Fréquence DCA
-        step_map = {"mensuelle": 1, "trimestrielle": 3, "semestrielle": 6, "annuelle": 12}
-        step = step_map.get(frequence, 1)
-        n = step  
+    # Volatilité annualisée, rendement total, CAGR vrai, Sharpe
+    with etape("indicateurs"):
+        metriques = portfolio_metrics(
+            valeurs, montant_total_investi, duree_effective, taux_sans_risque, periodes_par_an
+        )
 
-        # --------- Simulation portefeuille ----------
-        units = 0.0
-        valeurs = []
-        montant_total_investi = 0.0
+        # --------- Indicateurs glissants ----------
+        window = None
+        vide = np.empty(0)
+        sharpe_glissant = volatilite_glissante = sortino_glissant = vide
+        if len(rendements_portefeuille) >= 3:
+            window = min(fenetre, len(rendements_portefeuille))
+            rf_period = (1 + taux_sans_risque) ** (1 / periodes_par_an) - 1
+            sharpe_glissant = rolling_sharpe(rendements_portefeuille, window, rf_period)
+            volatilite_glissante = rolling_volatility(rendements_portefeuille, window, periodes_par_an)
+            sortino_glissant = rolling_sortino(rendements_portefeuille, window, rf_period)
 
-        first_price = prices[0]
-        if first_price <= 0:
-            return jsonify({"error": "Prix initial invalide."}), 400
+        # --------- Drawdown ----------
+        drawdown_courant, drawdown_max = drawdown(valeurs)
 
-        units = montant_initial / first_price
-        montant_total_investi += montant_initial
+        # --------- PER pédagogique ----------
+        per = per_pedagogique(prices) if len(prix_periode) >= 3 else vide
+
+    sim = {
+        "inputs": {
+            "montant_initial": montant_initial,
+            "contribution": contribution,
+            "frequence": frequence,
+            "duree": duree,
+            "actif": actif,
+            "ticker": ticker,
+            "date_debut": date_debut,
+            "date_fin": date_fin,
+            "fenetre": fenetre,
+            "resolution": resolution,
+        },
+        "scalaires": {
+            "portefeuille_final_estime": float(metriques.final),
+            "montant_total_investi": float(montant_total_investi),
+            "volatilite": float(metriques.volatilite),
+            "ratio_sharpe": float(metriques.sharpe),
+            "cagr": float(metriques.cagr),
+            "rendement_total": float(metriques.rendement_total),
+            "drawdown_max": float(drawdown_max[-1]),
+            "taux_sans_risque": taux_sans_risque,
+        },
+        "dates": dates.values.astype("datetime64[D]"),
+        "valeurs": valeurs,
+        "rendements": rendements_portefeuille,
+        "fenetre": window,
+        "sharpe_rolling": sharpe_glissant,
+        "volatilite_glissante": volatilite_glissante,
+        "sortino_rolling": sortino_glissant,
+        "drawdown": drawdown_courant,
+        "per": per,
+        "resolution": resolution,
+    }
+    if resolution == "daily":
+        # ~7 500 séances sur 30 ans : dates en jours int32, séries en float32
+        sim["dates"] = sim["dates"].astype(np.int64).astype(np.int32)
+        for cle in ("valeurs", "rendements", "sharpe_rolling", "volatilite_glissante",
+                    "sortino_rolling", "drawdown", "per"):
+            sim[cle] = sim[cle].astype(np.float32)
+    return sim
+
+
+def dates_simulation(sim):
+    return sim["dates"].astype("datetime64[D]")
+
+
+def libelles_dates(dates, resolution):
+    # "AAAA-MM" en mensuel, "AAAA-MM-JJ" en quotidien
+    return np.datetime_as_string(dates, unit="D" if resolution == "daily" else "M")
+
+
+def valeurs_mensuelles(sim):
+    # dernière valeur de chaque mois (comparaison avec un indice mensuel)
+    if sim.get("resolution") != "daily":
+        return sim["valeurs"]
+    mois = dates_simulation(sim).astype("datetime64[M]")
+    fins = np.flatnonzero(np.append(mois[1:] != mois[:-1], True))
+    return sim["valeurs"][fins].astype(float)
+
+
+def ratios_simulation(sim):
+    sc = sim["scalaires"]
+    return {
+        "portefeuille_final_estime": round(sc["portefeuille_final_estime"], 2),
+        "montant_total_investi": round(sc["montant_total_investi"], 2),
+        "volatilite": round(sc["volatilite"], 4),
+        "ratio_sharpe": round(sc["ratio_sharpe"], 4),
+        "cagr": round(sc["cagr"], 4),
+        "rendement_total": round(sc["rendement_total"], 2),
+    }
+
+
+def series_simulation(sim):
+    # (nom, nombre de lignes, tranche(debut, fin) -> liste de dicts) : les
+    # lignes ne sont construites que pour la tranche demandée
+    mois = libelles_dates(dates_simulation(sim), sim.get("resolution")).tolist()
+    window = sim["fenetre"]
+
+    def indexee(valeurs, premiere, decimales, echelle=1):
+        def tranche(debut, fin):
+            return [
+                {"periode": premiere + debut + i, "valeur": round(v, decimales)}
+                for i, v in enumerate((valeurs[debut:fin] * echelle).tolist())
+            ]
+        return tranche
+
+    def datee(valeurs, cle, decimales, echelle=1):
+        def tranche(debut, fin):
+            return [
+                {"periode": debut + i + 1, "date": d, cle: round(v, decimales)}
+                for i, (d, v) in enumerate(zip(mois[1 + debut:1 + fin], (valeurs[debut:fin] * echelle).tolist()))
+            ]
+        return tranche
+
+    return [
+        # --------- Historique et rendements ----------
+        ("historique", len(sim["valeurs"]), indexee(sim["valeurs"], 1, 2)),
+        ("rendements", len(sim["rendements"]), datee(sim["rendements"], "rendement", 3, 100)),
+        # --------- Indicateurs glissants ----------
+        ("sharpe_rolling", len(sim["sharpe_rolling"]), indexee(sim["sharpe_rolling"], window, 3)),
+        ("volatilite_glissante", len(sim["volatilite_glissante"]), indexee(sim["volatilite_glissante"], window, 4)),
+        ("sortino_rolling", len(sim["sortino_rolling"]), indexee(sim["sortino_rolling"], window, 3)),
+        # --------- Drawdown ----------
+        ("drawdown", len(sim["drawdown"]), indexee(sim["drawdown"], 1, 2, 100)),
+        # --------- PER pédagogique ----------
+        ("per_series", len(sim["per"]), datee(sim["per"], "per", 2)),
+    ]
 
-        frais_mensuel = frais_gestion_annuel / 12.0
 
-        for i, (dt, price) in enumerate(zip(dates, prices)):
-            price = float(price)
-            if price <= 0:
-                continue
+def entete_simulation(sim):
+    sc = sim["scalaires"]
+    return {
+        **ratios_simulation(sim),
+        "drawdown_max": round(sc["drawdown_max"] * 100, 2),
+        "taux_sans_risque": sc["taux_sans_risque"],
+    }
+
+
+def resultats_simulation(sim):
+    return {
+        **entete_simulation(sim),
+        **{nom: tranche(0, n) for nom, n, tranche in series_simulation(sim)},
+    }
+
+
+def resultats_colonnes(sim):
+    # format colonnes construit directement depuis les tableaux NumPy
+    sc = sim["scalaires"]
+    dates = dates_simulation(sim)
+    if sim.get("resolution") != "daily":
+        dates = dates.astype("datetime64[M]")
+    window = sim["fenetre"]
+
+    def serie(n, **colonnes):
+        return {"n": n, "colonnes": colonnes}
+
+    n = len(sim["valeurs"])
+    return {
+        **ratios_simulation(sim),
+
+        "historique": serie(n, periode={"debut": 1, "pas": 1}, valeur=np.round(sim["valeurs"].astype(float), 2)),
+        "rendements": serie(
+            n - 1,
+            periode={"debut": 1, "pas": 1},
+            date=colonne_dates(dates[1:]),
+            rendement=np.round(sim["rendements"].astype(float) * 100, 3),
+        ),
+        "sharpe_rolling": serie(
+            len(sim["sharpe_rolling"]),
+            periode={"debut": window, "pas": 1},
+            valeur=np.round(sim["sharpe_rolling"].astype(float), 3),
+        ),
+        "volatilite_glissante": serie(
+            len(sim["volatilite_glissante"]),
+            periode={"debut": window, "pas": 1},
+            valeur=np.round(sim["volatilite_glissante"].astype(float), 4),
+        ),
+        "sortino_rolling": serie(
+            len(sim["sortino_rolling"]),
+            periode={"debut": window, "pas": 1},
+            valeur=np.round(sim["sortino_rolling"].astype(float), 3),
+        ),
+        "drawdown": serie(n, periode={"debut": 1, "pas": 1}, valeur=np.round(sim["drawdown"].astype(float) * 100, 2)),
+        "drawdown_max": round(sc["drawdown_max"] * 100, 2),
+        "per_series": serie(
+            len(sim["per"]),
+            periode={"debut": 1, "pas": 1},
+            date=colonne_dates(dates[1:len(sim["per"]) + 1]),
+            per=np.round(sim["per"].astype(float), 2),
+        ),
+
+        "taux_sans_risque": sc["taux_sans_risque"],
+    }
+
+
+def graphes_simulation(sim):
+    # spécifications des graphiques du rapport PDF, tracés côté serveur
+    mois = libelles_dates(dates_simulation(sim), sim.get("resolution")).tolist()
+    window = sim["fenetre"]
+    sharpe = sim["sharpe_rolling"].tolist()
+    graphes = {
+        "performance": {
+            "type": "lignes",
+            "etiquettes": mois,
+            "series": [["Valeur du portefeuille (€)", "#00c8ff", sim["valeurs"].tolist()]],
+        },
+        "histogram": {
+            "type": "barres",
+            "etiquettes": mois[1:],
+            "valeurs": (sim["rendements"] * 100).tolist(),
+            "signe": True,
+        },
+        "sharpe": {
+            "type": "lignes",
+            "etiquettes": mois[window:],
+            "series": [
+                ["Sharpe glissant", "#ffb347", sharpe],
+                ["Risque non rémunéré", "#b91c1c", [0.0] * len(sharpe)],
+                ["Bon Sharpe (≥1)", "#4ade80", [1.0] * len(sharpe)],
+            ],
+        },
+        "per": {
+            "type": "barres",
+            "etiquettes": mois[1:],
+            "valeurs": sim["per"].tolist(),
+            "couleur": "#4ade80",
+            "paliers": [[20, "#f87171"], [12, "#fbbf24"]],
+        },
+    }
+    if "comparaison" in sim:
+        comp = sim["comparaison"]
+        graphes["compare"] = {
+            "type": "lignes",
+            "etiquettes": np.datetime_as_string(comp["dates"], unit="M").tolist(),
+            "series": [
+                ["Portefeuille", "#7b68ee", comp["portefeuille"].tolist()],
+                ["ACWI", "#2ecc71", comp["acwi"].tolist()],
+            ],
+        }
+    return graphes
 
-            if i > 0 and contribution > 0 and (i % step == 0):
-                units += contribution / price
-                montant_total_investi += contribution
 
-            valeur_brute = units * price
-            valeur_nette = valeur_brute * (1 - frais_mensuel)
+def simulation_depuis_id(data):
+    simulation_id = data.get("simulation_id")
+    if not simulation_id:
+        return None
+    sim = result_store.get(simulation_id)
+    if sim is None:
+        raise ErreurSimulation("Simulation inconnue ou expirée, relancez /simulate.", 404)
+    return sim
 
-            units = valeur_nette / price
-            valeurs.append(valeur_nette)
 
-        if len(valeurs) < 2:
-            return jsonify({"error": "Simulation trop courte."}), 400
+@bp.route("/simulate", methods=["POST"])
+@cache_reponse(plage_requete)
+def simulate_portfolio():
+    data = request.get_json() or {}
+
+    try:
+        sim = calculer_simulation(data)
+        simulation_id = result_store.put(sim)
+
+        mode = mode_flux()
+        if mode:
+            return reponse_flux(
+                mode,
+                {"simulation_id": simulation_id, "inputs": sim["inputs"], "resultats": entete_simulation(sim)},
+                series_simulation(sim),
+            )
+
+        resultats = resultats_colonnes(sim) if format_colonnes() else resultats_simulation(sim)
+        return jsonify({
+            "simulation_id": simulation_id,
+            "inputs": sim["inputs"],
+            "resultats": resultats,
+        })
+
+    except ErreurSimulation as e:
+        return jsonify({"error": e.message}), e.status
+    except Exception as e:
+        logger.exception("Erreur /simulate")
+        return jsonify({"error": str(e)}), 500
 
-        portefeuille_final = valeurs[-1]
+# ===============================
+#  1 bis. SIMULATION PAR LOTS
+# ===============================
+BATCH_CHAMPS = [
+    "ticker", "actif", "montant_initial", "contribution", "frequence", "date_debut", "date_fin",
+    "portefeuille_final_estime", "montant_total_investi", "volatilite", "ratio_sharpe", "cagr",
+    "rendement_total",
+]
 
-        valeurs_arr = np.array(valeurs)
-        rendements_portefeuille = np.diff(valeurs_arr) / valeurs_arr[:-1]
 
-        # Volatilité annualisée
-        volatilite_m = float(np.std(rendements_portefeuille, ddof=1))
-        volatilite_annuelle = volatilite_m * np.sqrt(12) if volatilite_m > 0 else 0.0
+def expand_scenarios(data):
+    base = {k: v for k, v in data.items() if k not in ("scenarios", "grille")}
+    scenarios = data.get("scenarios") or [{}]
+    grille = data.get("grille") or {}
+    cles = list(grille.keys())
+    for sc in scenarios:
+        for combo in itertools.product(*(grille[k] for k in cles)):
+            yield {**base, **sc, **dict(zip(cles, combo))}
 
-        # Rendement total
-        rendement_total = ((portefeuille_final - montant_total_investi) / montant_total_investi) * 100
 
-        # Durée effective
+def parse_scenario(sc):
+    actif = (sc.get("actif") or "etf").lower()
+    try:
+        duree = int(sc.get("duree") or 0)
+    except (TypeError, ValueError):
+        duree = 0
+    return {
+        "ticker": resolve_ticker(actif, sc.get("ticker")),
+        "actif": actif,
+        "montant_initial": float(sc.get("montant_initial", 0)),
+        "contribution": float(sc.get("contribution", 0)),
+        "frequence": sc.get("frequence", "mensuelle"),
+        "date_debut": int(sc.get("date_debut", 2015)),
+        "date_fin": int(sc.get("date_fin", 2025)),
+        "duree": duree,
+    }
+
+
+@bp.route("/simulate/batch", methods=["POST"])
+def simulate_batch():
+    data = request.get_json() or {}
+
+    grille = data.get("grille") or {}
+    if not isinstance(grille, dict) or not all(isinstance(v, list) and v for v in grille.values()):
+        return jsonify({"error": "La grille doit associer chaque paramètre à une liste non vide."}), 400
+
+    scenarios = data.get("scenarios") or [{}]
+    if not isinstance(scenarios, list) or not all(isinstance(sc, dict) for sc in scenarios):
+        return jsonify({"error": "Les scénarios doivent être une liste d'objets."}), 400
+
+    nombre = len(scenarios)
+    for valeurs_grille in grille.values():
+        nombre *= len(valeurs_grille)
+    limite = current_app.config["BATCH_MAX_SCENARIOS"]
+    if nombre > limite:
+        return jsonify({"error": f"Trop de scénarios ({nombre}), maximum {limite}."}), 400
+
+    lignes = []
+    erreurs = []
+    groupes = {}
+    for i, sc in enumerate(expand_scenarios(data)):
+        try:
+            params = parse_scenario(sc)
+        except (TypeError, ValueError) as e:
+            lignes.append(None)
+            erreurs.append({"index": i, "error": f"Paramètres invalides : {e}"})
+            continue
+        lignes.append([params[c] for c in BATCH_CHAMPS[:7]] + [None] * (len(BATCH_CHAMPS) - 7))
+        # même validation que /simulate
+        if params["montant_initial"] <= 0 or params["duree"] <= 0:
+            erreurs.append({"index": i, "error": "Montant initial et durée doivent être positifs."})
+            continue
+        cle = (params["ticker"], params["date_debut"], params["date_fin"])
+        groupes.setdefault(cle, []).append((i, params))
+
+    try:
+        # un seul téléchargement par ticker, sur la plage la plus large demandée
+        plages = {}
+        for ticker, debut, fin in groupes:
+            lo, hi = plages.get(ticker, (debut, fin))
+            plages[ticker] = (min(lo, debut), max(hi, fin))
+        series = {
+            ticker: load_resampled(ticker, f"{lo}-01-01", f"{hi}-12-31", "ME")
+            for ticker, (lo, hi) in plages.items()
+        }
+
+        for (ticker, debut, fin), membres in groupes.items():
+            indices = [i for i, _ in membres]
+            serie = series[ticker]
+            if serie is not None:
+                serie = serie[(serie.index >= pd.Timestamp(f"{debut}-01-01")) & (serie.index <= pd.Timestamp(f"{fin}-12-31"))]
+
+            if serie is None or serie.empty:
+                message = f"Aucune donnée trouvée pour {ticker}."
+            elif len(serie) < 2:
+                message = "Historique insuffisant."
+            elif serie.iloc[0] <= 0:
+                message = "Prix initial invalide."
+            else:
+                message = None
+            if message:
+                erreurs.extend({"index": i, "error": message} for i in indices)
+                continue
+
+            # --------- Scénarios × mois ----------
+            p = [params for _, params in membres]
+            frais = np.array([FRAIS_GESTION_MAP.get(sc["actif"], 0.005) / 12.0 for sc in p])
+            taux = np.array([TAUX_SANS_RISQUE_MAP.get(sc["actif"], 0.017) for sc in p])
+            with etape("simulation"):
+                valeurs, investi = simulate_dca(
+                    serie.values.astype(float),
+                    np.array([sc["montant_initial"] for sc in p]),
+                    np.array([sc["contribution"] for sc in p]),
+                    np.array([STEP_MAP.get(sc["frequence"], 1) for sc in p]),
+                    frais,
+                )
+            if valeurs.shape[-1] < 2:
+                erreurs.extend({"index": i, "error": "Simulation trop courte."} for i in indices)
+                continue
+
+            duree_effective = (serie.index[-1] - serie.index[0]).days / 365.25
+            if duree_effective <= 0:
+                duree_effective = np.maximum([sc["duree"] for sc in p], 1e-9)
+
+            m = portfolio_metrics(valeurs, investi, duree_effective, taux)
+            for j, i in enumerate(indices):
+                lignes[i][7:] = [
+                    round(float(m.final[j]), 2),
+                    round(float(investi[j]), 2),
+                    round(float(m.volatilite[j]), 4),
+                    round(float(m.sharpe[j]), 4),
+                    round(float(m.cagr[j]), 4),
+                    round(float(m.rendement_total[j]), 2),
+                ]
+
+        erreurs.sort(key=lambda e: e["index"])
+        return jsonify({
+            "nombre_scenarios": len(lignes),
+            "champs": BATCH_CHAMPS,
+            "resultats": lignes,
+            "erreurs": erreurs,
+        })
+
+    except Exception as e:
+        logger.exception("Erreur /simulate/batch")
+        return jsonify({"error": str(e)}), 500
+
+# ===============================
+#  1 ter. PORTEFEUILLE MULTI-ACTIFS
+# ===============================
+@bp.route("/simulate/portfolio", methods=["POST"])
+def simulate_multi_asset():
+    data = request.get_json() or {}
+
+    # --------- Entrées ----------
+    montant_initial = float(data.get("montant_initial", 0))
+    contribution = float(data.get("contribution", 0))
+    frequence = data.get("frequence", "mensuelle")
+    try:
+        duree = int(data.get("duree") or 0)
+    except (TypeError, ValueError):
+        duree = 0
+    date_debut = int(data.get("date_debut", 2015))
+    date_fin = int(data.get("date_fin", 2025))
+    rebalancement = (data.get("rebalancement") or "aucun").lower()
+    seuil = float(data.get("seuil", 0.05))
+
+    if montant_initial <= 0:
+        return jsonify({"error": "Le montant initial doit être positif."}), 400
+    if rebalancement != "aucun" and rebalancement != "seuil" and rebalancement not in REBALANCEMENT_MAP:
+        return jsonify({"error": f"Rééquilibrage inconnu : {rebalancement}."}), 400
+
+    # --------- Composition ----------
+    composition = {}
+    categories = {}
+    for ligne in data.get("actifs") or []:
+        ticker = str(ligne.get("ticker") or "").strip()
+        poids = float(ligne.get("poids", 0))
+        if not ticker or poids <= 0:
+            return jsonify({"error": "Chaque actif doit avoir un ticker et un poids positif."}), 400
+        composition[ticker] = composition.get(ticker, 0.0) + poids
+        categories[ticker] = (ligne.get("actif") or categorie_ticker(ticker)).lower()
+    if not composition:
+        return jsonify({"error": "Aucun actif dans le portefeuille."}), 400
+
+    tickers = list(composition)
+    poids = np.array([composition[t] for t in tickers])
+    poids = poids / poids.sum()
+
+    frais_gestion_annuel = float(sum(w * FRAIS_GESTION_MAP.get(categories[t], 0.005) for t, w in zip(tickers, poids)))
+    taux_sans_risque = float(sum(w * TAUX_SANS_RISQUE_MAP.get(categories[t], 0.017) for t, w in zip(tickers, poids)))
+
+    try:
+        # --------- Téléchargement groupé ----------
+        series = load_resampled_many(tickers, f"{date_debut}-01-01", f"{date_fin}-12-31", "ME")
+        manquants = [t for t in tickers if series[t] is None]
+        if manquants:
+            return jsonify({"error": f"Aucune donnée trouvée pour {', '.join(manquants)}."}), 404
+
+        # matrice (mois × actifs) sur la période commune
+        matrice = pd.concat([series[t] for t in tickers], axis=1, keys=tickers, join="inner").dropna()
+        if len(matrice) < 2:
+            return jsonify({"error": "Historique commun insuffisant."}), 400
+        prices = matrice.values.astype(float)
+        if (prices[0] <= 0).any():
+            return jsonify({"error": "Prix initial invalide."}), 400
+
+        # --------- Simulation ----------
+        with etape("simulation"):
+            sim = simulate_weighted(
+                prices,
+                poids,
+                montant_initial,
+                contribution,
+                STEP_MAP.get(frequence, 1),
+                frais_gestion_annuel / 12.0,
+                None if rebalancement == "aucun" else rebalancement,
+                seuil,
+            )
+
+        dates = matrice.index
         duree_effective = (dates[-1] - dates[0]).days / 365.25
         if duree_effective <= 0:
             duree_effective = max(duree, 1e-9)
 
-        # CAGR vrai
-        valeur_initiale = valeurs[0]
-        cagr = (portefeuille_final / valeur_initiale) ** (1 / duree_effective) - 1
-
-        # Sharpe
-        sharpe = (cagr - taux_sans_risque) / volatilite_annuelle if volatilite_annuelle > 0 else 0.0
+        metriques = portfolio_metrics(sim.valeurs, sim.montant_investi, duree_effective, taux_sans_risque)
 
-        # --------- Historique et rendements ----------
         historique = [
-            {"periode": i + 1, "valeur": round(float(v), 2)}
-            for i, v in enumerate(valeurs)
+            {"periode": i + 1, "date": d, "valeur": round(v, 2)}
+            for i, (d, v) in enumerate(zip(dates.strftime("%Y-%m").tolist(), sim.valeurs.tolist()))
         ]
+        finales = sim.valeurs_actifs[-1]
+        repartition_finale = {t: round(float(v / finales.sum()), 4) for t, v in zip(tickers, finales)}
 
-        dates_r = prix_mensuel.index[1:]
-        rendements_histogramme = [
-            {
-                "periode": i + 1,
-                "date": dates_r[i].strftime("%Y-%m"),
-                "rendement": round(float(r) * 100, 3),
-            }
-            for i, r in enumerate(rendements_portefeuille)
-        ]
-
-        # --------- Sharpe Rolling ----------
-        sharpe_rolling = []
-        if len(rendements_portefeuille) >= 3:
-            window = min(6, len(rendements_portefeuille))
-            rf_period = (1 + taux_sans_risque) ** (1 / 12) - 1
-
-            for i in range(window - 1, len(rendements_portefeuille)):
-                win = rendements_portefeuille[i - window + 1 : i + 1]
-                excess = win - rf_period
-                m = excess.mean()
-                s = excess.std()
-                sharpe_val = float(m / s) if s > 0 else 0.0
-
-                sharpe_rolling.append({
-                    "periode": i + 1,
-                    "valeur": round(sharpe_val, 3)
-                })
-
-        # --------- PER pédagogique ----------
-        per_series = []
-        if len(prix_mensuel) >= 3:
-            pm = prix_mensuel.copy()
-            r_actif = pm.pct_change().dropna()
-
-            prix0 = float(pm.iloc[0])
-            earnings = prix0 / 15.0  
-
-            for i in range(1, len(pm)):
-                ret = float(r_actif.iloc[i - 1])
-                earnings *= (1 + 0.3 * ret)
-                per_val = float(pm.iloc[i]) / earnings if earnings != 0 else 0.0
-
-                per_series.append({
-                    "periode": i,
-                    "date": pm.index[i].strftime("%Y-%m"),
-                    "per": round(per_val, 2),
-                })
-                
         return jsonify({
             "inputs": {
                 "montant_initial": montant_initial,
                 "contribution": contribution,
                 "frequence": frequence,
                 "duree": duree,
-                "actif": actif,
-                "ticker": ticker,
                 "date_debut": date_debut,
                 "date_fin": date_fin,
+                "rebalancement": rebalancement,
+                "seuil": seuil,
+                "actifs": [{"ticker": t, "poids": round(float(w), 4)} for t, w in zip(tickers, poids)],
             },
             "resultats": {
-                "portefeuille_final_estime": round(float(portefeuille_final), 2),
-                "montant_total_investi": round(float(montant_total_investi), 2),
-                "volatilite": round(float(volatilite_annuelle), 4),
-                "ratio_sharpe": round(float(sharpe), 4),
-                "cagr": round(float(cagr), 4),
-                "rendement_total": round(float(rendement_total), 2),
-
+                "portefeuille_final_estime": round(float(metriques.final), 2),
+                "montant_total_investi": round(float(sim.montant_investi), 2),
+                "volatilite": round(float(metriques.volatilite), 4),
+                "ratio_sharpe": round(float(metriques.sharpe), 4),
+                "cagr": round(float(metriques.cagr), 4),
+                "rendement_total": round(float(metriques.rendement_total), 2),
+                "nombre_reequilibrages": sim.reequilibrages,
+                "repartition_finale": repartition_finale,
+                "periode_commune": [dates[0].strftime("%Y-%m"), dates[-1].strftime("%Y-%m")],
                 "historique": historique,
-                "rendements": rendements_histogramme,
-                "sharpe_rolling": sharpe_rolling,
-                "per_series": per_series,
-
-                "taux_sans_risque": taux_sans_risque,
+                "taux_sans_risque": round(taux_sans_risque, 4),
             },
         })
 
     except Exception as e:
-        print("❌ ERREUR /simulate :", e)
-        import traceback; traceback.print_exc()
+        logger.exception("Erreur /simulate/portfolio")
         return jsonify({"error": str(e)}), 500
 
 # ===============================
-#  2. COMPARAISON AVEC ACWI
+#  1 quater. PROJECTION MONTE CARLO
 # ===============================
-@bp.route("/compare_acwi", methods=["POST"])
-def compare_acwi():
+@bp.route("/simulate/montecarlo", methods=["POST"])
+def simulate_montecarlo():
     data = request.get_json() or {}
 
-    montant_initial = float(data.get("montant_initial", 10000))
+    # --------- Entrées (identiques à /simulate) ----------
+    montant_initial = float(data.get("montant_initial", 0))
     contribution = float(data.get("contribution", 0))
     frequence = data.get("frequence", "mensuelle")
+    try:
+        duree = int(data.get("duree") or 0)
+    except (TypeError, ValueError):
+        duree = 0
+    actif = (data.get("actif") or "etf").lower()
+    ticker = resolve_ticker(actif, data.get("ticker"))
     date_debut = int(data.get("date_debut", 2015))
     date_fin = int(data.get("date_fin", 2025))
 
-    rendement_portefeuille = float(data.get("rendement_portefeuille", 0.0))
-    hist_sim = data.get("historique_portefeuille") or []
+    # --------- Paramètres de la projection ----------
+    n_trajectoires = int(data.get("n_trajectoires", 10000))
+    methode = (data.get("methode") or "bootstrap").lower()
+    taille_bloc = int(data.get("taille_bloc", 12))
+    graine = data.get("graine")
+    graine = int(graine) if graine is not None else int(np.random.SeedSequence().entropy % 2**32)
+    objectif = data.get("objectif")
+    objectif = float(objectif) if objectif is not None else None
+
+    mois = duree * 12
+    if montant_initial <= 0 or duree <= 0:
+        return jsonify({"error": "Montant initial et durée doivent être positifs."}), 400
+    if methode not in METHODES:
+        return jsonify({"error": f"Méthode inconnue : {methode}."}), 400
+    if not 1 <= n_trajectoires <= current_app.config["MC_MAX_TRAJECTOIRES"]:
+        return jsonify({"error": f"Nombre de trajectoires hors limites (max {current_app.config['MC_MAX_TRAJECTOIRES']})."}), 400
+    if mois > current_app.config["MC_MAX_MOIS"]:
+        return jsonify({"error": f"Horizon trop long (max {current_app.config['MC_MAX_MOIS'] // 12} ans)."}), 400
+
+    frais_mensuel = FRAIS_GESTION_MAP.get(actif, 0.005) / 12.0
 
-    if not hist_sim:
+    try:
+        prix_mensuel = load_resampled(ticker, f"{date_debut}-01-01", f"{date_fin}-12-31", "ME")
+        if prix_mensuel is None:
+            return jsonify({"error": f"Aucune donnée trouvée pour {ticker}."}), 404
+
+        prices = prix_mensuel.values.astype(float)
+        rendements = prices[1:] / prices[:-1] - 1
+        if len(rendements) < 12:
+            return jsonify({"error": "Historique insuffisant pour la projection."}), 400
+
+        with etape("projection"):
+            resultat = projection(
+                rendements,
+                montant_initial,
+                contribution,
+                STEP_MAP.get(frequence, 1),
+                frais_mensuel,
+                mois,
+                n_trajectoires,
+                methode=methode,
+                taille_bloc=taille_bloc,
+                graine=graine,
+                objectif=objectif,
+                budget_mb=current_app.config["MC_BUDGET_MB"],
+            )
+
+        bandes = {q: v.tolist() for q, v in resultat["bandes"].items()}
+        bandes_mensuelles = [
+            {"periode": t, **{f"p{q}": round(bandes[q][t], 2) for q in bandes}}
+            for t in range(mois + 1)
+        ]
+
+        return jsonify({
+            "inputs": {
+                "montant_initial": montant_initial,
+                "contribution": contribution,
+                "frequence": frequence,
+                "duree": duree,
+                "actif": actif,
+                "ticker": ticker,
+                "date_debut": date_debut,
+                "date_fin": date_fin,
+                "n_trajectoires": n_trajectoires,
+                "methode": methode,
+                "taille_bloc": taille_bloc,
+                "graine": graine,
+                "objectif": objectif,
+            },
+            "resultats": {
+                "montant_total_investi": round(resultat["montant_investi"], 2),
+                "esperance_finale": round(resultat["esperance_finale"], 2),
+                "valeur_finale": {f"p{q}": round(bandes[q][-1], 2) for q in bandes},
+                "probabilite_objectif": (
+                    round(resultat["probabilite_objectif"], 4)
+                    if resultat["probabilite_objectif"] is not None else None
+                ),
+                "bandes": bandes_mensuelles,
+            },
+        })
+
+    except Exception as e:
+        logger.exception("Erreur /simulate/montecarlo")
+        return jsonify({"error": str(e)}), 500
+
+# ===============================
+#  2. COMPARAISON AVEC ACWI
+# ===============================
+@bp.route("/compare_acwi", methods=["POST"])
+def compare_acwi():
+    data = request.get_json() or {}
+
+    # avec un simulation_id, les paramètres et l'historique viennent du stockage serveur
+    try:
+        sim = simulation_depuis_id(data)
+    except ErreurSimulation as e:
+        return jsonify({"error": e.message}), e.status
+    defauts = sim["inputs"] if sim else {}
+
+    montant_initial = float(data.get("montant_initial", defauts.get("montant_initial", 10000)))
+    contribution = float(data.get("contribution", defauts.get("contribution", 0)))
+    frequence = data.get("frequence", defauts.get("frequence", "mensuelle"))
+    date_debut = int(data.get("date_debut", defauts.get("date_debut", 2015)))
+    date_fin = int(data.get("date_fin", defauts.get("date_fin", 2025)))
+
+    if sim:
+        rendement_portefeuille = float(data.get("rendement_portefeuille", sim["scalaires"]["rendement_total"]))
+        valeurs_portefeuille = valeurs_mensuelles(sim)
+    else:
+        rendement_portefeuille = float(data.get("rendement_portefeuille", 0.0))
+        hist_sim = data.get("historique_portefeuille") or []
+        valeurs_portefeuille = np.array([float(h["valeur"]) for h in hist_sim])
+
+    if not len(valeurs_portefeuille):
         return jsonify({"error": "Aucun historique de portefeuille reçu."}), 400
 
     try:
-        acwi_df = safe_download("ACWI", f"{date_debut}-01-01", f"{date_fin}-12-31", auto_adjust=True)
-        if acwi_df is None or acwi_df.empty:
-            acwi_df = safe_download("URTH", f"{date_debut}-01-01", f"{date_fin}-12-31", auto_adjust=True)
-        if acwi_df is None or acwi_df.empty:
+        prix_acwi_m = load_resampled("ACWI", f"{date_debut}-01-01", f"{date_fin}-12-31", "ME")
+        if prix_acwi_m is None:
+            prix_acwi_m = load_resampled("URTH", f"{date_debut}-01-01", f"{date_fin}-12-31", "ME")
+        if prix_acwi_m is None:
             return jsonify({"error": "Aucune donnée ACWI/URTH."}), 404
 
-        prix_acwi = pick_price(acwi_df)
-        prix_acwi_m = prix_acwi.resample("ME").last().dropna()
         if len(prix_acwi_m) < 2:
             return jsonify({"error": "Historique ACWI insuffisant."}), 400
 
-        n_port = len(hist_sim)
+        n_port = len(valeurs_portefeuille)
         n_acwi = len(prix_acwi_m)
 
         n = min(n_port, n_acwi)
@@ -326,14 +1119,9 @@ def compare_acwi():
 
         acwi_prices = prix_acwi_m.iloc[-n:]
         dates = acwi_prices.index
-        hist_vals = [float(h["valeur"]) for h in hist_sim][-n:]
-
-        step_map = {"mensuelle": 1, "trimestrielle": 3, "semestrielle": 6, "annuelle": 12}
-        step = step_map.get(frequence, 1)
+        hist_vals = valeurs_portefeuille[-n:].tolist()
 
-        units_acwi = 0.0
-        valeurs_acwi = []
-        montant_total_investi_acwi = 0.0
+        step = STEP_MAP.get(frequence, 1)
 
         prices = acwi_prices.values.astype(float)
 
@@ -341,20 +1129,9 @@ def compare_acwi():
         if first_price <= 0:
             return jsonify({"error": "Prix ACWI initial invalide."}), 400
 
-        units_acwi = montant_initial / first_price
-        montant_total_investi_acwi += montant_initial
-
-        for i, price in enumerate(prices):
-            price = float(price)
-            if price <= 0:
-                continue
-
-            if i > 0 and contribution > 0 and (i % step == 0):
-                units_acwi += contribution / price
-                montant_total_investi_acwi += contribution
-
-            valeur = units_acwi * price  # pas de frais sur l'indice
-            valeurs_acwi.append(float(valeur))
+        # pas de frais sur l'indice
+        with etape("simulation"):
+            valeurs_acwi, montant_total_investi_acwi = simulate_dca(prices, montant_initial, contribution, step)
 
         if len(valeurs_acwi) < 2:
             return jsonify({"error": "Simulation ACWI trop courte."}), 400
@@ -376,31 +1153,45 @@ def compare_acwi():
             interpretation = f"La performance de votre portefeuille est proche de celle de l’indice ACWI IMI."
 
         comparaison = [
-            {
-                "date": dates[i].strftime("%Y-%m"),
-                "portefeuille": round(hist_vals[i], 2),
-                "acwi": round(valeurs_acwi[i], 2),
-            }
-            for i in range(n)
+            {"date": d, "portefeuille": round(p, 2), "acwi": round(a, 2)}
+            for d, p, a in zip(dates.strftime("%Y-%m").tolist(), hist_vals, valeurs_acwi[:n].tolist())
         ]
 
-        return jsonify({
+        reponse = {
             "comparaison": comparaison,
             "rendement_portefeuille": round(float(rendement_portefeuille), 2),
             "rendement_acwi": round(float(rendement_acwi), 2),
             "ecart": round(float(ecart), 2),
             "interpretation": interpretation,
-        })
+        }
+        if sim:
+            # la simulation stockée peut être partagée entre clients : la
+            # comparaison va dans une copie, sous un identifiant dérivé des
+            # paramètres, à passer aux exports (tous workers)
+            compare = {
+                **sim,
+                "comparaison": {
+                    "dates": dates.values.astype("datetime64[D]"),
+                    "portefeuille": valeurs_portefeuille[-n:],
+                    "acwi": valeurs_acwi[:n],
+                },
+            }
+            reponse["simulation_id"] = result_store.put(compare, id_derive(
+                data["simulation_id"], montant_initial, contribution, frequence, date_debut, date_fin,
+                rendement_portefeuille,
+            ))
+
+        return jsonify(reponse)
 
     except Exception as e:
-        print("❌ ERREUR /compare_acwi :", e)
-        import traceback; traceback.print_exc()
+        logger.exception("Erreur /compare_acwi")
         return jsonify({"error": str(e)}), 500
     
 # ===============================
 #  3. PRÉDICTION DES RENDEMENTS
 # ===============================
 @bp.route("/predict_returns", methods=["POST"])
+@cache_reponse(plage_requete)
 def predict_returns():
     data = request.get_json() or {}
     actif = (data.get("actif") or "etf").lower()
@@ -409,59 +1200,34 @@ def predict_returns():
     date_fin = int(data.get("date_fin", 2025))
 
     try:
-        df = safe_download(
-            ticker,
-            f"{date_debut}-01-01",
-            f"{date_fin}-12-31",
-            auto_adjust=True,
-        )
-        if df is None or df.empty:
+        prix_trimestriel = load_resampled(ticker, f"{date_debut}-01-01", f"{date_fin}-12-31", "QE")
+        if prix_trimestriel is None:
             return jsonify({"error": f"Aucune donnée trouvée pour {ticker}."}), 404
 
-        prix = pick_price(df)
-        if prix is None or prix.empty:
-            return jsonify({"error": f"Pas de colonne de prix valide pour {ticker}."}), 404
-
-        prix_trimestriel = prix.resample("QE").last().dropna()
         rendements = prix_trimestriel.pct_change().dropna() * 100
 
         if len(rendements) < 10:
             return jsonify({"error": "Série trop courte pour effectuer une régression."}), 400
 
-        X = np.arange(len(rendements)).reshape(-1, 1)
         y = rendements.values.astype(float)
+        with etape("regression"):
+            reg = tendance_lineaire(y)
+        trend = reg.tendance
+        future_pred = reg.futur
+        beta = float(reg.beta)
+        std_resid = float(reg.ecart_type)
+        mean_hist = float(reg.moyenne)
+        mean_future = float(reg.moyenne_future)
+        borne_inf = float(reg.borne_inf)
+        borne_sup = float(reg.borne_sup)
 
-        model = LinearRegression().fit(X, y)
-        trend = model.predict(X)
-        beta = float(model.coef_[0])  
-
-        future_X = np.arange(len(rendements), len(rendements) + 12).reshape(-1, 1)
-        future_pred = model.predict(future_X)
-
-        residuals = y - trend
-        std_resid = float(np.std(residuals, ddof=1))  
-
-        mean_hist = float(np.mean(rendements))
-        mean_future = float(np.mean(future_pred))
-
-        n = len(rendements)
-        stderr = std_resid / np.sqrt(n)
-        t_crit = stats.t.ppf(0.975, df=max(n - 1, 1))
-        margin = t_crit * stderr
-
-        borne_inf = mean_future - margin
-        borne_sup = mean_future + margin
         hist_data = [
-                    {
-                        "periode": i + 1,
-                        "rendement": float(rendements.iloc[i]),
-                        "tendance": float(trend[i]),
-                    }
-                    for i in range(len(rendements))
-                    ]
+            {"periode": i + 1, "rendement": r, "tendance": t}
+            for i, (r, t) in enumerate(zip(y.tolist(), trend.tolist()))
+        ]
         futur_data = [
-            {"periode": len(rendements) + i + 1, "prediction": float(v)}
-            for i, v in enumerate(future_pred)
+            {"periode": len(rendements) + i + 1, "prediction": v}
+            for i, v in enumerate(future_pred.tolist())
         ]
 
         return jsonify({
@@ -485,14 +1251,78 @@ def predict_returns():
         })
 
     except Exception as e:
-        print("❌ ERREUR /predict_returns :", e)
-        import traceback; traceback.print_exc()
+        logger.exception("Erreur /predict_returns")
+        return jsonify({"error": str(e)}), 500
+
+def plages_univers(data):
+    tickers = data.get("tickers") or [t for categorie in UNIVERSE.values() for t in categorie]
+    if not isinstance(tickers, list):
+        raise TypeError("tickers doit être une liste")
+    date_debut = int(data.get("date_debut", 2015))
+    date_fin = int(data.get("date_fin", 2025))
+    return [(str(t).strip(), f"{date_debut}-01-01", f"{date_fin}-12-31") for t in dict.fromkeys(tickers)]
+
+
+@bp.route("/predict_returns/batch", methods=["POST"])
+@cache_reponse(plages_univers)
+def predict_returns_batch():
+    data = request.get_json() or {}
+    try:
+        plages = plages_univers(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Paramètres invalides : {e}"}), 400
+    tickers = [t for t, _, _ in plages]
+    start, end = plages[0][1], plages[0][2]
+
+    try:
+        # une colonne de rendements trimestriels (%) par ticker, NaN hors historique
+        series = load_resampled_many(tickers, start, end, "QE")
+        rendements = {}
+        erreurs = []
+        for ticker in tickers:
+            prix = series.get(ticker)
+            if prix is None:
+                erreurs.append({"ticker": ticker, "error": f"Aucune donnée trouvée pour {ticker}."})
+                continue
+            r = prix.pct_change().dropna() * 100
+            if len(r) < 10:
+                erreurs.append({"ticker": ticker, "error": "Série trop courte pour effectuer une régression."})
+                continue
+            rendements[ticker] = r
+
+        resultats = []
+        if rendements:
+            matrice = pd.concat(rendements, axis=1)
+            with etape("regression"):
+                reg = tendance_lineaire(matrice.to_numpy(dtype=float))
+            for j, ticker in enumerate(matrice.columns):
+                resultats.append({
+                    "ticker": ticker,
+                    "actif": categorie_ticker(ticker),
+                    "n": int(reg.n[j]),
+                    "beta": float(reg.beta[j]),
+                    "rendement_moyen": round(float(reg.moyenne[j]), 4),
+                    "rendement_prevu_moyen": round(float(reg.moyenne_future[j]), 4),
+                    "ecart_type": round(float(reg.ecart_type[j]), 4),
+                    "intervalle_confiance": {
+                        "niveau": "95%",
+                        "borne_inf": round(float(reg.borne_inf[j]), 4),
+                        "borne_sup": round(float(reg.borne_sup[j]), 4),
+                    },
+                })
+
+        return jsonify({"horizon": HORIZON, "resultats": resultats, "erreurs": erreurs})
+
+    except Exception as e:
+        logger.exception("Erreur /predict_returns/batch")
         return jsonify({"error": str(e)}), 500
 
+
 # ===============================
 #  4. COMPARAISON DCA VS LUMP SUM
 # ===============================
 @bp.route("/compare_strategies", methods=["POST"])
+@cache_reponse(plage_requete)
 def compare_strategies():
     data = request.get_json() or {}
     actif = (data.get("actif") or "etf").lower()
@@ -502,54 +1332,72 @@ def compare_strategies():
     date_fin = int(data.get("date_fin", 2025))
 
     try:
-        df = safe_download(ticker, f"{date_debut}-01-01", f"{date_fin}-12-31", auto_adjust=True)
-        if df is None or df.empty:
+        resolution = lire_resolution(data)
+    except ErreurSimulation as e:
+        return jsonify({"error": e.message}), e.status
+
+    try:
+        prix = load_resampled(ticker, f"{date_debut}-01-01", f"{date_fin}-12-31", RESOLUTIONS[resolution][0])
+        if prix is None:
             return jsonify({"error": f"Aucune donnée trouvée pour {ticker}."}), 404
-        prix = pick_price(df)
-        prix_mensuel = prix.resample("ME").last().dropna()
 
-        n = len(prix_mensuel)
-        contribution = montant_initial / n
+        n = len(prix)
+        p = prix.to_numpy(dtype=float)
 
         # Lump sum
-        lump_sum = montant_initial * (prix_mensuel / prix_mensuel.iloc[0])
-
-        # DCA mensuel
-        valeur_dca = (contribution / prix_mensuel).cumsum() * prix_mensuel
-
-        # DCA trimestriel / semestriel / annuel
-        valeur_trim = ((montant_initial / len(prix_mensuel[::3])) / prix_mensuel[::3]).cumsum().reindex(prix_mensuel.index, method="ffill") * prix_mensuel
-        valeur_sem = ((montant_initial / len(prix_mensuel[::6])) / prix_mensuel[::6]).cumsum().reindex(prix_mensuel.index, method="ffill") * prix_mensuel
-        valeur_ann = ((montant_initial / len(prix_mensuel[::12])) / prix_mensuel[::12]).cumsum().reindex(prix_mensuel.index, method="ffill") * prix_mensuel
-
-        data_points = [
-            {
-                "date": d.strftime("%Y-%m"),
-                "LumpSum": round(float(lump_sum.iloc[i]), 2),
-                "DCA_mensuel": round(float(valeur_dca.iloc[i]), 2),
-                "DCA_trimestriel": round(float(valeur_trim.iloc[i]), 2),
-                "DCA_semestriel": round(float(valeur_sem.iloc[i]), 2),
-                "DCA_annuel": round(float(valeur_ann.iloc[i]), 2),
+        lump_sum = montant_initial * (p / p[0])
+
+        # DCA mensuel / trimestriel / semestriel / annuel : le montant est
+        # réparti sur les dates d'achat (1re séance du mois en quotidien)
+        def dca(pas):
+            if resolution == "daily":
+                achats = contribution_mask_dates(prix.index.values, pas)
+                achats[0] = True
+            else:
+                achats = np.arange(n) % pas == 0
+            unites = np.where(achats, (montant_initial / achats.sum()) / p, 0.0).cumsum()
+            return unites * p
+
+        with etape("simulation"):
+            valeurs = {
+                "LumpSum": lump_sum,
+                "DCA_mensuel": dca(1),
+                "DCA_trimestriel": dca(3),
+                "DCA_semestriel": dca(6),
+                "DCA_annuel": dca(12),
             }
-            for i, d in enumerate(prix_mensuel.index)
-        ]
-
+        colonnes = list(valeurs)
         rendements = {
-            "LumpSum": round(float(lump_sum.iloc[-1] / montant_initial - 1) * 100, 2),
-            "DCA_mensuel": round(float(valeur_dca.iloc[-1] / montant_initial - 1) * 100, 2),
-            "DCA_trimestriel": round(float(valeur_trim.iloc[-1] / montant_initial - 1) * 100, 2),
-            "DCA_semestriel": round(float(valeur_sem.iloc[-1] / montant_initial - 1) * 100, 2),
-            "DCA_annuel": round(float(valeur_ann.iloc[-1] / montant_initial - 1) * 100, 2),
+            nom: round(float(v_nom[-1] / montant_initial - 1) * 100, 2)
+            for nom, v_nom in valeurs.items()
         }
+        if resolution == "daily":
+            # séries conservées en float32 pendant la construction des tranches
+            valeurs = {nom: v_nom.astype(np.float32) for nom, v_nom in valeurs.items()}
+        mois = prix.index.strftime("%Y-%m-%d" if resolution == "daily" else "%Y-%m").tolist()
+
+        def tranche(debut, fin):
+            arrondies = {nom: [round(v, 2) for v in v_nom[debut:fin].tolist()] for nom, v_nom in valeurs.items()}
+            return [
+                {"date": d, **{nom: arrondies[nom][i] for nom in colonnes}}
+                for i, d in enumerate(mois[debut:fin])
+            ]
+
+        mode = mode_flux()
+        if mode:
+            return reponse_flux(
+                mode,
+                {"ticker": ticker, "rendements": rendements},
+                [("strategies", n, tranche)],
+            )
 
         return jsonify({
             "ticker": ticker,
-            "strategies": data_points,
+            "strategies": tranche(0, n),
             "rendements": rendements,
         })
     except Exception as e:
-        print("❌ ERREUR /compare_strategies :", e)
-        traceback.print_exc()
+        logger.exception("Erreur /compare_strategies")
         return jsonify({"error": str(e)}), 500
     
 # ========== EXPORT PDF & EXCEL ==========
@@ -557,202 +1405,222 @@ def compare_strategies():
 def export_pdf():
     data = request.get_json() or {}
 
-    if "resultats" not in data:
+    try:
+        sim = simulation_depuis_id(data)
+    except ErreurSimulation as e:
+        return jsonify({"error": e.message}), e.status
+
+    if sim:
+        resultats = ratios_simulation(sim)
+        inputs = sim["inputs"]
+    elif "resultats" in data:
+        resultats = data["resultats"]
+        inputs = data.get("inputs", {})
+    else:
         return {"error": "Missing simulation results"}, 400
-
-    resultats = data["resultats"]
-    inputs = data.get("inputs", {})
-    graphs = data.get("graphs", {})
-
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    def on_page(canvas, doc):
-        canvas.setFillColor(colors.HexColor("#111118"))
-        canvas.rect(0, 0, A4[0], A4[1], fill=1)
-
-    styles = getSampleStyleSheet()
-    title = ParagraphStyle(
-    "title",
-    parent=styles["Heading1"],
-    textColor=colors.HexColor("#b8a4ff"), 
-    fontSize=22,
-    alignment=1
-)
-
-    subtitle = ParagraphStyle(
-        "subtitle",
-        parent=styles["Heading2"],
-        textColor=colors.HexColor("#9f91f7"),  # violet doux
-        fontSize=16,
-        spaceBefore=10
-    )
-
-    normal = ParagraphStyle(
-        "normal",
-        parent=styles["BodyText"],
-        fontSize=11,
-        textColor=colors.white,
-    )
-
-    elements = []
-
-    # ---- TITRE ----
-    elements.append(Paragraph("Rapport de Simulation de Portefeuille", title))
-    elements.append(Spacer(1, 18))
-
-    # ---- PARAMETRES ----
-    elements.append(Paragraph("<b>Paramètres de simulation</b>", subtitle))
-    elements.append(Spacer(1, 8))
-
-    table_data = [
-        ["Montant initial", f"{inputs.get('montant_initial',0)} €"],
-        ["Contribution", f"{inputs.get('contribution',0)} € ({inputs.get('frequence','')})"],
-        ["Actif", f"{inputs.get('actif','')} - {inputs.get('ticker','')}"],
-        ["Période", f"{inputs.get('date_debut','')} → {inputs.get('date_fin','')}"],
-        ["Durée", f"{inputs.get('duree','')} ans"],
-    ]
-
-    table = Table(table_data, colWidths=[150, 300])
-    table.setStyle(TableStyle([
-        ('BACKGROUND',(0,0),(-1,-1),colors.HexColor("#1c1a24")),
-        ('TEXTCOLOR',(0,0),(-1,-1),colors.white),
-        ('BOX',(0,0),(-1,-1),1,colors.HexColor("#7c6cff")),
-        ('INNERGRID',(0,0),(-1,-1),0.5,colors.HexColor("#7c6cff")),
-    ]))
-
-    elements.append(table)
-    elements.append(Spacer(1, 18))
-
-    # ---- RATIOS ----
-    elements.append(Paragraph("<b>Ratios financiers</b>", subtitle))
-    elements.append(Spacer(1, 8))
-
-    ratios_table = Table([
-        ["Sharpe", resultats.get("ratio_sharpe")],
-        ["Volatilité", resultats.get("volatilite")],
-        ["CAGR", resultats.get("cagr")],
-        ["Rendement total (%)", resultats.get("rendement_total")],
-    ], colWidths=[150, 300])
-
-    ratios_table.setStyle(TableStyle([
-        ('BACKGROUND',(0,0),(1,0),colors.HexColor("#2b2154")),
-        ('TEXTCOLOR',(0,0),(1,-1),colors.white),
-        ('BOX',(0,0),(-1,-1),1,colors.HexColor("#7c6cff")),
-        ('INNERGRID',(0,0),(-1,-1),0.5,colors.HexColor("#7c6cff")),
-    ]))
-
-    elements.append(ratios_table)
-    elements.append(Spacer(1, 24))
-
-    # ---- Fonction d’ajout de graphe + interprétation ----
-    def add_graph(title_text, graph_key, interpretation=None):
-        if graph_key not in graphs or graphs[graph_key] is None:
-            return
-
-        elements.append(Paragraph(f"<b>{title_text}</b>", subtitle))
-        elements.append(Spacer(1, 8))
-
-        # image
-        img_data = graphs[graph_key].split(",")[1]
-        img_bytes = base64.b64decode(img_data)
-        img = Image(io.BytesIO(img_bytes), width=500, height=260)
-        elements.append(img)
-        elements.append(Spacer(1, 8))
-
-        # interprétation sous le graphe :
-        if interpretation:
-            elements.append(Paragraph(interpretation, normal))
-            elements.append(Spacer(1, 20))
-
-    # ---- Ajout des graphes + interpretations ----
-    add_graph(
-        "Performance cumulée",
-        "performance",
-        interpretation=data.get("interpretations", {}).get("performance")
-    )
-
-    add_graph(
-        "Histogramme des rendements",
-        "histogram",
-        interpretation=data.get("interpretations", {}).get("histogram")
-    )
-
-    add_graph(
-        "Sharpe ratio glissant",
-        "sharpe",
-        interpretation=data.get("interpretations", {}).get("sharpe")
-    )
-
-    add_graph(
-        "Évolution du PER",
-        "per",
-        interpretation=data.get("interpretations", {}).get("per")
-    )
-
-    add_graph(
-        "Comparaison avec ACWI",
-        "compare",
-        interpretation=data.get("interpretations", {}).get("compare")
+    payload = {
+        "inputs": inputs,
+        "resultats": resultats,
+        "graphs": data.get("graphs", {}),
+        "interpretations": data.get("interpretations", {}),
+    }
+    # "graphes": "serveur" : graphiques tracés depuis la simulation stockée,
+    # le navigateur n'envoie plus d'images
+    if data.get("graphes") == "serveur":
+        if not sim:
+            return jsonify({"error": "Les graphiques serveur nécessitent un simulation_id"}), 400
+        payload["graphes_serveur"] = graphes_simulation(sim)
+
+    # mode asynchrone : rendu dans le pool de processus, suivi par job_id
+    if data.get("async") or request.args.get("async") == "1":
+        with etape("rendu_pdf"):
+            job_id = pdf_jobs.soumettre(payload)
+        return jsonify({**pdf_jobs.etat(job_id), "url": f"/export/pdf/{job_id}"}), 202
+
+    with etape("rendu_pdf"):
+        pdf = pdf_jobs.rendre(payload)
+    return send_file(
+        io.BytesIO(pdf),
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name="rapport_portefeuille.pdf"
     )
 
-    add_graph(
-        "Prédiction des rendements",
-        "predict",
-        interpretation=data.get("interpretations", {}).get("predict")
-    )
 
-    # ---- Génération PDF ----
-    doc.build(elements, onFirstPage=on_page, onLaterPages=on_page)
+@bp.route("/export/pdf/<job_id>", methods=["GET"])
+def export_pdf_job(job_id):
+    etat = pdf_jobs.etat(job_id)
+    if etat is None:
+        return jsonify({"error": "Export PDF inconnu ou expiré"}), 404
+    if etat["statut"] != "termine" or request.args.get("statut") == "1":
+        return jsonify(etat)
 
-    buffer.seek(0)
     return send_file(
-        buffer,
+        io.BytesIO(pdf_jobs.fichier(job_id)),
         mimetype="application/pdf",
         as_attachment=True,
         download_name="rapport_portefeuille.pdf"
     )
 
-@bp.route("/export/excel", methods=["POST"])
-def export_excel():
-    data = request.get_json() or {}
-
-    if "resultats" not in data:
-        return jsonify({"error": "Missing simulation results"}), 400
-
-    resultats = data["resultats"]
-    inputs = data.get("inputs", {})
 
-    # Création Excel
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        pd.DataFrame([inputs]).to_excel(writer, sheet_name="Paramètres", index=False)
-        pd.DataFrame(resultats.get("historique", [])).to_excel(writer, sheet_name="Historique", index=False)
-        pd.DataFrame(resultats.get("rendements", [])).to_excel(writer, sheet_name="Rendements", index=False)
-        pd.DataFrame([{
+def feuilles_export(inputs, resultats):
+    # (nom de la feuille, DataFrame, écrire l'index)
+    feuilles = [
+        ("Paramètres", pd.DataFrame([inputs]), False),
+        ("Historique", pd.DataFrame(resultats.get("historique", [])), False),
+        ("Rendements", pd.DataFrame(resultats.get("rendements", [])), False),
+        ("Ratios", pd.DataFrame([{
             "Sharpe": resultats.get("ratio_sharpe"),
             "Volatilité": resultats.get("volatilite"),
             "CAGR": resultats.get("cagr"),
             "Rendement total (%)": resultats.get("rendement_total"),
             "Montant investi": resultats.get("montant_total_investi"),
             "Valeur finale": resultats.get("portefeuille_final_estime"),
-        }]).to_excel(writer, sheet_name="Ratios", index=False)
+        }]), False),
+    ]
+    if resultats.get("sharpe_rolling"):
+        feuilles.append(("Sharpe glissant", pd.DataFrame(resultats["sharpe_rolling"]), True))
+    if resultats.get("per_series"):
+        feuilles.append(("PER", pd.DataFrame(resultats["per_series"]), True))
+    if resultats.get("comparaison_indice"):
+        feuilles.append(("Comparaison indice", pd.DataFrame(resultats["comparaison_indice"]), True))
+    if resultats.get("predictions"):
+        feuilles.append(("Prédictions", pd.DataFrame(resultats["predictions"]), True))
+    return feuilles
+
+
+def feuilles_simulation(sim):
+    # mêmes feuilles que feuilles_export, colonnes lues dans les tableaux de
+    # la simulation et converties paquet par paquet à l'écriture
+    unite = "D" if sim.get("resolution") == "daily" else "M"
+    n = len(sim["valeurs"])
+    n_per = len(sim["per"])
+    feuilles = feuilles_export(sim["inputs"], ratios_simulation(sim))[:4]
+    feuilles[1] = ("Historique", Tableau({
+        "periode": range(1, n + 1),
+        "valeur": Colonne(sim["valeurs"], 2),
+    }), False)
+    feuilles[2] = ("Rendements", Tableau({
+        "periode": range(1, n),
+        "date": Colonne(sim["dates"][1:n], unite=unite),
+        "rendement": Colonne(sim["rendements"], 3, echelle=100),
+    }), False)
+    if len(sim["sharpe_rolling"]):
+        feuilles.append(("Sharpe glissant", Tableau({
+            "periode": range(sim["fenetre"], sim["fenetre"] + len(sim["sharpe_rolling"])),
+            "valeur": Colonne(sim["sharpe_rolling"], 3),
+        }), True))
+    if n_per:
+        feuilles.append(("PER", Tableau({
+            "periode": range(1, n_per + 1),
+            "date": Colonne(sim["dates"][1:n_per + 1], unite=unite),
+            "per": Colonne(sim["per"], 2),
+        }), True))
+    if "comparaison" in sim:
+        comp = sim["comparaison"]
+        feuilles.append(("Comparaison indice", Tableau({
+            "date": Colonne(comp["dates"], unite="M"),
+            "portefeuille": Colonne(comp["portefeuille"], 2),
+            "acwi": Colonne(comp["acwi"], 2),
+        }), True))
+    return feuilles
+
+
+def feuilles_requete(data):
+    sim = simulation_depuis_id(data)
+    if sim:
+        feuilles = feuilles_simulation(sim)
+    elif "resultats" in data:
+        feuilles = feuilles_export(data.get("inputs", {}), data["resultats"])
+    else:
+        raise ErreurSimulation("Missing simulation results")
+
+    # "feuille" : une seule feuille au lieu du classeur / de l'archive
+    nom = data.get("feuille")
+    if nom:
+        feuilles = [f for f in feuilles if f[0] == nom]
+        if not feuilles:
+            raise ErreurSimulation(f"Feuille inconnue : {nom}", 404)
+    return feuilles
+
 
-        if resultats.get("sharpe_rolling"):
-            pd.DataFrame(resultats["sharpe_rolling"]).to_excel(writer, sheet_name="Sharpe glissant")
-        if resultats.get("per_series"):
-            pd.DataFrame(resultats["per_series"]).to_excel(writer, sheet_name="PER")
-        if resultats.get("comparaison_indice"):
-            pd.DataFrame(resultats["comparaison_indice"]).to_excel(writer, sheet_name="Comparaison indice")
-        if resultats.get("predictions"):
-            pd.DataFrame(resultats["predictions"]).to_excel(writer, sheet_name="Prédictions")
+@bp.route("/export/excel", methods=["POST"])
+def export_excel():
+    data = request.get_json() or {}
 
-    output.seek(0)
+    try:
+        feuilles = feuilles_requete(data)
+    except ErreurSimulation as e:
+        return jsonify({"error": e.message}), e.status
 
+    # classeur write_only écrit sur disque puis envoyé par morceaux
+    with etape("export"):
+        fichier = ecrire_xlsx(feuilles)
     return send_file(
-        output,
+        fichier,
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         as_attachment=True,
         download_name="rapport_portefeuille.xlsx"
     )
 
 
+@bp.route("/export/csv", methods=["POST"])
+def export_csv():
+    data = request.get_json() or {}
+
+    try:
+        feuilles = feuilles_requete(data)
+    except ErreurSimulation as e:
+        return jsonify({"error": e.message}), e.status
+
+    if len(feuilles) == 1:
+        nom, df, index = feuilles[0]
+        return Response(
+            flux_csv(df, index),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(nom)}.csv"},
+        )
+
+    with etape("export"):
+        archive = ecrire_zip(feuilles, "csv")
+    return send_file(
+        archive,
+        mimetype="application/zip",
+        as_attachment=True,
+        download_name="rapport_portefeuille_csv.zip"
+    )
+
+
+@bp.route("/export/parquet", methods=["POST"])
+def export_parquet():
+    data = request.get_json() or {}
+
+    if not parquet_disponible():
+        return jsonify({"error": "Export Parquet indisponible : pyarrow n'est pas installé"}), 501
+
+    try:
+        feuilles = feuilles_requete(data)
+    except ErreurSimulation as e:
+        return jsonify({"error": e.message}), e.status
+
+    if len(feuilles) == 1:
+        nom, df, index = feuilles[0]
+        fichier = tempfile.TemporaryFile()
+        with etape("export"):
+            ecrire_parquet(df, index, fichier)
+        fichier.seek(0)
+        return send_file(
+            fichier,
+            mimetype="application/vnd.apache.parquet",
+            as_attachment=True,
+            download_name=f"{nom}.parquet"
+        )
+
+    with etape("export"):
+        archive = ecrire_zip(feuilles, "parquet")
+    return send_file(
+        archive,
+        mimetype="application/zip",
+        as_attachment=True,
+        download_name="rapport_portefeuille_parquet.zip"
+    )
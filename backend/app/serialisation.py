@@ -0,0 +1,159 @@
+import gzip
+import logging
+
+import numpy as np
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from .metrics import etape
+
+try:
+    import orjson
+except ImportError:  # installation incomplète : repli sur json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # installation incomplète : gzip seul
+    brotli = None
+
+# ===============================
+#  SÉRIALISATION ET COMPRESSION DES RÉPONSES
+# ===============================
+# - JSON via orjson (tableaux NumPy sérialisés nativement) ; repli sur json,
+#   signalé au démarrage, si le paquet manque.
+# - Format colonnes (opt-in : ?format=colonnes ou "format": "colonnes") :
+#   chaque liste de dicts homogènes devient {"n": N, "colonnes": {...}} ;
+#   une colonne d'entiers en progression arithmétique devient
+#   {"debut", "pas"}, une colonne de mois consécutifs {"debut", "pas_mois"},
+#   les autres dates {"epoch_jours": [...]}.
+# - Compression br / gzip négociée via Accept-Encoding.
+
+logger = logging.getLogger(__name__)
+
+FORMAT_COLONNES = "colonnes"
+TYPES_COMPRESSIBLES = ("application/json", "application/x-ndjson", "text/")
+
+
+def format_colonnes():
+    if request.args.get("format") == FORMAT_COLONNES:
+        return True
+    data = request.get_json(silent=True)
+    return isinstance(data, dict) and data.get("format") == FORMAT_COLONNES
+
+
+# ---------- format colonnes ----------
+def colonne_entiers(valeurs):
+    if len(valeurs) > 1 and all(type(v) is int for v in valeurs):
+        pas = valeurs[1] - valeurs[0]
+        if all(b - a == pas for a, b in zip(valeurs, valeurs[1:])):
+            return {"debut": valeurs[0], "pas": pas}
+    return None
+
+
+def colonne_dates(dates):
+    """dates : tableau datetime64 (jour ou mois)."""
+    mois = dates.astype("datetime64[M]")
+    if len(dates) > 1 and np.datetime_data(dates.dtype)[0] == "M":
+        ecarts = np.diff(mois.astype(np.int64))
+        if ecarts[0] > 0 and (ecarts == ecarts[0]).all():
+            return {"debut": str(mois[0]), "pas_mois": int(ecarts[0])}
+    return {"epoch_jours": dates.astype("datetime64[D]").astype(np.int64)}
+
+
+def _colonne(valeurs):
+    compacte = colonne_entiers(valeurs)
+    if compacte is not None:
+        return compacte
+    if valeurs and all(isinstance(v, str) for v in valeurs):
+        try:
+            dates = np.array(valeurs, dtype="datetime64")
+        except ValueError:
+            return valeurs
+        return colonne_dates(dates)
+    return valeurs
+
+
+def en_colonnes(obj):
+    if isinstance(obj, dict):
+        return {k: en_colonnes(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        if obj and all(isinstance(x, dict) for x in obj):
+            cles = list(obj[0])
+            if all(len(x) == len(cles) and all(k in x for k in cles) for x in obj):
+                return {
+                    "n": len(obj),
+                    "colonnes": {k: _colonne([x[k] for x in obj]) for k in cles},
+                }
+        return [en_colonnes(x) for x in obj]
+    return obj
+
+
+def signaler_replis():
+    # appelé une fois au démarrage : orjson et brotli figurent dans requirements.txt
+    if orjson is None:
+        logger.warning("orjson absent : sérialisation JSON par la bibliothèque standard")
+    if brotli is None:
+        logger.warning("brotli absent : compression gzip uniquement")
+
+
+# ---------- JSON ----------
+class FastJSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(o):
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def response(self, *args, **kwargs):
+        with etape("serialisation"):
+            obj = self._prepare_response_obj(args, kwargs)
+            if has_request_context() and format_colonnes():
+                obj = en_colonnes(obj)
+            return super().response(obj)
+
+
+# ---------- compression ----------
+def compresser_reponse(response, min_octets=500, niveau=6):
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or not response.mimetype.startswith(TYPES_COMPRESSIBLES)
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    accepte = request.accept_encodings
+    corps = response.get_data()
+    if len(corps) < min_octets:
+        return response
+
+    if brotli is not None and accepte["br"]:
+        response.set_data(brotli.compress(corps, quality=min(niveau, 11)))
+        response.headers["Content-Encoding"] = "br"
+    elif accepte["gzip"]:
+        response.set_data(gzip.compress(corps, compresslevel=niveau))
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        return response
+
+    # l'ETag désigne le contenu, pas son encodage
+    etag, faible = response.get_etag()
+    if etag and not faible:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .price_store import normaliser_ticker
+
+# ===============================
+#  CACHE LRU DES SÉRIES RÉÉCHANTILLONNÉES
+# ===============================
+# Clé : (ticker, début, fin, fréquence). On conserve les dates (datetime64)
+# et les prix (float64) en lecture seule ; la taille est comptée en octets
+# et les entrées les moins récemment utilisées sont évincées au-delà de max_mb.
+# Le ticker est normalisé (majuscules) : la casse saisie par le client ne
+# doit pas empêcher l'invalidation par le stockage des cours.
+
+
+def _cle(key):
+    return (normaliser_ticker(key[0]), *key[1:])
+
+
+class SeriesCache:
+    def __init__(self, max_mb=64, ttl=None):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.max_bytes = int(app.config["SERIES_CACHE_MB"] * 1024 * 1024)
+        self.ttl = app.config["SERIES_CACHE_TTL"]
+
+    def get(self, key):
+        key = _cle(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[3] > self.ttl:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        dates, values = entry[0], entry[1]
+        return pd.Series(values, index=pd.DatetimeIndex(dates, name="Date"), name="Close")
+
+    def put(self, key, serie):
+        key = _cle(key)
+        dates = np.asarray(serie.index.values, dtype="datetime64[ns]").copy()
+        values = np.asarray(serie.values, dtype=np.float64).copy()
+        dates.flags.writeable = False
+        values.flags.writeable = False
+        size = dates.nbytes + values.nbytes
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (dates, values, size, time.time())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2]
+
+    def invalidate(self, ticker):
+        ticker = normaliser_ticker(ticker)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == ticker]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entrees": len(self._entries),
+                "taille_mb": round(self._bytes / (1024 * 1024), 3),
+                "limite_mb": round(self.max_bytes / (1024 * 1024), 3),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+series_cache = SeriesCache()
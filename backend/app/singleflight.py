@@ -0,0 +1,66 @@
+import threading
+
+# ===============================
+#  COALESCENCE DES TÉLÉCHARGEMENTS (SINGLE-FLIGHT)
+# ===============================
+# Les appels concurrents portant sur la même clé attendent l'unique
+# téléchargement en cours et partagent son résultat (ou son exception).
+
+
+class _Appel:
+    __slots__ = ("event", "resultat", "erreur")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.resultat = None
+        self.erreur = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_cours = {}
+        self.appels = 0
+        self.coalesces = 0
+        self.executions = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            self.appels += 1
+            appel = self._en_cours.get(key)
+            meneur = appel is None
+            if meneur:
+                appel = self._en_cours[key] = _Appel()
+            else:
+                self.coalesces += 1
+
+        if not meneur:
+            appel.event.wait()
+            if appel.erreur is not None:
+                raise appel.erreur
+            return appel.resultat
+
+        try:
+            appel.resultat = fn()
+            return appel.resultat
+        except Exception as e:
+            appel.erreur = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_cours[key]
+                self.executions += 1
+            appel.event.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "appels": self.appels,
+                "coalesces": self.coalesces,
+                "executions": self.executions,
+                "en_cours": len(self._en_cours),
+                "taux_coalescence": round(self.coalesces / self.appels, 4) if self.appels else 0.0,
+            }
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,45 @@
+from flask import Response, current_app, request, stream_with_context
+
+# ===============================
+#  RÉPONSES EN FLUX (NDJSON / SSE)
+# ===============================
+# Opt-in : ?stream=ndjson|sse ou "stream" dans le corps JSON. Le premier
+# événement ("entete") porte les indicateurs principaux ; les séries
+# suivent par tranches de TAILLE_TRANCHE lignes ("serie"), construites à
+# la volée depuis les tableaux ; "fin" clôt le flux. Seule la tranche en
+# cours existe sous forme de liste de dicts.
+
+MODES_FLUX = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+TAILLE_TRANCHE = 500
+
+
+def mode_flux():
+    mode = request.args.get("stream")
+    if mode is None:
+        data = request.get_json(silent=True)
+        mode = data.get("stream") if isinstance(data, dict) else None
+    return mode if mode in MODES_FLUX else None
+
+
+def _evenement(mode, type_evenement, payload):
+    if mode == "sse":
+        return f"event: {type_evenement}\ndata: {current_app.json.dumps(payload)}\n\n"
+    return current_app.json.dumps({"type": type_evenement, **payload}) + "\n"
+
+
+def reponse_flux(mode, entete, series, taille=TAILLE_TRANCHE):
+    """series : itérable de (nom, nombre de lignes, tranche(debut, fin) -> [dict])."""
+
+    def generer():
+        yield _evenement(mode, "entete", entete)
+        for nom, n, tranche in series:
+            for debut in range(0, n, taille):
+                fin = min(debut + taille, n)
+                yield _evenement(mode, "serie", {"nom": nom, "debut": debut, "lignes": tranche(debut, fin)})
+        yield _evenement(mode, "fin", {})
+
+    response = Response(stream_with_context(generer()), mimetype=MODES_FLUX[mode])
+    response.headers["Cache-Control"] = "no-cache"
+    # nginx : pas de mise en tampon, chaque tranche part immédiatement
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
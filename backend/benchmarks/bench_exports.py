@@ -0,0 +1,108 @@
+"""Benchmark des exports tabulaires : classeur pandas/openpyxl en mémoire
+(ancienne implémentation) contre le classeur write_only sur disque, le CSV
+en flux et le Parquet (si pyarrow est installé).
+
+Chaque mesure tourne dans un processus séparé pour isoler le pic de RSS
+(ru_maxrss) ; on rapporte l'augmentation du pic pendant la construction
+des feuilles et l'export, la simulation étant déjà en mémoire. Les simulations sont synthétiques (aucun appel
+réseau), de longueur --lignes (ex. historique quotidien sur 30 ans).
+
+    python benchmarks/bench_exports.py --lignes 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ("pandas", "write_only", "csv", "parquet")
+
+
+def simulation(n, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    valeurs = 10000 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, n)))
+    rendements = np.diff(valeurs) / valeurs[:-1]
+    return {
+        "inputs": {"montant_initial": 10000, "contribution": 200, "frequence": "mensuelle",
+                   "duree": 30, "actif": "etf", "ticker": "ACWI", "date_debut": 1995, "date_fin": 2024},
+        "scalaires": {"portefeuille_final_estime": valeurs[-1], "montant_total_investi": 80000.0,
+                      "volatilite": 0.15, "ratio_sharpe": 0.6, "cagr": 0.07, "rendement_total": 120.0},
+        "dates": np.datetime64("1995-01-01") + np.arange(n).astype("timedelta64[D]"),
+        "valeurs": valeurs,
+        "rendements": rendements,
+        "fenetre": 6,
+        "sharpe_rolling": rng.normal(0.5, 0.3, n - 6),
+        "per": rng.normal(15, 3, n - 1),
+    }
+
+
+def peak_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def mesurer(mode, n):
+    import io
+
+    import pandas as pd
+
+    from app.exports import _lignes, ecrire_xlsx, ecrire_zip, tableau
+    from app.routes import feuilles_simulation
+
+    sim = simulation(n)
+    avant = peak_kb()
+    t0 = time.perf_counter()
+    feuilles = feuilles_simulation(sim)
+    if mode == "pandas":
+        # l'ancienne implémentation : DataFrames complets puis classeur en mémoire
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine="openpyxl") as writer:
+            for nom, table, index in feuilles:
+                df = pd.DataFrame(list(_lignes(table, False)), columns=list(tableau(table).colonnes))
+                df.to_excel(writer, sheet_name=nom, index=index)
+        taille = len(output.getvalue())
+    else:
+        fichier = ecrire_xlsx(feuilles) if mode == "write_only" else ecrire_zip(feuilles, mode)
+        taille = os.fstat(fichier.fileno()).st_size
+        # lecture par morceaux, comme send_file
+        while fichier.read(8192):
+            pass
+    duree = time.perf_counter() - t0
+    return {"ms": duree * 1000, "pic_mb": (peak_kb() - avant) / 1024, "taille_kb": taille / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lignes", type=int, nargs="*", default=[1000, 10000, 100000])
+    parser.add_argument("--modes", nargs="*", default=list(MODES))
+    parser.add_argument("--enfant", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.enfant:
+        mode, n = args.enfant
+        print(json.dumps(mesurer(mode, int(n))))
+        return
+
+    from app.exports import parquet_disponible
+
+    modes = [m for m in args.modes if m != "parquet" or parquet_disponible()]
+    print(f"{'lignes':>8}{'mode':>12}{'temps (ms)':>13}{'pic RSS (MB)':>15}{'taille (KB)':>14}")
+    with tempfile.TemporaryDirectory() as dossier:
+        env = {**os.environ, "PRICE_STORE_DIR": dossier, "PREFETCH_ENABLED": "0"}
+        for n in args.lignes:
+            for mode in modes:
+                sortie = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--enfant", mode, str(n)],
+                    capture_output=True, text=True, env=env, check=True,
+                ).stdout
+                r = json.loads(sortie.strip().splitlines()[-1])
+                print(f"{n:>8}{mode:>12}{r['ms']:>13.1f}{r['pic_mb']:>15.1f}{r['taille_kb']:>14.1f}")
+
+if __name__ == "__main__":
+    main()
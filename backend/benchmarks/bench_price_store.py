@@ -0,0 +1,49 @@
+"""Benchmark froid / chaud du stockage local des cours.
+
+    python benchmarks/bench_price_store.py ACWI AIR.PA --debut 2015 --fin 2025
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.fournisseurs import download_prices  # noqa: E402
+from app.price_store import PriceStore  # noqa: E402
+
+
+def chrono(fn, repeat):
+    durees = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        durees.append(time.perf_counter() - t0)
+    return min(durees), sum(durees) / len(durees)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tickers", nargs="*", default=["ACWI", "URTH", "AIR.PA"])
+    parser.add_argument("--debut", type=int, default=2015)
+    parser.add_argument("--fin", type=int, default=2025)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start, end = f"{args.debut}-01-01", f"{args.fin}-12-31"
+
+    with tempfile.TemporaryDirectory() as root:
+        store = PriceStore(root=root)
+        print(f"{'ticker':<10}{'yfinance (s)':>14}{'froid (s)':>12}{'chaud (s)':>12}{'gain':>8}")
+        for ticker in args.tickers:
+            direct, _ = chrono(lambda: download_prices(ticker, start, end), args.repeat)
+            t0 = time.perf_counter()
+            store.get(ticker, start, end)
+            froid = time.perf_counter() - t0
+            chaud, _ = chrono(lambda: store.get(ticker, start, end), args.repeat)
+            print(f"{ticker:<10}{direct:>14.4f}{froid:>12.4f}{chaud:>12.5f}{direct / chaud:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Suite de benchmarks hors ligne des routes de calcul et d'export :
+latence (p50 / p90 / p99), débit et pic mémoire par route, pour des
+historiques de 5, 10 et 30 ans.
+
+Les cours viennent du fournisseur synthétique (PRICE_PROVIDER) : aucun
+appel réseau et des entrées identiques d'un lancement à l'autre. Chaque
+couple (route, durée) tourne dans un processus séparé, avec le client de
+test Flask : cours déjà sur disque et séries en cache après l'échauffement,
+cache de réponses et cache PDF désactivés (chaque requête refait le calcul).
+Le pic mémoire est celui des allocations d'une requête (tracemalloc, hors
+mesure de latence) ; le pic RSS du processus est donné à titre indicatif.
+
+    python benchmarks/bench_routes.py --sauver benchmarks/reference.json
+    python benchmarks/bench_routes.py --comparer benchmarks/reference.json --tolerance 0.25
+
+Avec --comparer, le code de sortie vaut 1 si une route dépasse la
+référence (p50, p90 ou pic mémoire) de plus de --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIN = 2024
+BASE = {
+    "montant_initial": 10000,
+    "contribution": 200,
+    "frequence": "mensuelle",
+    "actif": "etf",
+    "ticker": "ACWI",
+}
+ROUTES = ("simulate", "compare_acwi", "predict_returns", "compare_strategies",
+          "export_excel", "export_csv", "export_pdf")
+# routes alimentées par un simulation_id préparé hors mesure
+DEPUIS_SIMULATION = {"compare_acwi", "export_excel", "export_csv", "export_pdf"}
+# indicateurs surveillés par --comparer
+SURVEILLES = ("p50_ms", "p90_ms", "pic_mb")
+
+
+def corps(annees):
+    return {**BASE, "duree": annees, "date_debut": FIN - annees + 1, "date_fin": FIN}
+
+
+def requete(route, annees, simulation_id):
+    if route in DEPUIS_SIMULATION:
+        chemin = "/" + route.replace("_", "/", 1) if route.startswith("export") else f"/{route}"
+        payload = {"simulation_id": simulation_id}
+        if route == "export_pdf":
+            # graphiques tracés côté serveur : le rendu dépend de la longueur de l'historique
+            payload["graphes"] = "serveur"
+        return chemin, payload
+    return f"/{route}", corps(annees)
+
+
+def percentile(valeurs, p):
+    return valeurs[min(int(len(valeurs) * p / 100), len(valeurs) - 1)]
+
+
+def appeler(client, chemin, payload):
+    reponse = client.post(chemin, json=payload)
+    # les exports sont envoyés en flux : on lit tout le corps
+    taille = len(reponse.get_data())
+    if reponse.status_code != 200:
+        raise RuntimeError(f"{chemin} : statut {reponse.status_code} {reponse.get_data(as_text=True)[:200]}")
+    return taille
+
+
+def mesurer(route, annees, requetes, echauffement, clients):
+    from app import create_app
+
+    app = create_app(taches_de_fond=False)
+    client = app.test_client()
+
+    simulation_id = None
+    if route in DEPUIS_SIMULATION:
+        reponse = client.post("/simulate", json=corps(annees))
+        simulation_id = reponse.get_json()["simulation_id"]
+    chemin, payload = requete(route, annees, simulation_id)
+
+    # cours téléchargés puis rééchantillonnés, imports différés chargés
+    for _ in range(echauffement):
+        appeler(client, chemin, payload)
+
+    latences = []
+    verrou = threading.Lock()
+
+    def boucle(n):
+        local = app.test_client()
+        for _ in range(n):
+            t0 = time.perf_counter()
+            appeler(local, chemin, payload)
+            duree = time.perf_counter() - t0
+            with verrou:
+                latences.append(duree)
+
+    parts = [requetes // clients + (i < requetes % clients) for i in range(clients)]
+    threads = [threading.Thread(target=boucle, args=(n,)) for n in parts]
+    debut = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ecoule = time.perf_counter() - debut
+
+    # une requête de plus, seule, pour le pic d'allocations
+    tracemalloc.start()
+    taille = appeler(client, chemin, payload)
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latences.sort()
+    return {
+        "requetes": len(latences),
+        "p50_ms": percentile(latences, 50) * 1000,
+        "p90_ms": percentile(latences, 90) * 1000,
+        "p99_ms": percentile(latences, 99) * 1000,
+        "debit": len(latences) / ecoule,
+        "pic_mb": pic / (1024 * 1024),
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "taille_kb": taille / 1024,
+    }
+
+
+def comparer(resultats, reference, tolerance, marge_ms):
+    regressions = []
+    for cle, r in resultats.items():
+        ref = reference.get(cle)
+        if ref is None:
+            continue
+        for indicateur in SURVEILLES:
+            # petite marge absolue : quelques dixièmes de ms ne font pas une régression
+            marge = marge_ms if indicateur.endswith("_ms") else 0.0
+            limite = ref[indicateur] * (1 + tolerance) + marge
+            if r[indicateur] > limite:
+                regressions.append(f"{cle} {indicateur} : {r[indicateur]:.2f} > {limite:.2f} (référence {ref[indicateur]:.2f})")
+    return regressions
+
+
+def mesurer_suite(args):
+    # un processus par couple (route, durée) ; dossier de cours partagé par
+    # toute la suite (générés une seule fois), supprimé à la fin
+    with tempfile.TemporaryDirectory() as racine:
+        env = {
+            **os.environ,
+            "PRICE_PROVIDER": args.fournisseur,
+            "PRICE_STORE_DIR": os.path.join(racine, "prices"),
+            "RESULT_STORE_DIR": "",
+            "PDF_JOBS_DIR": "",
+            "RESPONSE_CACHE_MB": "0",
+            "PDF_CACHE_MB": "0",
+            "PREFETCH_ENABLED": "0",
+            "PROFILAGE_ACTIF": "0",
+            "LOG_LEVEL": "WARNING",
+        }
+        options = ["--requetes", str(args.requetes), "--echauffement", str(args.echauffement),
+                   "--clients", str(args.clients)]
+
+        resultats = {}
+        print(f"{'route':<20}{'ans':>4}{'p50 (ms)':>10}{'p90 (ms)':>10}{'p99 (ms)':>10}"
+              f"{'req/s':>9}{'pic (MB)':>10}{'RSS (MB)':>10}{'taille (KB)':>13}")
+        for route in args.routes:
+            for annees in args.annees:
+                sortie = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--enfant", route, str(annees), *options],
+                    capture_output=True, text=True, env=env,
+                )
+                if sortie.returncode != 0:
+                    print(sortie.stderr, file=sys.stderr)
+                    sys.exit(f"Échec de la mesure {route}/{annees}")
+                r = json.loads(sortie.stdout.strip().splitlines()[-1])
+                resultats[f"{route}/{annees}"] = r
+                print(f"{route:<20}{annees:>4}{r['p50_ms']:>10.1f}{r['p90_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+                      f"{r['debit']:>9.1f}{r['pic_mb']:>10.1f}{r['rss_mb']:>10.1f}{r['taille_kb']:>13.1f}")
+        return resultats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--routes", nargs="*", default=list(ROUTES), choices=ROUTES)
+    parser.add_argument("--annees", type=int, nargs="*", default=[5, 10, 30])
+    parser.add_argument("--requetes", type=int, default=30)
+    parser.add_argument("--echauffement", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=1, help="threads envoyant les requêtes en parallèle")
+    parser.add_argument("--fournisseur", default="synthetique", help="PRICE_PROVIDER des processus mesurés")
+    parser.add_argument("--sauver", help="écrit les résultats (JSON) pour servir de référence")
+    parser.add_argument("--comparer", help="référence JSON produite par --sauver")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="dépassement relatif toléré")
+    parser.add_argument("--marge-ms", type=float, default=1.0, help="dépassement absolu toléré sur les latences")
+    parser.add_argument("--enfant", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.enfant:
+        route, annees = args.enfant
+        print(json.dumps(mesurer(route, int(annees), args.requetes, args.echauffement, args.clients)))
+        return
+
+    resultats = mesurer_suite(args)
+
+    if args.sauver:
+        with open(args.sauver, "w", encoding="utf-8") as f:
+            json.dump({
+                "machine": {"python": platform.python_version(), "systeme": platform.platform(),
+                            "processeur": platform.processor() or platform.machine(), "cpus": os.cpu_count()},
+                "parametres": {"fournisseur": args.fournisseur, "requetes": args.requetes, "clients": args.clients},
+                "resultats": resultats,
+            }, f, indent=1)
+
+    if args.comparer:
+        with open(args.comparer, encoding="utf-8") as f:
+            reference = json.load(f)["resultats"]
+        regressions = comparer(resultats, reference, args.tolerance, args.marge_ms)
+        for ligne in regressions:
+            print(f"RÉGRESSION {ligne}")
+        if regressions:
+            sys.exit(1)
+        print(f"Aucune régression (tolérance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
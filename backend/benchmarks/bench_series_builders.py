@@ -0,0 +1,116 @@
+"""Micro-benchmark des constructeurs de séries de /simulate (PER, historique,
+rendements) : ancienne boucle pandas élément par élément contre le code de
+production (per_pedagogique et series_simulation de app.routes), temps de
+graphes_simulation (rapport PDF), puis temps CPU d'une requête /simulate
+complète.
+
+Les séries mensuelles sont synthétiques et injectées dans le cache : aucun
+appel réseau.
+
+    python benchmarks/bench_series_builders.py --annees 10 30
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def serie_mensuelle(annees, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("1990-01-31", periods=annees * 12, freq="ME")
+    return pd.Series(50 * np.exp(np.cumsum(rng.normal(0.005, 0.04, len(index)))), index=index)
+
+
+def anciens_constructeurs(pm, valeurs, rendements):
+    historique = [{"periode": i + 1, "valeur": round(float(v), 2)} for i, v in enumerate(valeurs)]
+    dates_r = pm.index[1:]
+    histogramme = [
+        {"periode": i + 1, "date": dates_r[i].strftime("%Y-%m"), "rendement": round(float(r) * 100, 3)}
+        for i, r in enumerate(rendements)
+    ]
+    per_series = []
+    r_actif = pm.pct_change().dropna()
+    earnings = float(pm.iloc[0]) / 15.0
+    for i in range(1, len(pm)):
+        earnings *= (1 + 0.3 * float(r_actif.iloc[i - 1]))
+        per_val = float(pm.iloc[i]) / earnings if earnings != 0 else 0.0
+        per_series.append({"periode": i, "date": pm.index[i].strftime("%Y-%m"), "per": round(per_val, 2)})
+    return historique, histogramme, per_series
+
+
+# séries de series_simulation couvertes par l'ancienne boucle
+SERIES_COMPAREES = ("historique", "rendements", "per_series")
+
+
+def nouveaux_constructeurs(sim, prix):
+    from app.routes import per_pedagogique, series_simulation
+
+    # le PER est calculé par calculer_simulation, les lignes par series_simulation
+    per_pedagogique(prix)
+    return tuple(
+        tranche(0, n) for nom, n, tranche in series_simulation(sim) if nom in SERIES_COMPAREES
+    )
+
+
+def cpu(fn, repeat):
+    t0 = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--annees", type=int, nargs="*", default=[10, 30])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    # cours, résultats et jobs PDF dans un dossier supprimé à la fin
+    with tempfile.TemporaryDirectory() as dossier:
+        os.environ.setdefault("PRICE_STORE_DIR", os.path.join(dossier, "prices"))
+        os.environ.setdefault("RESULT_STORE_DIR", os.path.join(dossier, "resultats"))
+        os.environ.setdefault("PDF_JOBS_DIR", os.path.join(dossier, "pdf"))
+        os.environ.setdefault("PREFETCH_ENABLED", "0")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        mesurer(args)
+
+
+def mesurer(args):
+    from app import create_app
+    from app.routes import calculer_simulation, graphes_simulation
+    from app.series_cache import series_cache
+
+    app = create_app(taches_de_fond=False)
+    client = app.test_client()
+
+    print(f"{'années':>7}{'ancien (ms)':>14}{'production (ms)':>17}{'gain':>7}"
+          f"{'graphes (ms)':>14}{'/simulate (ms CPU)':>21}")
+    for annees in args.annees:
+        pm = serie_mensuelle(annees)
+        debut, fin = 1990, 1990 + annees - 1
+        series_cache.put(("ACWI", f"{debut}-01-01", f"{fin}-12-31", "ME"), pm)
+        corps = {"montant_initial": 10000, "contribution": 200, "duree": annees, "ticker": "ACWI",
+                 "date_debut": debut, "date_fin": fin}
+        with app.test_request_context():
+            sim = calculer_simulation(corps)
+        prix = pm.values.astype(float)
+        valeurs, rendements = sim["valeurs"], sim["rendements"]
+        assert anciens_constructeurs(pm, valeurs, rendements) == nouveaux_constructeurs(sim, prix)
+
+        ancien = cpu(lambda: anciens_constructeurs(pm, valeurs, rendements), args.repeat)
+        nouveau = cpu(lambda: nouveaux_constructeurs(sim, prix), args.repeat)
+        graphes = cpu(lambda: graphes_simulation(sim), args.repeat)
+        requete = cpu(lambda: client.post("/simulate", json=corps), args.repeat)
+
+        print(f"{annees:>7}{ancien:>14.2f}{nouveau:>17.2f}{ancien / nouveau:>6.1f}x"
+              f"{graphes:>14.2f}{requete:>21.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Démarrage à froid d'un worker : temps d'import de l'application et de
+create_app(), RSS du processus, dépendances lourdes déjà chargées, puis
+coût de la première requête de chaque fonctionnalité (qui déclenche les
+imports différés).
+
+Chaque mesure tourne dans un processus neuf (--repeat fois, médiane).
+--racine permet de mesurer une autre copie du backend, par exemple une
+révision antérieure extraite avec `git worktree add`.
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+LOURDS = ("pandas", "yfinance", "scipy", "sklearn", "reportlab", "openpyxl")
+
+ENFANT = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, os.getcwd())
+from app import create_app
+app = create_app()
+t_app = time.perf_counter() - t0
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for ligne in f:
+            if ligne.startswith("VmRSS:"):
+                return int(ligne.split()[1]) / 1024
+    return float("nan")
+
+mesure = {
+    "create_app_ms": t_app * 1000,
+    "rss_mb": rss_mb(),
+    "lourds": [m for m in LOURDS if m in sys.modules],
+}
+
+# premières requêtes : série synthétique injectée dans le cache, pas de réseau
+import numpy as np, pandas as pd
+from app.series_cache import series_cache
+index = pd.date_range("2015-01-31", periods=132, freq="ME")
+serie = pd.Series(50 * np.exp(np.cumsum(np.random.default_rng(0).normal(0.005, 0.04, 132))), index=index)
+series_cache.put(("ACWI", "2015-01-01", "2025-12-31", "ME"), serie)
+series_cache.put(("ACWI", "2015-01-01", "2025-12-31", "QE"), serie.resample("QE").last())
+client = app.test_client()
+corps = {"montant_initial": 10000, "contribution": 200, "duree": 10, "ticker": "ACWI"}
+for nom, url, payload in [
+    ("simulate", "/simulate", corps),
+    ("predict_returns", "/predict_returns", corps),
+    ("export_excel", "/export/excel", None),
+    ("export_pdf", "/export/pdf", None),
+]:
+    if payload is None:
+        payload = {"simulation_id": mesure["simulation_id"]}
+    t = time.perf_counter()
+    r = client.post(url, json=payload)
+    mesure[nom + "_ms"] = (time.perf_counter() - t) * 1000
+    if nom == "simulate":
+        mesure["simulation_id"] = r.get_json()["simulation_id"]
+mesure.pop("simulation_id")
+mesure["rss_final_mb"] = rss_mb()
+print(json.dumps(mesure))
+"""
+
+
+def mesurer(racine, env):
+    code = f"LOURDS = {LOURDS!r}\n" + ENFANT
+    sortie = subprocess.run(
+        [sys.executable, "-c", code], cwd=racine, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(sortie.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--racine", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        env = {
+            **os.environ,
+            "PRICE_STORE_DIR": os.path.join(dossier, "prices"),
+            "RESULT_STORE_DIR": os.path.join(dossier, "resultats"),
+            "PDF_JOBS_DIR": os.path.join(dossier, "pdf"),
+            "PREFETCH_ENABLED": "0",
+        }
+        mesures = [mesurer(args.racine, env) for _ in range(args.repeat)]
+
+    print(f"backend : {args.racine} ({args.repeat} processus, médianes)")
+    print(f"  dépendances lourdes chargées par create_app : {', '.join(mesures[0]['lourds']) or 'aucune'}")
+    for cle, libelle in [
+        ("create_app_ms", "import + create_app (ms)"),
+        ("rss_mb", "RSS après create_app (MB)"),
+        ("simulate_ms", "1re requête /simulate (ms)"),
+        ("predict_returns_ms", "1re requête /predict_returns (ms)"),
+        ("export_excel_ms", "1er export Excel (ms)"),
+        ("export_pdf_ms", "1er export PDF (ms)"),
+        ("rss_final_mb", "RSS après toutes les fonctionnalités (MB)"),
+    ]:
+        print(f"  {libelle:<44}{statistics.median(m[cle] for m in mesures):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
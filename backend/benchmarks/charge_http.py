@@ -0,0 +1,96 @@
+"""Test de charge HTTP d'un serveur déjà lancé (dev ou gunicorn) : N
+clients en parallèle, connexions keep-alive, pendant --duree secondes.
+Affiche le débit, les percentiles de latence et la répartition des statuts.
+
+--varier change le montant initial à chaque requête : le cache de réponses
+est contourné et chaque requête refait la simulation.
+
+    python benchmarks/charge_http.py --url http://127.0.0.1:8000 --clients 8 --duree 20 --varier
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+CORPS = {
+    "montant_initial": 10000,
+    "contribution": 200,
+    "frequence": "mensuelle",
+    "duree": 10,
+    "actif": "etf",
+    "ticker": "ACWI",
+    "date_debut": 2015,
+    "date_fin": 2024,
+}
+
+
+def client(url, chemin, corps, varier, fin, latences, statuts, verrou, numero):
+    cible = urlsplit(url)
+    connexion = http.client.HTTPConnection(cible.hostname, cible.port or 80, timeout=60)
+    i = 0
+    while time.perf_counter() < fin:
+        payload = dict(corps)
+        if varier:
+            payload["montant_initial"] = corps["montant_initial"] + numero * 1_000_000 + i
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            connexion.request("POST", chemin, json.dumps(payload), {"Content-Type": "application/json"})
+            reponse = connexion.getresponse()
+            reponse.read()
+            statut = reponse.status
+        except (OSError, http.client.HTTPException):
+            connexion.close()
+            connexion = http.client.HTTPConnection(cible.hostname, cible.port or 80, timeout=60)
+            statut = "erreur"
+        duree = time.perf_counter() - t0
+        with verrou:
+            latences.append(duree)
+            statuts[statut] += 1
+    connexion.close()
+
+
+def percentile(valeurs, p):
+    return valeurs[min(int(len(valeurs) * p / 100), len(valeurs) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--chemin", default="/simulate")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duree", type=float, default=20)
+    parser.add_argument("--varier", action="store_true")
+    parser.add_argument("--corps", help="corps JSON remplaçant la simulation par défaut")
+    args = parser.parse_args()
+
+    corps = json.loads(args.corps) if args.corps else CORPS
+    latences, statuts, verrou = [], Counter(), threading.Lock()
+    debut = time.perf_counter()
+    fin = debut + args.duree
+    threads = [
+        threading.Thread(target=client, args=(args.url, args.chemin, corps, args.varier, fin, latences, statuts, verrou, n))
+        for n in range(args.clients)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ecoule = time.perf_counter() - debut
+
+    latences.sort()
+    print(f"{args.url}{args.chemin} : {args.clients} clients, {ecoule:.1f} s, cache {'contourné' if args.varier else 'actif'}")
+    print(f"  requêtes         {len(latences):>10}")
+    print(f"  débit (req/s)    {len(latences) / ecoule:>10.1f}")
+    if latences:
+        for p in (50, 90, 99):
+            print(f"  p{p:<2} (ms)         {percentile(latences, p) * 1000:>10.1f}")
+        print(f"  max (ms)         {latences[-1] * 1000:>10.1f}")
+    print(f"  statuts          {dict(statuts)}")
+
+
+if __name__ == "__main__":
+    main()
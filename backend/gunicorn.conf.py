@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+
+# ===============================
+#  SERVEUR DE PRODUCTION (GUNICORN)
+# ===============================
+#   gunicorn -c gunicorn.conf.py wsgi:app
+# L'application (imports, configuration, premier préchargement des cours)
+# est construite dans le maître puis partagée par fork. Rechargement :
+#   - kill -HUP <maître>  : nouveaux workers, même code (preload_app) ;
+#   - kill -USR2 <maître> puis -QUIT sur l'ancien : nouveau code sans coupure.
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+# threads : les téléchargements Yahoo bloquent sur le réseau, pas sur le CPU
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = True
+
+# un téléchargement complet de l'univers peut prendre plusieurs dizaines de secondes
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# recyclage périodique des workers (fragmentation mémoire), décalé entre workers
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+pidfile = os.environ.get("GUNICORN_PIDFILE")
+# l'application journalise déjà chaque requête (logger app.acces)
+accesslog = None
+errorlog = "-"
+
+# simulation_id, jobs PDF et compteurs de /metrics doivent être lisibles par tous les workers
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+os.environ.setdefault("RESULT_STORE_DIR", os.path.join(DATA_DIR, "resultats"))
+os.environ.setdefault("PDF_JOBS_DIR", os.path.join(DATA_DIR, "pdf"))
+os.environ.setdefault("METRICS_DIR", os.path.join(DATA_DIR, "metrics"))
+
+
+def when_ready(server):
+    # maître, application chargée, avant le premier fork
+    from app.metrics import metrics
+    from app.prefetch import prefetcher
+
+    metrics.nettoyer()
+    prefetcher.prechauffer()
+
+
+def post_fork(server, worker):
+    from app.fournisseurs import reinitialiser_session_yahoo
+    from app.prefetch import prefetcher
+
+    # session yfinance du préchauffage : propre à chaque worker
+    reinitialiser_session_yahoo()
+    prefetcher.apres_fork()
+
+
+def worker_exit(server, worker):
+    # dans le worker : derniers compteurs écrits avant la sortie
+    from app.metrics import metrics
+
+    metrics.ecrire()
+
+
+def child_exit(server, worker):
+    # dans le maître : compteurs du worker sorti versés dans l'archive
+    from app.metrics import metrics
+
+    metrics.archiver(worker.pid)
@@ -1,6 +1,12 @@
+import os
+
 from app import create_app
 
-app = create_app()
+# debug=True relance le script dans un processus fils surveillé par le
+# rechargeur (WERKZEUG_RUN_MAIN=true) : seul ce fils sert les requêtes et
+# lance le préchargement, le processus parent ne fait que surveiller les fichiers
+app = create_app(taches_de_fond=os.environ.get("WERKZEUG_RUN_MAIN") == "true")
 
+# serveur de développement ; en production : gunicorn -c gunicorn.conf.py wsgi:app
 if __name__ == "__main__":
     app.run(debug=True)
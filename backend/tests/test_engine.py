@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from app.engine import STEP_MAP, REBALANCEMENT_MAP, simulate_dca, simulate_weighted
+
+FRAIS = (0.0, 0.004 / 12, 0.006 / 12, 0.02)
+
+
+def prix(n, graine=0, actifs=None):
+    rng = np.random.default_rng(graine)
+    forme = (n,) if actifs is None else (n, actifs)
+    return 100 * np.exp(np.cumsum(rng.normal(0.005, 0.05, forme), axis=0))
+
+
+def boucle_dca(prices, montant_initial, contribution, step, frais):
+    # boucle historique de /simulate, avant le moteur vectorisé
+    valeurs = []
+    montant_total_investi = montant_initial
+    units = montant_initial / prices[0]
+    for i, price in enumerate(prices):
+        price = float(price)
+        if price <= 0:
+            continue
+        if i > 0 and contribution > 0 and (i % step == 0):
+            units += contribution / price
+            montant_total_investi += contribution
+        valeur_nette = units * price * (1 - frais)
+        units = valeur_nette / price
+        valeurs.append(valeur_nette)
+    return np.array(valeurs), montant_total_investi
+
+
+def boucle_ponderee(prices, poids, montant_initial, contribution, step, frais, rebalancement, seuil=0.05):
+    poids = np.asarray(poids, dtype=float) / np.sum(poids)
+    n = len(prices)
+    periode = REBALANCEMENT_MAP.get(rebalancement)
+    units = montant_initial * poids / prices[0]
+    valeurs = np.empty(prices.shape)
+    investi, reequilibrages = montant_initial, 0
+    for i in range(n):
+        if i > 0 and contribution > 0 and i % step == 0:
+            units = units + contribution * poids / prices[i]
+            investi += contribution
+        units = units * (1 - frais)
+        valeurs[i] = units * prices[i]
+        if i == n - 1:
+            break
+        if periode is not None:
+            reequilibrer = i > 0 and i % periode == 0
+        elif rebalancement == "seuil":
+            reequilibrer = np.abs(valeurs[i] / valeurs[i].sum() - poids).max() > seuil
+        else:
+            reequilibrer = False
+        if reequilibrer:
+            units = valeurs[i].sum() * poids / prices[i]
+            reequilibrages += 1
+    return valeurs, investi, reequilibrages
+
+
+@pytest.mark.parametrize("frequence", list(STEP_MAP))
+@pytest.mark.parametrize("frais", FRAIS)
+@pytest.mark.parametrize("contribution", [0.0, 200.0])
+def test_dca_identique_a_la_boucle(frequence, frais, contribution):
+    prices = prix(240)
+    valeurs, investi = simulate_dca(prices, 10000.0, contribution, STEP_MAP[frequence], frais)
+    attendu, investi_attendu = boucle_dca(prices, 10000.0, contribution, STEP_MAP[frequence], frais)
+    np.testing.assert_allclose(valeurs, attendu, rtol=1e-12)
+    assert investi == pytest.approx(investi_attendu)
+
+
+def test_dca_prix_invalides_ignores():
+    prices = prix(60)
+    prices[[5, 6, 12, 30]] = [0.0, -1.0, 0.0, -3.0]
+    valeurs, investi = simulate_dca(prices, 5000.0, 100.0, 3, 0.001)
+    attendu, investi_attendu = boucle_dca(prices, 5000.0, 100.0, 3, 0.001)
+    np.testing.assert_allclose(valeurs, attendu, rtol=1e-12)
+    assert investi == pytest.approx(investi_attendu)
+
+
+def test_dca_scenarios_vectorises():
+    prices = prix(120, graine=1)
+    montants = np.array([1000.0, 5000.0, 20000.0])
+    contributions = np.array([0.0, 150.0, 500.0])
+    steps = np.array([1, 3, 12])
+    frais = np.array([0.0, 0.0005, 0.001])
+    valeurs, investi = simulate_dca(prices, montants, contributions, steps, frais)
+    assert valeurs.shape == (3, 120)
+    for j in range(3):
+        attendu, investi_attendu = boucle_dca(prices, montants[j], contributions[j], steps[j], frais[j])
+        np.testing.assert_allclose(valeurs[j], attendu, rtol=1e-12)
+        assert investi[j] == pytest.approx(investi_attendu)
+
+
+@pytest.mark.parametrize("rebalancement", [None, *REBALANCEMENT_MAP, "seuil"])
+@pytest.mark.parametrize("frequence", ["mensuelle", "trimestrielle", "annuelle"])
+@pytest.mark.parametrize("frais", [0.0, 0.005 / 12])
+def test_pondere_identique_a_la_boucle(rebalancement, frequence, frais):
+    prices = prix(180, graine=2, actifs=3)
+    poids = [0.5, 0.3, 0.2]
+    sim = simulate_weighted(prices, poids, 10000.0, 300.0, STEP_MAP[frequence], frais, rebalancement)
+    valeurs, investi, reequilibrages = boucle_ponderee(
+        prices, poids, 10000.0, 300.0, STEP_MAP[frequence], frais, rebalancement,
+    )
+    np.testing.assert_allclose(sim.valeurs_actifs, valeurs, rtol=1e-10)
+    np.testing.assert_allclose(sim.valeurs, valeurs.sum(axis=1), rtol=1e-10)
+    assert sim.montant_investi == pytest.approx(investi)
+    assert sim.reequilibrages == reequilibrages
@@ -0,0 +1,44 @@
+import csv
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.exports import Colonne, Tableau, flux_csv
+
+exports = sys.modules["app.exports"]
+
+
+@pytest.fixture(autouse=True)
+def petits_paquets(monkeypatch):
+    # plusieurs paquets, dont un incomplet
+    monkeypatch.setattr(exports, "TAILLE_PAQUET", 3)
+
+
+def lire(table, index):
+    return list(csv.reader(io.StringIO("".join(flux_csv(table, index)))))
+
+
+def test_tableau_comme_dataframe():
+    valeurs = np.array([1.004, 2.5, np.nan, 4.126, 5.0, 6.0, 7.5], dtype=np.float32)
+    dates = np.arange("2020-01", "2020-08", dtype="datetime64[M]").astype("datetime64[D]")
+    table = Tableau({
+        "periode": range(1, 8),
+        "date": Colonne(dates, unite="M"),
+        "valeur": Colonne(valeurs, 2, echelle=100),
+    })
+    df = pd.DataFrame({
+        "periode": np.arange(1, 8),
+        "date": np.datetime_as_string(dates, unit="M"),
+        "valeur": [round(v, 2) for v in (valeurs * 100).tolist()],
+    })
+    assert lire(table, True) == lire(df, True)
+    assert lire(table, True)[0] == ["", "periode", "date", "valeur"]
+    # NaN : cellule vide
+    assert lire(table, False)[3] == ["3", "2020-03", ""]
+
+
+def test_tableau_vide():
+    assert lire(Tableau({"valeur": np.empty(0)}), False) == [["valeur"]]
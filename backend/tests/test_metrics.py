@@ -0,0 +1,60 @@
+import json
+import os
+
+import pytest
+
+from app.metrics import Metrics
+
+
+def worker(dossier, requetes, en_cours):
+    m = Metrics()
+    m.dossier = str(dossier)
+    m.sources = [lambda: [
+        ("finance_telechargements_total", "counter", "Téléchargements", [({}, requetes)]),
+        ("finance_pdf_jobs_en_cours", "gauge", "Exports en cours", [({}, en_cours)]),
+    ]]
+    for _ in range(requetes):
+        m.observer("/simulate", "POST", 200, 0.004, {"simulation": 0.001})
+    return m
+
+
+def deposer(dossier, nom, m):
+    (dossier / nom).write_text(json.dumps(m.instantane()))
+
+
+@pytest.fixture
+def repondant(tmp_path):
+    m = worker(tmp_path, 1, 1)
+    deposer(tmp_path, "999991-1.json", worker(tmp_path, 2, 1))
+    deposer(tmp_path, "999992-1.json", worker(tmp_path, 4, 1))
+    return m
+
+
+def test_somme_des_workers(repondant):
+    _, totaux = repondant.exposition()
+    assert totaux.requetes[("/simulate", "POST", 200)] == 7
+    assert totaux.durees["/simulate"].total == 7
+    assert totaux.valeur("finance_telechargements_total") == 7
+    assert totaux.valeur("finance_pdf_jobs_en_cours") == 3
+
+
+def test_worker_archive_sans_perte(repondant, tmp_path):
+    repondant.archiver(999991)
+    assert not (tmp_path / "999991-1.json").exists()
+    assert (tmp_path / f"archive-{os.getpid()}.json").exists()
+
+    lignes, totaux = repondant.exposition()
+    assert totaux.requetes[("/simulate", "POST", 200)] == 7
+    assert totaux.valeur("finance_telechargements_total") == 7
+    # la jauge d'un worker sorti n'est plus comptée
+    assert totaux.valeur("finance_pdf_jobs_en_cours") == 2
+    assert 'finance_requete_duree_secondes_count{route="/simulate"} 7' in lignes
+
+
+def test_fichier_lu_avant_archivage_compte_une_fois(repondant, tmp_path):
+    # archive déjà écrite, fichier du worker pas encore supprimé
+    contenu = (tmp_path / "999992-1.json").read_text()
+    repondant.archiver(999992)
+    (tmp_path / "999992-1.json").write_text(contenu)
+    _, totaux = repondant.exposition()
+    assert totaux.requetes[("/simulate", "POST", 200)] == 7
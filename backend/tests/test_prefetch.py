@@ -0,0 +1,42 @@
+import sys
+
+import pytest
+
+from app.prefetch import Prefetcher
+from app.price_store import PriceStore
+from app.series_cache import SeriesCache
+from test_price_store import Fournisseur
+
+prefetch = sys.modules["app.prefetch"]
+
+
+@pytest.fixture
+def prefetcher(tmp_path, monkeypatch):
+    store = PriceStore(root=str(tmp_path))
+    store.fournisseur = Fournisseur()
+    monkeypatch.setattr(prefetch, "price_store", store)
+    monkeypatch.setattr(prefetch, "series_cache", SeriesCache())
+    p = Prefetcher()
+    p.tickers = lambda: ["ACWI", "URTH", "MC.PA"]
+    p.start, p.end = "2015-01-01", "2020-12-31"
+    return p
+
+
+def test_un_seul_telechargement(prefetcher):
+    assert prefetcher.passage()
+    assert prefetcher.ready.is_set()
+    assert prefetcher.echecs == []
+    appels = prefetch.price_store.fournisseur.appels
+    assert len(appels) == 1 and set(appels[0][0]) == {"ACWI", "URTH", "MC.PA"}
+    assert prefetch.series_cache.get(("ACWI", "2015-01-01", "2020-12-31", "ME")) is not None
+
+
+def test_aucun_cours_pas_pret(prefetcher):
+    prefetch.price_store.fournisseur.vide = True
+    assert not prefetcher._passage_protege()
+    assert not prefetcher.ready.is_set()
+    assert prefetcher.echecs == ["ACWI", "URTH", "MC.PA"]
+
+    prefetch.price_store.fournisseur.vide = False
+    assert prefetcher.passage()
+    assert prefetcher.ready.is_set()
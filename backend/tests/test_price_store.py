@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.fournisseurs import Synthetique
+from app.price_store import PriceStore
+
+
+class Fournisseur:
+    """Cours synthétiques ; `vide` simule une réponse vide sans exception
+    (yfinance limité en débit ou hors réseau)."""
+
+    nom = "test"
+
+    def __init__(self):
+        self.source = Synthetique()
+        self.vide = False
+        self.appels = []
+
+    def telecharger(self, tickers, start, end, auto_adjust=True):
+        self.appels.append((tuple(tickers), start, end))
+        if self.vide:
+            return {}
+        return self.source.telecharger(tickers, start, end, auto_adjust)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceStore(root=str(tmp_path))
+    store.fournisseur = Fournisseur()
+    return store
+
+
+def test_reponse_vide_puis_reprise(store):
+    store.get("ACWI", "2015-01-01", "2020-01-01")
+    meta = store._read_meta("ACWI")
+
+    store.fournisseur.vide = True
+    tronquee = store.get("ACWI", "2005-01-01", "2020-01-01")
+    assert tronquee.index[0] >= pd.Timestamp("2015-01-01")
+    assert store.stats()["erreurs"] == 1
+    # rien n'est marqué couvert ni rafraîchi
+    assert store._read_meta("ACWI") == meta
+    assert store.version("ACWI", "2005-01-01", "2020-01-01") is None
+
+    store.fournisseur.vide = False
+    complete = store.get("ACWI", "2005-01-01", "2020-01-01")
+    assert complete.index[0] < pd.Timestamp("2005-01-10")
+    assert store.fournisseur.appels[-1][1:] == ("2005-01-01", "2015-01-01")
+    assert store.version("ACWI", "2005-01-01", "2020-01-01") == meta["version"] + 1
+
+
+def test_premiere_reponse_vide_rien_sur_disque(store):
+    store.fournisseur.vide = True
+    assert store.get("ACWI", "2015-01-01", "2020-01-01") is None
+    assert store._read_meta("ACWI") is None
+
+    store.fournisseur.vide = False
+    assert store.get("ACWI", "2015-01-01", "2020-01-01") is not None
+    assert len(store.fournisseur.appels) == 2
+
+
+def test_fusion_nouvelles_lignes_prioritaires():
+    old = PriceStore._to_rows(pd.Series([1.0, 2.0, 3.0], index=pd.to_datetime(["2020-01-01", "2020-01-02", "2020-01-03"])))
+    new = PriceStore._to_rows(pd.Series([20.0, 4.0], index=pd.to_datetime(["2020-01-02", "2020-01-06"])))
+    rows = PriceStore._merge(old, new)
+    assert list(rows["close"]) == [1.0, 20.0, 3.0, 4.0]
+    assert (np.diff(rows["date"]) > 0).all()
+
+
+def test_seules_les_plages_manquantes_sont_telechargees(store):
+    appels = store.fournisseur.appels
+    store.get("ACWI", "2015-01-01", "2018-01-01")
+    assert len(appels) == 1
+
+    # plage couverte : aucun téléchargement
+    store.get("ACWI", "2016-01-01", "2017-01-01")
+    assert len(appels) == 1
+
+    # début manquant : seule la tête est demandée
+    serie = store.get("ACWI", "2010-01-01", "2018-01-01")
+    assert appels[-1][1:] == ("2010-01-01", "2015-01-01")
+    assert serie.index.is_monotonic_increasing and serie.index.is_unique
+
+    # fin manquante : on repart de la dernière séance connue
+    store.get("ACWI", "2010-01-01", "2020-01-01")
+    debut = appels[-1][1]
+    assert "2017-12-20" <= debut < "2018-01-01"
+    assert appels[-1][2] == "2020-01-01"
+
+    # la série recollée est celle d'un téléchargement d'un seul tenant
+    attendu = Synthetique().telecharger(["ACWI"], "2010-01-01", "2020-01-01")["ACWI"]
+    np.testing.assert_array_equal(store.get("ACWI", "2010-01-01", "2020-01-01").values, attendu.values)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.rolling import drawdown, rolling_sharpe, rolling_sortino, rolling_volatility
+
+FENETRES = (2, 6, 12, 126)
+# sommes cumulées : erreur d'arrondi relative de l'ordre de 1e-9 sur les petites fenêtres
+RTOL = 1e-7
+
+
+def rendements(n=600, graine=0):
+    # niveau élevé + faible dispersion : cas défavorable pour E[x²] - E[x]²
+    return pd.Series(np.random.default_rng(graine).normal(0.01, 0.04, n))
+
+
+@pytest.mark.parametrize("w", FENETRES)
+def test_sharpe(w):
+    r = rendements()
+    excess = r - 0.001
+    attendu = excess.rolling(w).mean() / excess.rolling(w).std(ddof=0)
+    np.testing.assert_allclose(rolling_sharpe(r.values, w, 0.001), attendu.values[w - 1:], rtol=RTOL)
+
+
+@pytest.mark.parametrize("w", FENETRES)
+def test_volatilite(w):
+    r = rendements(graine=1)
+    attendu = r.rolling(w).std(ddof=1) * np.sqrt(252)
+    np.testing.assert_allclose(rolling_volatility(r.values, w, 252), attendu.values[w - 1:], rtol=RTOL)
+
+
+@pytest.mark.parametrize("w", FENETRES)
+def test_sortino(w):
+    r = rendements(graine=2)
+    excess = r - 0.002
+    baisse = np.sqrt((excess.clip(upper=0) ** 2).rolling(w).mean())
+    attendu = (excess.rolling(w).mean() / baisse).where(baisse > 1e-12, 0.0)
+    np.testing.assert_allclose(rolling_sortino(r.values, w, 0.002), attendu.values[w - 1:], rtol=RTOL, atol=1e-12)
+
+
+def test_fenetre_constante():
+    # écart-type nul : ratio nul plutôt qu'une division par zéro
+    r = np.full(20, 0.01)
+    assert not rolling_sharpe(r, 5).any()
+    assert not rolling_sortino(r, 5).any()
+
+
+def test_drawdown():
+    valeurs = pd.Series(100 * np.exp(np.cumsum(np.random.default_rng(3).normal(0, 0.05, 300))))
+    courant, maximal = drawdown(valeurs.values)
+    attendu = valeurs / valeurs.cummax() - 1
+    np.testing.assert_allclose(courant, attendu.values, rtol=1e-12)
+    np.testing.assert_allclose(maximal, attendu.cummin().values, rtol=1e-12)
@@ -0,0 +1,17 @@
+import pandas as pd
+
+from app.series_cache import SeriesCache
+
+
+def serie():
+    return pd.Series([1.0, 2.0], index=pd.to_datetime(["2020-01-31", "2020-02-29"]))
+
+
+def test_invalidation_independante_de_la_casse():
+    cache = SeriesCache()
+    cache.put(("acwi ", "2015-01-01", "2020-12-31", "ME"), serie())
+    assert cache.get(("ACWI", "2015-01-01", "2020-12-31", "ME")) is not None
+
+    # le stockage des cours notifie avec sa propre écriture du ticker
+    cache.invalidate("ACWI")
+    assert cache.get(("acwi", "2015-01-01", "2020-12-31", "ME")) is None
@@ -0,0 +1,6 @@
+from app import create_app
+
+# Point d'entrée de production : gunicorn -c gunicorn.conf.py wsgi:app
+# L'application est chargée une fois dans le processus maître (preload_app),
+# les threads d'arrière-plan démarrent dans chaque worker après le fork.
+app = create_app(taches_de_fond=False)